@@ -1,3 +1,7 @@
+import argparse
+import sys
+from pathlib import Path
+
 from gem5.simulate.exit_event import ExitEvent
 from gem5.simulate.simulator import Simulator
 from gem5.utils.requires import requires
@@ -7,15 +11,51 @@ from gem5.components.cachehierarchies.classic.private_l1_private_l2_cache_hierar
 from gem5.components.boards.simple_board import SimpleBoard
 from gem5.components.memory import DualChannelDDR4_2400
 from gem5.components.processors.simple_processor import SimpleProcessor
+from gem5.components.processors.simple_switchable_processor import (
+    SimpleSwitchableProcessor,
+)
 from gem5.components.processors.cpu_types import CPUTypes
 from gem5.isas import ISA
 from gem5.resources.resource import BinaryResource
 from gem5.resources.elfie import PcCountPair, ELFieInfo
 from gem5.resources.workload import CustomWorkload
+import m5
 from m5.stats import reset, dump
 
+sys.path.append(
+    Path(__file__).resolve().parents[1].joinpath("materials/tools").as_posix()
+)
+
+from pc_tracking import PcCountExitTracker, SwitchableELFieInfo
+
 requires(isa_required=ISA.X86)
 
+parser = argparse.ArgumentParser(
+    description="Run the region of an ELFie in detail."
+)
+parser.add_argument(
+    "--elfie",
+    type=Path,
+    default=Path(
+        "cactuBSSN-s.1_1_globalr2/cactuBSSN-s.1_1_globalr2.sim.elfie"
+    ),
+    help="The ELFie binary.",
+)
+parser.add_argument(
+    "--no-fast-forward",
+    action="store_true",
+    help="Run the whole ELFie on TIMING cores, instead of fast-forwarding to "
+    "the start of the region on ATOMIC cores.",
+)
+parser.add_argument(
+    "--after-region",
+    choices=["stop", "fast-forward"],
+    default="stop",
+    help="Whether to stop at the end of the region or to switch back to the "
+    "ATOMIC cores and run the ELFie to completion.",
+)
+args = parser.parse_args()
+
 
 cache_hierarchy = PrivateL1PrivateL2CacheHierarchy(
     l1d_size="32kB",
@@ -25,11 +65,22 @@ cache_hierarchy = PrivateL1PrivateL2CacheHierarchy(
 
 memory = DualChannelDDR4_2400("1GiB")
 
-processor = SimpleProcessor(
-    cpu_type=CPUTypes.TIMING,
-    isa=ISA.X86,
-    num_cores=8,
-)
+if args.no_fast_forward:
+    processor = SimpleProcessor(
+        cpu_type=CPUTypes.TIMING,
+        isa=ISA.X86,
+        num_cores=8,
+    )
+else:
+    # Fast-forward to the start of the region on ATOMIC cores, then switch to
+    # the TIMING cores. KVM would be faster still, but KVM cores cannot track
+    # the PC-count pairs which mark the region.
+    processor = SimpleSwitchableProcessor(
+        starting_core_type=CPUTypes.ATOMIC,
+        switch_core_type=CPUTypes.TIMING,
+        isa=ISA.X86,
+        num_cores=8,
+    )
 
 board = SimpleBoard(
     clk_freq="3GHz",
@@ -48,23 +99,38 @@ board = SimpleBoard(
 
 # board.set_workload(workload)
 
+# `ELFieInfo` only tracks the region markers on the cores running when the
+# workload is set. `SwitchableELFieInfo` tracks them on the TIMING cores too.
+elfie_info = SwitchableELFieInfo(PcCountPair(0x6ffed1, 1), PcCountPair(0x6c830f, 6479283))
 board.set_se_elfie_workload(
-    elfie = BinaryResource("cactuBSSN-s.1_1_globalr2/cactuBSSN-s.1_1_globalr2.sim.elfie"),
-    elfie_info = ELFieInfo(PcCountPair(0x6ffed1, 1), PcCountPair(0x6c830f, 6479283))
+    elfie = BinaryResource(args.elfie.as_posix()),
+    elfie_info = elfie_info
 )
 
-# Note: it could be useful to go to the beginning in atomic mode instead of timing
+# This records the exit events at the region markers. The statistics are written to
+# `pc-count-exits.json` in the output directory.
+exit_tracker = PcCountExitTracker(elfie_info.get_targets(), elfie_info.get_manager())
+
 def gen():
-    print("Hit beginning of the region.")
+    if not args.no_fast_forward:
+        print("Hit beginning of the region. Switching to the TIMING cores.")
+        processor.switch()
+    else:
+        print("Hit beginning of the region.")
     reset()
     print ("Running the region.")
     yield False
     dump()
-    yield True
+    if args.no_fast_forward or args.after_region == "stop":
+        yield True
+    print("Hit end of the region. Switching back to the ATOMIC cores.")
+    processor.switch()
+    yield False
 
 simulator = Simulator(
     board = board,
-    on_exit_event={ExitEvent.SIMPOINT_BEGIN: gen()},
+    on_exit_event={ExitEvent.SIMPOINT_BEGIN: exit_tracker.wrap(gen())},
 )
 
 simulator.run()
+exit_tracker.write_stats(Path(m5.options.outdir) / "pc-count-exits.json")
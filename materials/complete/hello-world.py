@@ -3,9 +3,16 @@ from gem5.components.cachehierarchies.classic.no_cache import NoCache
 from gem5.components.memory import SingleChannelDDR3_1600
 from gem5.components.processors.simple_processor import SimpleProcessor
 from gem5.components.processors.cpu_types import CPUTypes
-from gem5.resources.resource import obtain_resource
 from gem5.simulate.simulator import Simulator
 from gem5.isas import ISA
+import sys
+from pathlib import Path
+
+sys.path.append(
+    Path(__file__).resolve().parents[1].joinpath("tools").as_posix()
+)
+
+from resource_cache import ResourceCache
 
 # Obtain the components.
 cache_hierarchy = NoCache()
@@ -20,8 +27,9 @@ board = SimpleBoard(
     cache_hierarchy=cache_hierarchy,
 )
 
-# Obtain a binary to run via gem5-resources.
-binary = obtain_resource("x86-hello64-static")
+# Obtain a binary to run via gem5-resources. `ResourceCache` resolves it from
+# its local index once it has been downloaded.
+binary = ResourceCache().obtain("x86-hello64-static")
 board.set_se_binary_workload(binary)
 
 # Setup the simulator and run the simulation.
@@ -0,0 +1,161 @@
+"""
+Run many SE binaries from a single gem5 invocation.
+
+gem5 can only instantiate a simulation once per process, and the process of
+an SE workload is created when the simulation is instantiated, so a board
+cannot be re-pointed to another binary once it has run. What can be shared
+is everything before instantiation: starting gem5 and importing the gem5
+standard library, which dominate the host time of short binaries. This
+script pays for them once, then forks a child per binary. Each child builds
+the board, sets its binary as the workload, instantiates and runs it, with
+its own output directory, so the stats of each binary are separate.
+
+```
+gem5 materials/complete/se-batch.py x86-hello64-static path/to/binary ...
+```
+
+Each binary's output is written to `<outdir>/<index>-<name>`, and the exit
+status and host time of each binary are listed in `<outdir>/batch.json`.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from gem5.components.boards.simple_board import SimpleBoard
+from gem5.components.cachehierarchies.classic.no_cache import NoCache
+from gem5.components.memory import SingleChannelDDR3_1600
+from gem5.components.processors.simple_processor import SimpleProcessor
+from gem5.components.processors.cpu_types import CPUTypes
+from gem5.resources.resource import BinaryResource
+from gem5.simulate.simulator import Simulator
+from gem5.isas import ISA
+import m5
+
+sys.path.append(
+    Path(__file__).resolve().parents[1].joinpath("tools").as_posix()
+)
+
+from gem5_jobs import default_num_workers
+from resource_cache import ResourceCache
+
+parser = argparse.ArgumentParser(
+    description="Run many SE binaries, each in its own simulation, from a "
+    "single gem5 invocation."
+)
+parser.add_argument(
+    "binaries",
+    type=str,
+    nargs="*",
+    help="The binaries to run: gem5 resource names or paths to local "
+    "binaries.",
+)
+parser.add_argument(
+    "--from-file",
+    type=Path,
+    help="Also run the binaries listed in this file, one per line.",
+)
+parser.add_argument(
+    "--cpu-type",
+    type=str,
+    choices=[cpu_type.name for cpu_type in CPUTypes],
+    default="ATOMIC",
+)
+parser.add_argument(
+    "--jobs",
+    type=int,
+    default=default_num_workers(),
+    help="The maximum number of binaries simulated at the same time. "
+    "Defaults to the number of host cores.",
+)
+args = parser.parse_args()
+
+binaries = list(args.binaries)
+if args.from_file:
+    binaries += [
+        line.strip()
+        for line in args.from_file.read_text().splitlines()
+        if line.strip() and not line.startswith("#")
+    ]
+if not binaries:
+    parser.error("No binaries to run.")
+
+# The resources are obtained up front, so the children do not download them
+# concurrently.
+cache = ResourceCache()
+resources = [
+    BinaryResource(Path(binary).resolve().as_posix())
+    if Path(binary).is_file()
+    else cache.obtain(binary)
+    for binary in binaries
+]
+
+outdir = Path(m5.options.outdir).resolve()
+
+
+def run_binary(binary: BinaryResource, binary_outdir: Path) -> None:
+    """Simulate a binary in this process, writing its output to a directory."""
+    binary_outdir.mkdir(parents=True, exist_ok=True)
+    # The stats file opened at startup is in the batch's output directory, so
+    # it is replaced by one in the binary's output directory.
+    m5.options.outdir = binary_outdir.as_posix()
+    m5.core.setOutputDir(binary_outdir.as_posix())
+    m5.stats.outputList.clear()
+    m5.stats.addStatVisitor(m5.options.stats_file)
+
+    board = SimpleBoard(
+        clk_freq="3GHz",
+        processor=SimpleProcessor(
+            cpu_type=CPUTypes[args.cpu_type], num_cores=1, isa=ISA.X86
+        ),
+        memory=SingleChannelDDR3_1600("1GiB"),
+        cache_hierarchy=NoCache(),
+    )
+    board.set_se_binary_workload(binary)
+    Simulator(board=board).run()
+
+
+results = []
+running = {}
+
+
+def wait_for_one() -> None:
+    pid, status = os.wait()
+    result = running.pop(pid)
+    result["exit_status"] = os.waitstatus_to_exitcode(status)
+    result["host_seconds"] = time.monotonic() - result.pop("start")
+    print(
+        f"{result['binary']}: exit status {result['exit_status']}, "
+        f"{result['host_seconds']:.2f}s."
+    )
+
+
+for index, (name, binary) in enumerate(zip(binaries, resources)):
+    if len(running) >= args.jobs:
+        wait_for_one()
+    binary_outdir = outdir / f"{index}-{Path(name).name}"
+    result = {"binary": name, "outdir": binary_outdir.as_posix()}
+    results.append(result)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        run_binary(binary, binary_outdir)
+        # gem5 dumps the stats and closes the output files at exit.
+        sys.exit(0)
+    result["start"] = time.monotonic()
+    running[pid] = result
+
+while running:
+    wait_for_one()
+
+with open(outdir / "batch.json", "w") as f:
+    json.dump(results, f, indent=4)
+
+failed = [result for result in results if result["exit_status"] != 0]
+print(f"Ran {len(results)} binaries, {len(failed)} failed.")
+if failed:
+    sys.exit(1)
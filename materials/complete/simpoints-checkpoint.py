@@ -1,3 +1,6 @@
+import argparse
+import sys
+
 from gem5.simulate.exit_event import ExitEvent
 from gem5.simulate.simulator import Simulator
 from gem5.utils.requires import requires
@@ -6,23 +9,86 @@ from gem5.components.memory.single_channel import SingleChannelDDR3_1600
 from gem5.components.processors.simple_processor import SimpleProcessor
 from gem5.components.processors.cpu_types import CPUTypes
 from gem5.isas import ISA
-from gem5.resources.resource import obtain_resource, SimpointResource
+from gem5.resources.resource import SimpointResource
 from pathlib import Path
 from gem5.components.cachehierarchies.classic.no_cache import NoCache
 from gem5.simulate.exit_event_generators import (
     save_checkpoint_generator,
 )
 
+sys.path.append(
+    Path(__file__).resolve().parents[1].joinpath("tools").as_posix()
+)
+
+from checkpoint_format import pack_checkpoint
+from checkpoint_store import CheckpointStore
+from checkpoint_writer import CheckpointWriter
+from resource_cache import ResourceCache
+
 requires(isa_required=ISA.X86)
 
+parser = argparse.ArgumentParser(
+    description="A script to take the SimPoint checkpoints."
+)
+
+parser.add_argument(
+    "--packed-checkpoints",
+    action="store_true",
+    help="Store the checkpoints in the compact `m5.cpt.packed` format.",
+)
+parser.add_argument(
+    "--checkpoint-store",
+    type=Path,
+    help="Move the checkpoints into this deduplicating checkpoint store.",
+)
+parser.add_argument(
+    "--async-checkpoints",
+    type=int,
+    default=0,
+    help="Write up to this many checkpoints in the background, from forked "
+    "copies of the simulation, while the simulation carries on. By default, "
+    "the simulation stops while each checkpoint is written.",
+)
+parser.add_argument(
+    "--simpoint-json",
+    type=Path,
+    help="Take the checkpoints of the SimPoints in this SimPoint JSON file, "
+    "written by `materials/tools/simpoint-cluster.py`, instead of the "
+    "hand-written SimPoints of `x86-print-this`.",
+)
+args = parser.parse_args()
+
+if args.simpoint_json:
+    # The SimPoint analysis tools need NumPy, which the default SimPoints do
+    # not.
+    from simpoint_bbv import read_simpoint_json
+
+    simpoint_parameters, simpoint_info = read_simpoint_json(
+        args.simpoint_json
+    )
+    num_cores = simpoint_info["num_threads"]
+    binary = simpoint_info.get("binary", "x86-print-this")
+    arguments = simpoint_info.get("arguments", ["print this", 15000])
+else:
+    simpoint_parameters = {
+        "simpoint_interval": 1000000,
+        "simpoint_list": [2, 3, 4, 15],
+        "weight_list": [0.1, 0.2, 0.4, 0.3],
+        "warmup_interval": 1000000,
+    }
+    num_cores = 1
+    binary = "x86-print-this"
+    arguments = ["print this", 15000]
+
 # Setup the components.
 cache_hierarchy = NoCache()
 memory = SingleChannelDDR3_1600(size="2GB")
 processor = SimpleProcessor(
     cpu_type=CPUTypes.ATOMIC,
     isa=ISA.X86,
-    # SimPoints only works with one core
-    num_cores=1,
+    # One core per thread of the workload. Multi-threaded SimPoints are
+    # counted in the instructions of the first core.
+    num_cores=num_cores,
 )
 
 board = SimpleBoard(
@@ -34,24 +100,44 @@ board = SimpleBoard(
 
 # Setup the Simpoints workload
 board.set_se_simpoint_workload(
-    binary=obtain_resource("x86-print-this"),
-    arguments=["print this", 15000],
-    simpoint=SimpointResource(
-        simpoint_interval=1000000,
-        simpoint_list=[2, 3, 4, 15],
-        weight_list=[0.1, 0.2, 0.4, 0.3],
-        warmup_interval=1000000,
-    ),
+    binary=ResourceCache().obtain(binary),
+    arguments=arguments,
+    simpoint=SimpointResource(**simpoint_parameters),
 )
 
 dir = Path("simpoint-checkpoint-dir")
 dir.mkdir(exist_ok=True)
 
+# These are run on each checkpoint once it has been written.
+post_checkpoint = []
+# The packed format stores the page tables, file descriptors and TLB entries
+# as compressed arrays. Restoring from a packed checkpoint unpacks it first.
+if args.packed_checkpoints:
+    post_checkpoint.append(pack_checkpoint)
+# The checkpoint store keeps a single copy of the content shared between the
+# checkpoints, such as the page tables and most of the memory images.
+if args.checkpoint_store:
+    store = CheckpointStore(args.checkpoint_store)
+    post_checkpoint.append(
+        lambda checkpoint: store.add(checkpoint, remove=True)
+    )
+
+# With `--async-checkpoints`, the checkpoints are written by forked copies of
+# the simulation while the parent simulation carries on.
+checkpoint_writer = CheckpointWriter(
+    post_checkpoint=post_checkpoint, max_pending=args.async_checkpoints
+)
+
 # Here we use the Simpoints generator to take the checkpoints.
 # When a Simpoint region, or warmup region, begins, a checkpoint is generated.
+checkpoint_generator = checkpoint_writer.wrap(
+    save_checkpoint_generator(dir)
+)
+
 simulator = Simulator(
     board=board,
-    on_exit_event={ExitEvent.SIMPOINT_BEGIN: save_checkpoint_generator(dir)},
+    on_exit_event={ExitEvent.SIMPOINT_BEGIN: checkpoint_generator},
 )
 
 simulator.run()
+checkpoint_writer.wait()
@@ -0,0 +1,164 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from gem5.simulate.simulator import Simulator
+from gem5.utils.requires import requires
+from gem5.components.boards.simple_board import SimpleBoard
+from gem5.components.memory.single_channel import SingleChannelDDR3_1600
+from gem5.components.processors.simple_processor import SimpleProcessor
+from gem5.components.processors.cpu_types import CPUTypes
+from gem5.components.cachehierarchies.classic.no_cache import NoCache
+from gem5.isas import ISA
+import m5
+from m5.objects import SimPoint
+
+sys.path.append(
+    Path(__file__).resolve().parents[1].joinpath("tools").as_posix()
+)
+
+from resource_cache import ResourceCache
+
+requires(isa_required=ISA.X86)
+
+parser = argparse.ArgumentParser(
+    description="Record the basic block vectors of every thread of a "
+    "workload, for SimPoint."
+)
+parser.add_argument(
+    "--binary",
+    type=str,
+    default="x86-print-this",
+    help="The gem5 resource of the binary to profile.",
+)
+parser.add_argument(
+    "--arguments",
+    type=str,
+    nargs="*",
+    default=["print this", "15000"],
+    help="The arguments of the binary.",
+)
+parser.add_argument(
+    "--num-cores",
+    type=int,
+    default=1,
+    help="The number of cores, one per thread of the workload.",
+)
+parser.add_argument(
+    "--interval",
+    type=int,
+    default=1000000,
+    help="The number of instructions of each thread per BBV interval.",
+)
+parser.add_argument(
+    "--simpoint-json",
+    type=Path,
+    help="Find the SimPoints once the workload has run, and write them to "
+    "this SimPoint JSON file for `simpoints-checkpoint.py --simpoint-json`. "
+    "Requires NumPy.",
+)
+parser.add_argument(
+    "--warmup-interval",
+    type=int,
+    default=0,
+    help="The warmup interval recorded in the SimPoint JSON file.",
+)
+parser.add_argument(
+    "--max-k",
+    type=int,
+    default=30,
+    help="The maximum number of SimPoints.",
+)
+parser.add_argument(
+    "--keep-bb-files",
+    action="store_true",
+    help="With --simpoint-json, keep the gzipped text BBV files. By default, "
+    "only the compressed `bbv.npz` file is kept.",
+)
+args = parser.parse_args()
+
+if args.simpoint_json:
+    # Imported now, so a missing NumPy is reported before the workload runs.
+    import simpoint_bbv
+
+# The SimPoint probes only work with ATOMIC cores.
+cache_hierarchy = NoCache()
+memory = SingleChannelDDR3_1600(size="2GB")
+processor = SimpleProcessor(
+    cpu_type=CPUTypes.ATOMIC,
+    isa=ISA.X86,
+    num_cores=args.num_cores,
+)
+
+board = SimpleBoard(
+    clk_freq="3GHz",
+    processor=processor,
+    memory=memory,
+    cache_hierarchy=cache_hierarchy,
+)
+
+board.set_se_binary_workload(
+    binary=ResourceCache().obtain(args.binary),
+    arguments=args.arguments,
+)
+
+# Each core gets its own SimPoint probe, which writes the BBVs of the thread
+# it runs to `simpoint.core<i>.bb.gz` in the output directory.
+for i, core in enumerate(processor.get_cores()):
+    core.get_simobject().probeListener = SimPoint(
+        interval=args.interval, profile_file=f"simpoint.core{i}.bb.gz"
+    )
+
+simulator = Simulator(board=board)
+
+if not args.simpoint_json:
+    simulator.run()
+    print(
+        "The BBVs can be clustered with `materials/tools/simpoint-cluster.py "
+        f"--interval {args.interval}`."
+    )
+    sys.exit()
+
+# The SimPoint probes only finish writing their BBV files when gem5 exits,
+# so the workload runs in a child process. This process, which never
+# instantiates the simulation, then clusters the BBVs.
+sys.stdout.flush()
+sys.stderr.flush()
+pid = os.fork()
+if pid == 0:
+    simulator.run()
+    sys.exit(0)
+_, status = os.waitpid(pid, 0)
+if os.waitstatus_to_exitcode(status) != 0:
+    sys.exit("The profiling simulation failed.")
+
+outdir = Path(m5.options.outdir)
+bb_files = [
+    outdir / f"simpoint.core{i}.bb.gz" for i in range(args.num_cores)
+]
+threads = [simpoint_bbv.read_bb_file(path) for path in bb_files]
+simpoint_bbv.save_bbvs(outdir / "bbv.npz", threads)
+if not args.keep_bb_files:
+    for path in bb_files:
+        path.unlink()
+
+bbvs = simpoint_bbv.combine_threads(threads)
+if bbvs.get_num_intervals() == 0:
+    sys.exit("The workload ran for less than one interval.")
+simpoints = simpoint_bbv.find_simpoints(
+    simpoint_bbv.project(bbvs), max_k=args.max_k
+)
+simpoint_bbv.write_simpoint_json(
+    args.simpoint_json,
+    simpoints,
+    args.interval,
+    args.warmup_interval,
+    num_threads=args.num_cores,
+    extra={"binary": args.binary, "arguments": args.arguments},
+)
+print(
+    f"{len(simpoints.intervals)} SimPoints out of "
+    f"{bbvs.get_num_intervals()} intervals written to "
+    f"'{args.simpoint_json}'."
+)
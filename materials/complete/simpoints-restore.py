@@ -1,3 +1,6 @@
+import argparse
+import sys
+
 from gem5.simulate.exit_event import ExitEvent
 from gem5.simulate.simulator import Simulator
 from gem5.utils.requires import requires
@@ -7,16 +10,82 @@ from gem5.components.cachehierarchies.classic.private_l1_private_l2_cache_hierar
 from gem5.components.boards.simple_board import SimpleBoard
 from gem5.components.memory import DualChannelDDR4_2400
 from gem5.components.processors.simple_processor import SimpleProcessor
+from gem5.components.processors.simple_switchable_processor import (
+    SimpleSwitchableProcessor,
+)
 from gem5.components.processors.cpu_types import CPUTypes
 from gem5.isas import ISA
-from gem5.resources.resource import SimpointResource, obtain_resource
 from gem5.resources.resource import SimpointResource
 from pathlib import Path
 
+import m5
 from m5.stats import reset, dump
 
+sys.path.append(
+    Path(__file__).resolve().parents[1].joinpath("tools").as_posix()
+)
+
+from checkpoint_format import prepare_checkpoint
+from resource_cache import ResourceCache
+from stat_sampler import ColumnarStatsDumper
+
 requires(isa_required=ISA.X86)
 
+parser = argparse.ArgumentParser(
+    description="Restore a SimPoint checkpoint and simulate the SimPoint."
+)
+parser.add_argument(
+    "--simpoint-json",
+    type=Path,
+    help="The SimPoint JSON file the checkpoints were taken with, if any.",
+)
+parser.add_argument(
+    "--functional-warmup",
+    action="store_true",
+    help="Simulate the warmup on ATOMIC cores, which warm the caches "
+    "functionally, and switch to TIMING cores at the start of the SimPoint.",
+)
+parser.add_argument(
+    "--columnar-stats",
+    type=str,
+    required=False,
+    help="Write the stat dumps to this columnar file in the output "
+    "directory, one row group per dump, instead of to `stats.txt`. "
+    "`materials/tools/columnar-to-csv.py` prints it.",
+)
+parser.add_argument(
+    "--stats-filter",
+    type=str,
+    nargs="+",
+    default=["*"],
+    help="With --columnar-stats, glob patterns of the stats to write, e.g., "
+    "'simInsts' 'board.cache_hierarchy.l2caches*'. By default, all of them.",
+)
+args = parser.parse_args()
+
+if args.stats_filter != ["*"] and not args.columnar_stats:
+    parser.error("--stats-filter requires --columnar-stats.")
+
+if args.simpoint_json:
+    from simpoint_bbv import read_simpoint_json
+
+    simpoint_parameters, simpoint_info = read_simpoint_json(
+        args.simpoint_json
+    )
+    num_cores = simpoint_info["num_threads"]
+    binary = simpoint_info.get("binary", "x86-print-this")
+    arguments = simpoint_info.get("arguments", ["print this", 15000])
+else:
+    simpoint_parameters = {
+        "simpoint_interval": 1000000,
+        "simpoint_list": [2, 3, 4, 15],
+        "weight_list": [0.1, 0.2, 0.4, 0.3],
+        "warmup_interval": 1000000,
+    }
+    num_cores = 1
+    binary = "x86-print-this"
+    arguments = ["print this", 15000]
+
 cache_hierarchy = PrivateL1PrivateL2CacheHierarchy(
     l1d_size="32kB",
     l1i_size="32kB",
@@ -25,12 +94,29 @@ cache_hierarchy = PrivateL1PrivateL2CacheHierarchy(
 
 memory = DualChannelDDR4_2400(size="2GB")
 
-processor = SimpleProcessor(
-    cpu_type=CPUTypes.TIMING,
-    isa=ISA.X86,
-    num_cores=1,
+simpoint = SimpointResource(**simpoint_parameters)
+functional_warmup = (
+    args.functional_warmup and simpoint.get_warmup_list()[0] > 0
 )
 
+if functional_warmup:
+    # The cache state is not saved in the checkpoint, so the ATOMIC cores
+    # warm the caches below, whose tags they update as they access them.
+    processor = SimpleSwitchableProcessor(
+        starting_core_type=CPUTypes.ATOMIC,
+        switch_core_type=CPUTypes.TIMING,
+        isa=ISA.X86,
+        num_cores=num_cores,
+    )
+else:
+    processor = SimpleProcessor(
+        cpu_type=CPUTypes.TIMING,
+        isa=ISA.X86,
+        # With several cores, the SimPoint ends when any of its threads has
+        # run the SimPoint interval.
+        num_cores=num_cores,
+    )
+
 board = SimpleBoard(
     clk_freq="3GHz",
     processor=processor,
@@ -39,17 +125,33 @@ board = SimpleBoard(
 )
 
 board.set_se_simpoint_workload(
-    binary=obtain_resource("x86-print-this"),
-    arguments=["print this", 15000],
-    simpoint=SimpointResource(
-        simpoint_interval=1000000,
-        simpoint_list=[2, 3, 4, 15],
-        weight_list=[0.1, 0.2, 0.4, 0.3],
-        warmup_interval=1000000,
+    binary=ResourceCache().obtain(binary),
+    arguments=arguments,
+    simpoint=simpoint,
+    # gem5 restores from the text `m5.cpt` file. If the checkpoint is in the
+    # packed format, it is unpacked into the output directory first.
+    checkpoint=prepare_checkpoint(
+        Path(""), Path(m5.options.outdir) / "checkpoint"
     ),
-    checkpoint=Path(""),
 )
 
+# With --columnar-stats, the stat dumps are written to a columnar file
+# instead of `stats.txt`.
+if args.columnar_stats:
+    columnar_stats = ColumnarStatsDumper(
+        Path(m5.options.outdir) / args.columnar_stats,
+        patterns=args.stats_filter,
+    )
+
+
+# Dump the stats to the columnar file with --columnar-stats, and to
+# `stats.txt` otherwise.
+def dump_stats():
+    if args.columnar_stats:
+        columnar_stats.dump()
+    else:
+        dump()
+
 
 def max_inst():
     warmed_up = False
@@ -60,11 +162,15 @@ def max_inst():
         else:
             print("end of warmup, starting to simulate SimPoint")
             warmed_up = True
+            if functional_warmup:
+                # The SimPoint is simulated on the TIMING cores, which the
+                # stop below is scheduled on.
+                processor.switch()
             # Schedule a MAX_INSTS exit event during the simulation
             simulator.schedule_max_insts(
                 board.get_simpoint().get_simpoint_interval()
             )
-            dump()
+            dump_stats()
             reset()
             yield False
 
@@ -76,3 +182,8 @@ simulator = Simulator(
 
 simulator.schedule_max_insts(board.get_simpoint().get_warmup_list()[0])
 simulator.run()
+if args.columnar_stats:
+    # gem5 dumps the SimPoint's stats to `stats.txt` when it exits. The
+    # columnar file gets them now.
+    columnar_stats.dump()
+    columnar_stats.close()
@@ -0,0 +1,158 @@
+import argparse
+import sys
+from pathlib import Path
+
+from gem5.simulate.exit_event import ExitEvent
+from gem5.simulate.simulator import Simulator
+from gem5.utils.requires import requires
+from gem5.components.cachehierarchies.classic.private_l1_private_l2_cache_hierarchy import (
+    PrivateL1PrivateL2CacheHierarchy,
+)
+from gem5.components.boards.simple_board import SimpleBoard
+from gem5.components.memory import DualChannelDDR4_2400
+from gem5.components.processors.simple_switchable_processor import (
+    SimpleSwitchableProcessor,
+)
+from gem5.components.processors.cpu_types import CPUTypes
+from gem5.isas import ISA
+import m5
+
+sys.path.append(
+    Path(__file__).resolve().parents[1].joinpath("tools").as_posix()
+)
+
+from resource_cache import ResourceCache
+from smarts_sampler import SmartsSampler
+
+requires(isa_required=ISA.X86)
+
+parser = argparse.ArgumentParser(
+    description="Estimate the CPI of a workload by SMARTS-style periodic "
+    "sampling, without an offline profile."
+)
+parser.add_argument(
+    "--binary",
+    type=str,
+    default="x86-print-this",
+    help="The gem5 resource of the binary to sample.",
+)
+parser.add_argument(
+    "--arguments",
+    type=str,
+    nargs="*",
+    default=["print this", "15000"],
+    help="The arguments of the binary.",
+)
+parser.add_argument(
+    "--detailed-cpu",
+    choices=["timing", "o3"],
+    default="timing",
+    help="The CPU type the warmups and the measurement units run on.",
+)
+parser.add_argument(
+    "--period",
+    type=int,
+    default=100000,
+    help="The instructions from the start of one measurement unit to the "
+    "start of the next.",
+)
+parser.add_argument(
+    "--warmup",
+    type=int,
+    default=2000,
+    help="The instructions of detailed warmup before each measurement unit.",
+)
+parser.add_argument(
+    "--measurement",
+    type=int,
+    default=1000,
+    help="The instructions of each measurement unit.",
+)
+parser.add_argument(
+    "--confidence",
+    type=float,
+    default=0.997,
+    help="The confidence level of the CPI interval.",
+)
+parser.add_argument(
+    "--target-error",
+    type=float,
+    help="Stop once the CPI is known within this relative error, e.g., 0.03, "
+    "at the confidence level. By default, the whole workload is sampled.",
+)
+parser.add_argument(
+    "--min-samples",
+    type=int,
+    default=30,
+    help="With --target-error, the samples taken before stopping.",
+)
+args = parser.parse_args()
+
+if args.period <= args.warmup + args.measurement:
+    parser.error(
+        "--period must be longer than --warmup and --measurement together."
+    )
+if not 0 < args.confidence < 1:
+    parser.error("--confidence must be between 0 and 1.")
+
+# The fast-forwards run on the ATOMIC cores through the same caches as the
+# detailed cores, so the caches stay warm between the measurement units.
+cache_hierarchy = PrivateL1PrivateL2CacheHierarchy(
+    l1d_size="32kB",
+    l1i_size="32kB",
+    l2_size="256kB",
+)
+
+memory = DualChannelDDR4_2400(size="2GB")
+
+# The samples are taken from the instructions of a single thread.
+processor = SimpleSwitchableProcessor(
+    starting_core_type=CPUTypes.ATOMIC,
+    switch_core_type=(
+        CPUTypes.O3 if args.detailed_cpu == "o3" else CPUTypes.TIMING
+    ),
+    isa=ISA.X86,
+    num_cores=1,
+)
+
+board = SimpleBoard(
+    clk_freq="3GHz",
+    processor=processor,
+    memory=memory,
+    cache_hierarchy=cache_hierarchy,
+)
+
+board.set_se_binary_workload(
+    binary=ResourceCache().obtain(args.binary),
+    arguments=args.arguments,
+)
+
+sampler = SmartsSampler(
+    processor,
+    period=args.period,
+    warmup=args.warmup,
+    measurement=args.measurement,
+    confidence=args.confidence,
+    target_error=args.target_error,
+    min_samples=args.min_samples,
+)
+# Each MAX_INSTS exit ends a fast-forward, a warmup or a measurement unit.
+simulator = Simulator(
+    board=board,
+    on_exit_event={ExitEvent.MAX_INSTS: sampler.sample()},
+)
+sampler.start(simulator)
+simulator.run()
+
+report = sampler.get_report()
+sampler.write_report(Path(m5.options.outdir) / "smarts.json")
+if report["cpi"] is None:
+    print("The workload ended before the first measurement unit.")
+elif report["cpi_half_width"] is None:
+    print(f"CPI: {report['cpi']:.4f} from a single sample.")
+else:
+    print(
+        f"CPI: {report['cpi']:.4f} +/- {report['cpi_half_width']:.4f} "
+        f"({report['relative_error']:.1%}) at {args.confidence:.1%} "
+        f"confidence, from {report['samples']} samples."
+    )
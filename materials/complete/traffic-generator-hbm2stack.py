@@ -1,8 +1,6 @@
 from gem5.components.boards.test_board import TestBoard
 from gem5.components.memory import HBM2Stack
 from gem5.components.processors.random_generator import RandomGenerator
-from gem5.components.boards.test_board import TestBoard
-from gem5.components.processors.random_generator import RandomGenerator
 from gem5.components.cachehierarchies.classic.no_cache import NoCache
 
 import m5
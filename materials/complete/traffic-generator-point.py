@@ -0,0 +1,86 @@
+"""
+A parameterized version of `traffic-generator.py`, run once per point by
+`materials/tools/traffic-sweep.py`.
+
+```
+gem5 materials/complete/traffic-generator-point.py --memory HBM2Stack \
+    --generator linear --rate 20GB/s --read-percentage 50
+```
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import gem5.components.memory
+from gem5.components.boards.test_board import TestBoard
+from gem5.components.processors.linear_generator import LinearGenerator
+from gem5.components.processors.random_generator import RandomGenerator
+
+import m5
+from m5.objects import Root
+
+sys.path.append(
+    Path(__file__).resolve().parents[1].joinpath("tools").as_posix()
+)
+
+from monitored_no_cache import MonitoredNoCache
+
+generators = {"random": RandomGenerator, "linear": LinearGenerator}
+
+parser = argparse.ArgumentParser(
+    description="Drive a memory with a traffic generator."
+)
+parser.add_argument(
+    "--memory",
+    type=str,
+    default="SingleChannelDDR3_1600",
+    help="The memory, by its name in `gem5.components.memory`, e.g., "
+    "SingleChannelDDR3_1600, DualChannelDDR4_2400 or HBM2Stack.",
+)
+parser.add_argument("--memory-size", type=str, default="1GiB")
+parser.add_argument(
+    "--generator", type=str, choices=generators.keys(), default="random"
+)
+parser.add_argument("--rate", type=str, default="40GB/s")
+parser.add_argument(
+    "--read-percentage",
+    type=int,
+    default=100,
+    help="The percentage of requests which are reads.",
+)
+parser.add_argument("--duration", type=str, default="250us")
+args = parser.parse_args()
+
+if not hasattr(gem5.components.memory, args.memory):
+    parser.error(f"There is no memory '{args.memory}'.")
+
+# Setup the components.
+memory = getattr(gem5.components.memory, args.memory)(args.memory_size)
+generator = generators[args.generator](
+    duration=args.duration,
+    rate=args.rate,
+    num_cores=1,
+    max_addr=memory.get_size(),
+    rd_perc=args.read_percentage,
+)
+# Monitor the requests to each memory port to get latency histograms.
+cache_hierarchy = MonitoredNoCache()
+
+# Add them to the Test board.
+board = TestBoard(
+    clk_freq="3GHz",
+    generator=generator,
+    memory=memory,
+    cache_hierarchy=cache_hierarchy,
+)
+
+# Setup the root and instantiate the simulation.
+# This is boilerplate code, to be removed in future releaes of gem5.
+root = Root(full_system=False, system=board)
+board._pre_instantiate()
+m5.instantiate()
+
+# Start the traffic generator.
+generator.start_traffic()
+exit_event = m5.simulate()
@@ -0,0 +1,121 @@
+"""
+Run the traffic generator and record how bandwidth, bank activity and latency
+evolve over time.
+
+Instead of a single `m5.simulate()` call, the simulation runs in intervals of
+`--interval` simulated time. After each interval, the selected stats are
+sampled into a columnar file, `timeline.cols` in the output directory by
+default. Print it as CSV with `materials/tools/columnar-to-csv.py`.
+
+```
+gem5 materials/complete/traffic-generator-timeline.py --memory HBM2Stack \
+    --interval 1us
+```
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import gem5.components.memory
+from gem5.components.boards.test_board import TestBoard
+from gem5.components.processors.random_generator import RandomGenerator
+
+import m5
+from m5.objects import Root
+from m5.util.convert import toLatency
+
+sys.path.append(
+    Path(__file__).resolve().parents[1].joinpath("tools").as_posix()
+)
+
+from monitored_no_cache import MonitoredNoCache
+from stat_sampler import StatSampler
+
+parser = argparse.ArgumentParser(
+    description="Sample the stats of a traffic generator run over time."
+)
+parser.add_argument(
+    "--memory",
+    type=str,
+    default="SingleChannelDDR3_1600",
+    help="The memory, by its name in `gem5.components.memory`.",
+)
+parser.add_argument("--rate", type=str, default="40GB/s")
+parser.add_argument("--duration", type=str, default="250us")
+parser.add_argument(
+    "--interval",
+    type=str,
+    default="1us",
+    help="The simulated time between two samples.",
+)
+parser.add_argument(
+    "--stat",
+    type=str,
+    action="append",
+    default=[],
+    help="A glob pattern of extra stats to sample, e.g., "
+    "'system.memory.*.dram.rdQLenPdf'.",
+)
+parser.add_argument(
+    "--output",
+    type=Path,
+    help="The columnar file to write. Defaults to `timeline.cols` in the "
+    "output directory.",
+)
+args = parser.parse_args()
+
+if not hasattr(gem5.components.memory, args.memory):
+    parser.error(f"There is no memory '{args.memory}'.")
+
+# Setup the components.
+memory = getattr(gem5.components.memory, args.memory)("1GiB")
+generator = RandomGenerator(
+    duration=args.duration,
+    rate=args.rate,
+    num_cores=1,
+    max_addr=memory.get_size(),
+)
+# Monitor the requests to each memory port to get latency histograms.
+cache_hierarchy = MonitoredNoCache()
+
+# Add them to the Test board.
+board = TestBoard(
+    clk_freq="3GHz",
+    generator=generator,
+    memory=memory,
+    cache_hierarchy=cache_hierarchy,
+)
+
+# Setup the root and instantiate the simulation.
+# This is boilerplate code, to be removed in future releaes of gem5.
+root = Root(full_system=False, system=board)
+board._pre_instantiate()
+m5.instantiate()
+
+# The bytes and latencies seen by the generator, and the bursts served by
+# each DRAM bank, over each interval.
+sampler = StatSampler(
+    board,
+    [
+        "system.cache_hierarchy.monitors*.totalReadBytes",
+        "system.cache_hierarchy.monitors*.totalWrittenBytes",
+        "system.cache_hierarchy.monitors*.readLatencyHist",
+        "system.cache_hierarchy.monitors*.writeLatencyHist",
+        "system.memory.*.perBankRdBursts",
+        "system.memory.*.perBankWrBursts",
+    ]
+    + args.stat,
+    args.output or Path(m5.options.outdir) / "timeline.cols",
+)
+interval = m5.ticks.fromSeconds(toLatency(args.interval))
+
+# Start the traffic generator.
+generator.start_traffic()
+while True:
+    exit_event = m5.simulate(interval)
+    sampler.sample()
+    if exit_event.getCause() != "simulate() limit reached":
+        break
+sampler.close()
+print(f"Sampled {len(sampler.get_stat_names())} stats every {args.interval}.")
@@ -1,18 +1,35 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
 from gem5.utils.requires import requires
-from gem5.components.boards.x86_board import X86Board
 from gem5.components.memory.single_channel import SingleChannelDDR3_1600
 from gem5.components.cachehierarchies.ruby.mesi_two_level_cache_hierarchy import (
     MESITwoLevelCacheHierarchy,
 )
+from gem5.components.processors.simple_processor import SimpleProcessor
 from gem5.components.processors.simple_switchable_processor import (
     SimpleSwitchableProcessor,
 )
 from gem5.coherence_protocol import CoherenceProtocol
 from gem5.isas import ISA
 from gem5.components.processors.cpu_types import CPUTypes
-from gem5.resources.workload import Workload
+from gem5.resources.workload import CustomWorkload
 from gem5.simulate.simulator import Simulator
 from gem5.simulate.exit_event import ExitEvent
+import m5
+
+sys.path.append(
+    Path(__file__).resolve().parents[1].joinpath("tools").as_posix()
+)
+
+from boot_cache import BootCheckpointCache
+from checkpoint_format import get_checkpoint_tick
+from overlay_board import OverlayX86Board
+from parallel_sim import enable_parallel_simulation, write_parallel_report
+from resource_cache import ResourceCache
+from sim_profiler import ProfiledSimulator
 
 # This runs a check to ensure the gem5 binary is compiled to X86 and supports
 # the MESI Two Level coherence protocol.
@@ -21,6 +38,65 @@ requires(
     coherence_protocol_required=CoherenceProtocol.MESI_TWO_LEVEL,
 )
 
+parser = argparse.ArgumentParser(
+    description="Boot Ubuntu 18.04 and run a command on O3 cores."
+)
+parser.add_argument(
+    "--disk-overlay",
+    type=Path,
+    help="Keep the guest's disk writes in this copy-on-write overlay file. "
+    "The disk image itself is shared read-only between simulations, and the "
+    "writes are discarded by default. An existing overlay is applied to the "
+    "disk at startup, so a later run sees the disk as this run left it.",
+)
+parser.add_argument(
+    "--boot-cache",
+    type=Path,
+    help="Restore the booted system from a checkpoint in this directory, if "
+    "a run with the same board, kernel and disk image stored one there. "
+    "Otherwise, boot and store a checkpoint there at the end of the boot.",
+)
+parser.add_argument(
+    "--profile",
+    type=str,
+    help="Log the host time, simulated ticks, instructions and memory use of "
+    "the boot and of the command to this JSON Lines file in the output "
+    "directory.",
+)
+parser.add_argument(
+    "--heartbeat-ticks",
+    type=int,
+    help="With --profile, also log them every this many simulated ticks.",
+)
+parser.add_argument(
+    "--kvm",
+    action="store_true",
+    help="Run the boot and the command on KVM cores instead of on TIMING "
+    "and O3 cores.",
+)
+parser.add_argument(
+    "--parallel-quantum",
+    type=int,
+    help="With --kvm, simulate each core on an event queue of its own, on a "
+    "separate host thread, synchronizing the queues every this many "
+    "simulated ticks. Experimental. The quantum and the simulated and host "
+    "time are written to `parallel.json` in the output directory.",
+)
+parser.add_argument(
+    "--serial-stats",
+    type=Path,
+    help="With --parallel-quantum, the `stats.txt` of the same run with "
+    "--kvm only, against which the simulated time is compared.",
+)
+args = parser.parse_args()
+
+if args.parallel_quantum is not None and not args.kvm:
+    parser.error("--parallel-quantum requires --kvm.")
+if args.serial_stats and args.parallel_quantum is None:
+    parser.error("--serial-stats requires --parallel-quantum.")
+if args.kvm:
+    requires(kvm_required=True)
+
 # Here we setup a MESI Two Level Cache Hierarchy.
 cache_hierarchy = MESITwoLevelCacheHierarchy(
     l1d_size="32KiB",
@@ -44,19 +120,34 @@ memory = SingleChannelDDR3_1600("2GiB")
 # from the starting core types to the switch core types. In this simulation
 # we start with TIMING cores to simulate the OS boot, then switch to the O3
 # cores for the command we wish to run after boot.
-processor = SimpleSwitchableProcessor(
-    starting_core_type=CPUTypes.TIMING,
-    switch_core_type=CPUTypes.O3,
-    num_cores=2,
-    isa=ISA.X86,
-)
+#
+# With --kvm, the cores run the guest natively on the host instead, so
+# neither the boot nor the command is simulated in detail. These are the only
+# cores gem5 can simulate on several event queues.
+if args.kvm:
+    processor = SimpleProcessor(
+        cpu_type=CPUTypes.KVM,
+        num_cores=2,
+        isa=ISA.X86,
+    )
+else:
+    processor = SimpleSwitchableProcessor(
+        starting_core_type=CPUTypes.TIMING,
+        switch_core_type=CPUTypes.O3,
+        num_cores=2,
+        isa=ISA.X86,
+    )
+core_name = "KVM" if args.kvm else "O3"
 
 # Here we setup the board. The X86Board allows for Full-System X86 simulations.
-board = X86Board(
+# The OverlayX86Board is an X86Board which can keep the disk writes in an
+# overlay file.
+board = OverlayX86Board(
     clk_freq="3GHz",
     processor=processor,
     memory=memory,
     cache_hierarchy=cache_hierarchy,
+    disk_overlay=args.disk_overlay,
 )
 
 # This is the command to run after the system has booted. The first `m5 exit`
@@ -92,7 +183,18 @@ command = (
 #      "additional_params" : {}
 # },
 # ```
-workload = Workload("x86-ubuntu-18.04-boot")
+#
+# The same workload is built here from its kernel and disk image, which
+# `ResourceCache` resolves from its local index once they are downloaded,
+# instead of looking them up in the gem5 resources database on every run.
+cache = ResourceCache()
+workload = CustomWorkload(
+    function="set_kernel_disk_workload",
+    parameters={
+        "kernel": cache.obtain("x86-linux-kernel-5.4.49"),
+        "disk_image": cache.obtain("x86-ubuntu-18.04-img"),
+    },
+)
 
 # We want to ammend this workload slightly to carry out a script when the OS
 # boot is complete. The script immediately exits the simulation loop then,
@@ -104,23 +206,77 @@ workload = Workload("x86-ubuntu-18.04-boot")
 # resource when the OS is booted.
 command = (
     "m5 exit;"
-    + "echo 'This is running on O3 CPU cores.';"
+    + f"echo 'This is running on {core_name} CPU cores.';"
     + "sleep 1;"
     + "m5 exit;"
 )
 
-workload.set_parameter("readfile_contents", command)
+# Here we want override the default behavior for the first m5 exit exit
+# event. Instead of exiting the simulator, we just want to switch the
+# processor. The 2nd 'm5 exit' after will revert to using default behavior
+# where the simulator run will exit.
+def switch_to_o3():
+    # With --kvm, the command runs on the same cores as the boot.
+    if not args.kvm:
+        processor.switch()
+    if args.profile:
+        simulator.set_phase(core_name.lower())
+
+
+exit_generator = (func() for func in [switch_to_o3])
+
+if args.boot_cache:
+    # The boot cache runs the command after an extra `m5 exit`, at which the
+    # boot checkpoint is taken, or restores from the checkpoint and runs the
+    # command straight away.
+    boot_cache = BootCheckpointCache(args.boot_cache, board, workload)
+    boot_cache.set_command(command)
+    exit_generator = boot_cache.wrap(exit_generator)
+    checkpoint_path = boot_cache.get_checkpoint()
+    if checkpoint_path:
+        print(f"Restoring the boot checkpoint '{checkpoint_path}'.")
+else:
+    workload.set_parameter("readfile_contents", command)
+    checkpoint_path = None
 
 board.set_workload(workload)
 
-simulator = Simulator(
-    board=board,
-    on_exit_event={
-        # Here we want override the default behavior for the first m5 exit
-        # exit event. Instead of exiting the simulator, we just want to
-        # switch the processor. The 2nd 'm5 exit' after will revert to using
-        # default behavior where the simulator run will exit.
-        ExitEvent.EXIT: (func() for func in [processor.switch]),
-    },
-)
+if args.parallel_quantum is not None:
+    num_queues = enable_parallel_simulation(board, args.parallel_quantum)
+
+simulator_parameters = {
+    "board": board,
+    "checkpoint_path": checkpoint_path,
+    "on_exit_event": {ExitEvent.EXIT: exit_generator},
+}
+if args.profile:
+    # The profiler splits the run into phases at the exit events: the boot
+    # (or the restore from the boot checkpoint) up to the first `m5 exit`,
+    # then the command on the O3 cores.
+    simulator = ProfiledSimulator(
+        profile=args.profile,
+        heartbeat_ticks=args.heartbeat_ticks,
+        **simulator_parameters,
+    )
+    simulator.set_phase("restore" if checkpoint_path else "boot")
+else:
+    simulator = Simulator(**simulator_parameters)
+
+start_time = time.monotonic()
 simulator.run()
+
+if args.parallel_quantum is not None:
+    # A run restored from the boot checkpoint starts at its tick. The stats
+    # are not reset during the run, so the whole run is compared with the
+    # serial run.
+    start_tick = get_checkpoint_tick(checkpoint_path) if checkpoint_path else 0
+    simulated_ticks = m5.curTick() - start_tick
+    write_parallel_report(
+        Path(m5.options.outdir) / "parallel.json",
+        quantum=args.parallel_quantum,
+        num_queues=num_queues,
+        simulated_ticks=simulated_ticks,
+        region_ticks=simulated_ticks,
+        host_seconds=time.monotonic() - start_time,
+        serial_stats_file=args.serial_stats,
+    )
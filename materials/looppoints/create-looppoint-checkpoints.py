@@ -1,3 +1,6 @@
+import argparse
+import sys
+
 from gem5.simulate.exit_event import ExitEvent
 from gem5.simulate.simulator import Simulator
 from gem5.utils.requires import requires
@@ -7,20 +10,63 @@ from gem5.components.memory.single_channel import SingleChannelDDR3_1600
 from gem5.components.processors.simple_processor import SimpleProcessor
 from gem5.components.processors.cpu_types import CPUTypes
 from gem5.isas import ISA
-from gem5.resources.resource import obtain_resource
-from gem5.resources.looppoint import LooppointCsvLoader
 from pathlib import Path
 from gem5.simulate.exit_event_generators import (
     looppoint_save_checkpoint_generator,
 )
+import m5
+
+sys.path.append(
+    Path(__file__).resolve().parents[1].joinpath("tools").as_posix()
+)
+
+from checkpoint_format import pack_checkpoint
+from checkpoint_store import CheckpointStore
+from checkpoint_writer import CheckpointWriter
+from looppoint_index import IndexedLooppointCsvLoader
+from pc_tracking import PcCountExitTracker
+from resource_cache import ResourceCache
 
 requires(isa_required=ISA.X86)
 
+parser = argparse.ArgumentParser(
+    description="A script to take the LoopPoint region checkpoints."
+)
+
+parser.add_argument(
+    "--pinpoints-file",
+    type=Path,
+    default=Path("materials/looppoints/refs/looppoint-pinpoints.csv"),
+    help="The PinPoints CSV file of the LoopPoint regions.",
+)
+parser.add_argument(
+    "--packed-checkpoints",
+    action="store_true",
+    help="Store the checkpoints in the compact `m5.cpt.packed` format.",
+)
+parser.add_argument(
+    "--checkpoint-store",
+    type=Path,
+    help="Move the checkpoints into this deduplicating checkpoint store.",
+)
+parser.add_argument(
+    "--async-checkpoints",
+    type=int,
+    default=0,
+    help="Write up to this many checkpoints in the background, from forked "
+    "copies of the simulation, while the simulation carries on. By default, "
+    "the simulation stops while each checkpoint is written.",
+)
+args = parser.parse_args()
+
 # When taking a checkpoint, the cache state is not saved, so the cache
 # hierarchy can be changed completely when restoring from a checkpoint.
 # By using NoCache() to take checkpoints, it can slightly improve the
 # performance when running in atomic mode, and it will not put any restrictions
-# on what people can do with the checkpoints.
+# on what people can do with the checkpoints. The caches of the restored
+# hierarchy are warmed during each region's warmup instead, which
+# `restore-looppoint-checkpoint.py --functional-warmup` simulates on ATOMIC
+# cores.
 cache_hierarchy = NoCache()
 
 
@@ -45,39 +91,71 @@ board = SimpleBoard(
 )
 
 # Here we load the Pinpoint Looppoints CSV workload with the target binary and
-# input arguments.
+# input arguments. `IndexedLooppointCsvLoader` caches the parsed regions in a
+# sidecar file in gem5's resource directory and looks the regions up by their
+# start PC-count pair in constant time.
 board.set_se_looppoint_workload(
-    binary=obtain_resource("x86-matrix-multiply-omp"),
+    binary=ResourceCache().obtain("x86-matrix-multiply-omp"),
     arguments=[100, 8],
-    looppoint=LooppointCsvLoader(
-        pinpoints_file="materials/looppoints/refs/looppoint-pinpoints.csv"
-    ),
+    looppoint=IndexedLooppointCsvLoader(pinpoints_file=args.pinpoints_file),
 )
 
 # Here we specify where this script should output the checkpoints.
 dir = Path("checkpoint_outputs")
 dir.mkdir(exist_ok=True)
 
+# These are run on each checkpoint once it has been written.
+post_checkpoint = []
+# The packed format stores the page tables, file descriptors and TLB entries
+# as compressed arrays. Restoring from a packed checkpoint unpacks it first.
+if args.packed_checkpoints:
+    post_checkpoint.append(pack_checkpoint)
+# The checkpoint store keeps a single copy of the content shared between the
+# checkpoints, such as the page tables and most of the memory images.
+if args.checkpoint_store:
+    store = CheckpointStore(args.checkpoint_store)
+    post_checkpoint.append(
+        lambda checkpoint: store.add(checkpoint, remove=True)
+    )
+
+# With `--async-checkpoints`, the checkpoints are written by forked copies of
+# the simulation while the parent simulation carries on.
+checkpoint_writer = CheckpointWriter(
+    post_checkpoint=post_checkpoint, max_pending=args.async_checkpoints
+)
+
 # This code ensures that when a looppoint region begins (inclusive of warmup)
 # a checkpoint will be taken. It also updates our looppoint data structure.
+checkpoint_generator = checkpoint_writer.wrap(
+    looppoint_save_checkpoint_generator(
+        checkpoint_dir=dir,
+        looppoint=board.get_looppoint(),
+        # True if the relative PC count pairs should be updated during the
+        # simulation. Default as True.
+        update_relatives=True,
+        # True if the simulation loop should exit after all the PC count
+        # pairs in the LoopPoint data file have been encountered. Default
+        # as True.
+        exit_when_empty=True,
+    )
+)
+
+# This records the exit events at each region marker PC. The statistics are
+# written to `pc-count-exits.json` in the output directory.
+exit_tracker = PcCountExitTracker(
+    board.get_looppoint().get_targets(), board.get_looppoint().get_manager()
+)
+
 simulator = Simulator(
     board=board,
     on_exit_event={
-        ExitEvent.SIMPOINT_BEGIN: looppoint_save_checkpoint_generator(
-            checkpoint_dir=dir,
-            looppoint=board.get_looppoint(),
-            # True if the relative PC count pairs should be updated during the
-            # simulation. Default as True.
-            update_relatives=True,
-            # True if the simulation loop should exit after all the PC count
-            # pairs in the LoopPoint data file have been encountered. Default
-            # as True.
-            exit_when_empty=True,
-        )
+        ExitEvent.SIMPOINT_BEGIN: exit_tracker.wrap(checkpoint_generator)
     },
 )
 
 simulator.run()
+checkpoint_writer.wait()
+exit_tracker.write_stats(Path(m5.options.outdir) / "pc-count-exits.json")
 
 # Output the JSON file. To be used when restoring.
 board.get_looppoint().output_json_file("looppoint.json")
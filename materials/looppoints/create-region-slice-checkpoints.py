@@ -0,0 +1,208 @@
+import argparse
+import json
+import sys
+
+from gem5.simulate.exit_event import ExitEvent
+from gem5.simulate.simulator import Simulator
+from gem5.utils.requires import requires
+from gem5.components.cachehierarchies.classic.no_cache import NoCache
+from gem5.components.boards.simple_board import SimpleBoard
+from gem5.components.memory.single_channel import SingleChannelDDR3_1600
+from gem5.components.processors.simple_processor import SimpleProcessor
+from gem5.components.processors.cpu_types import CPUTypes
+from gem5.isas import ISA
+from pathlib import Path
+import m5
+from m5.objects import PcCountTrackerManager
+from m5.params import PcCountPair
+
+sys.path.append(
+    Path(__file__).resolve().parents[1].joinpath("tools").as_posix()
+)
+
+from checkpoint_format import prepare_checkpoint
+from pc_tracking import PcCountExitTracker, add_pc_trackers
+from resource_cache import ResourceCache
+
+requires(isa_required=ISA.X86)
+
+parser = argparse.ArgumentParser(
+    description="Split a LoopPoint region into contiguous slices, and take a "
+    "checkpoint at the start of each slice's warmup."
+)
+parser.add_argument(
+    "--region",
+    type=str,
+    default="1",
+    help="The region to split.",
+)
+parser.add_argument(
+    "--slices",
+    type=int,
+    default=4,
+    help="The number of slices.",
+)
+parser.add_argument(
+    "--slice-warmup",
+    type=float,
+    default=0.1,
+    help="The warmup of each slice, as a fraction of the slice.",
+)
+parser.add_argument(
+    "--looppoint-file",
+    type=Path,
+    default=Path("materials/looppoints/refs/looppoint.json"),
+    help="The LoopPoint JSON file output when taking the checkpoints.",
+)
+parser.add_argument(
+    "--checkpoint-dir",
+    type=Path,
+    default=Path("materials/looppoints/refs"),
+    help="The directory containing the `region-<id>-checkpoint` directories.",
+)
+args = parser.parse_args()
+
+if args.slices < 2:
+    parser.error("--slices must be at least 2.")
+if not 0 <= args.slice_warmup < 1:
+    parser.error("--slice-warmup must be at least 0 and less than 1.")
+
+with open(args.looppoint_file) as f:
+    regions = json.load(f)
+if args.region not in regions:
+    parser.error(f"Region '{args.region}' is not in '{args.looppoint_file}'.")
+region = regions[args.region]
+start = region["simulation"]["start"]
+end = region["simulation"]["end"]
+
+# The slice boundaries are counts of the region's marker PC, which LoopPoint
+# places at a loop header, so the slices are made of whole loop iterations
+# and the iterations are shared evenly between them.
+if start["pc"] != end["pc"]:
+    sys.exit(
+        f"Region {args.region} cannot be split: its start and end markers "
+        "are at different PCs."
+    )
+pc = start["pc"]
+boundaries = [
+    start["global"] + (end["global"] - start["global"]) * i // args.slices
+    for i in range(args.slices + 1)
+]
+if len(set(boundaries)) != len(boundaries):
+    sys.exit(f"Region {args.region} is too short for {args.slices} slices.")
+warmups = [
+    round(args.slice_warmup * (boundaries[i + 1] - boundaries[i]))
+    for i in range(args.slices)
+]
+
+# The PC counts restart from zero when a checkpoint is restored, so the
+# counts seen from the region's checkpoint are offset by the count at the
+# checkpoint.
+offset = start["global"] - start.get("relative", start["global"])
+
+checkpoint = args.checkpoint_dir / f"region-{args.region}-checkpoint"
+if not checkpoint.is_dir():
+    parser.error(f"There is no checkpoint for region {args.region}.")
+checkpoint = prepare_checkpoint(
+    checkpoint, Path(m5.options.outdir) / "checkpoint"
+)
+
+# As when taking the region checkpoints, the slices are fast-forwarded to on
+# ATOMIC cores without caches.
+cache_hierarchy = NoCache()
+
+memory = SingleChannelDDR3_1600(size="2GB")
+
+processor = SimpleProcessor(
+    cpu_type=CPUTypes.ATOMIC,
+    isa=ISA.X86,
+    num_cores=9,
+)
+
+board = SimpleBoard(
+    clk_freq="3GHz",
+    processor=processor,
+    memory=memory,
+    cache_hierarchy=cache_hierarchy,
+)
+
+board.set_se_binary_workload(
+    binary=ResourceCache().obtain("x86-matrix-multiply-omp"),
+    checkpoint=checkpoint,
+)
+
+# The region's own warmup is usually much longer than a slice's, and would
+# make the first slice the longest, so the first slice gets a short warmup
+# too. It cannot start before the region's checkpoint, though.
+warmups[0] = min(warmups[0], boundaries[0] - offset)
+
+# The start of the warmup of each slice, by the count seen from the region's
+# checkpoint. A slice starting at the region's checkpoint restores from it.
+slice_starts = {
+    boundaries[i] - warmups[i] - offset: i
+    for i in range(args.slices)
+    if boundaries[i] - warmups[i] > offset
+}
+targets = [PcCountPair(pc, count) for count in sorted(slice_starts)]
+manager = PcCountTrackerManager(targets=targets)
+add_pc_trackers(processor, targets, manager)
+exit_tracker = PcCountExitTracker(targets, manager)
+
+outdir = Path(m5.options.outdir)
+
+
+def get_slice_id(index: int) -> str:
+    return f"{args.region}.{index}"
+
+
+def save_slice_checkpoints():
+    pending = sorted(slice_starts)
+    while pending:
+        reached = exit_tracker.on_exit()
+        while reached and pending and pending[0] <= reached[1]:
+            index = slice_starts[pending.pop(0)]
+            print(f"Taking the checkpoint of slice {index}.")
+            simulator.save_checkpoint(
+                outdir / f"region-{get_slice_id(index)}-checkpoint"
+            )
+        yield not pending
+
+
+simulator = Simulator(
+    board=board,
+    on_exit_event={ExitEvent.SIMPOINT_BEGIN: save_slice_checkpoints()},
+)
+simulator.run()
+exit_tracker.write_stats(outdir / "pc-count-exits.json")
+if exit_tracker.get_num_pending():
+    sys.exit("The simulation ended before the start of every slice.")
+
+if boundaries[0] - warmups[0] == offset:
+    first_checkpoint = outdir / f"region-{get_slice_id(0)}-checkpoint"
+    if not first_checkpoint.exists():
+        first_checkpoint.symlink_to(checkpoint.resolve())
+
+# The slices are written as the regions of a LoopPoint JSON file, so
+# `restore-looppoint-checkpoint.py` can restore them. Each slice keeps the
+# region's multiplier.
+slices = {}
+for i in range(args.slices):
+    slice_start = {"pc": pc, "global": boundaries[i]}
+    slice_end = {"pc": pc, "global": boundaries[i + 1]}
+    checkpoint_count = boundaries[i] - warmups[i]
+    warmup = {
+        "start": {"pc": pc, "count": checkpoint_count},
+        "end": {"pc": pc, "count": boundaries[i]},
+    }
+    if "relative" in start:
+        slice_start["relative"] = slice_start["global"] - checkpoint_count
+        slice_end["relative"] = slice_end["global"] - checkpoint_count
+    slices[get_slice_id(i)] = {
+        "simulation": {"start": slice_start, "end": slice_end},
+        "multiplier": region["multiplier"],
+        **({"warmup": warmup} if warmups[i] else {}),
+        "slice": {"region": args.region, "index": i, "slices": args.slices},
+    }
+with open(outdir / "slices.json", "w") as f:
+    json.dump(slices, f, indent=4)
+print(f"{args.slices} slices of region {args.region} written to '{outdir}'.")
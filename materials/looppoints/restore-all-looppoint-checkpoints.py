@@ -0,0 +1,179 @@
+"""
+Restore every LoopPoint region in parallel.
+
+`restore-looppoint-checkpoint.py` simulates a single region per gem5
+invocation. This driver reads all the region IDs in the LoopPoint JSON file
+and launches one `restore-looppoint-checkpoint.py` gem5 process per region,
+keeping at most one process per host core busy. Each region gets its own
+output directory, `<outdir>/region-<id>`, and the driver stops the sweep as
+soon as one region fails.
+
+This script is run with the host python, not with gem5, from the root of
+this repository:
+
+```
+python3 materials/looppoints/restore-all-looppoint-checkpoints.py
+```
+
+Regions without a checkpoint in the checkpoint directory, or in the
+checkpoint store, are skipped. A
+`regions.json` file mapping each restored region to its `stats.txt` and
+multiplier is written to the output directory.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(
+    Path(__file__).resolve().parents[1].joinpath("tools").as_posix()
+)
+
+from checkpoint_store import CheckpointStore
+from gem5_jobs import (
+    Gem5Job,
+    Gem5JobError,
+    default_num_workers,
+    run_gem5_jobs,
+)
+
+parser = argparse.ArgumentParser(
+    description="Restore all the LoopPoint region checkpoints in parallel."
+)
+
+parser.add_argument(
+    "--gem5",
+    type=str,
+    default="gem5",
+    help="The gem5 binary used to restore the checkpoints.",
+)
+parser.add_argument(
+    "--looppoint-file",
+    type=Path,
+    default=Path("materials/looppoints/refs/looppoint.json"),
+    help="The LoopPoint JSON file listing the regions.",
+)
+parser.add_argument(
+    "--checkpoint-dir",
+    type=Path,
+    default=Path("materials/looppoints/refs"),
+    help="The directory containing the `region-<id>-checkpoint` directories.",
+)
+parser.add_argument(
+    "--checkpoint-store",
+    type=Path,
+    help="Restore the checkpoints from this checkpoint store instead of the "
+    "checkpoint directory.",
+)
+parser.add_argument(
+    "--regions",
+    type=str,
+    nargs="+",
+    help="Only restore these regions. By default, every region in the "
+    "LoopPoint JSON file is restored.",
+)
+parser.add_argument(
+    "--jobs",
+    type=int,
+    default=default_num_workers(),
+    help="The maximum number of regions simulated at the same time. "
+    "Defaults to the number of host cores.",
+)
+parser.add_argument(
+    "--outdir",
+    type=Path,
+    default=Path("m5out/looppoint-regions"),
+    help="The directory under which each region's gem5 output is written.",
+)
+parser.add_argument(
+    "--warmup",
+    choices=["detailed", "adaptive", "functional"],
+    default="detailed",
+    help="How each region's warmup is simulated: on TIMING cores, on TIMING "
+    "cores until the miss rates converge and then on ATOMIC cores, or on "
+    "ATOMIC cores.",
+)
+args = parser.parse_args()
+
+with open(args.looppoint_file) as f:
+    regions = json.load(f)
+
+region_ids = args.regions if args.regions else list(regions)
+for region_id in region_ids:
+    if region_id not in regions:
+        parser.error(
+            f"Region '{region_id}' is not in '{args.looppoint_file}'."
+        )
+
+if args.checkpoint_store:
+    store = CheckpointStore(args.checkpoint_store)
+    checkpoint_arguments = ["--checkpoint-store", args.checkpoint_store.resolve()]
+else:
+    checkpoint_arguments = ["--checkpoint-dir", args.checkpoint_dir.resolve()]
+if args.warmup != "detailed":
+    checkpoint_arguments.append(f"--{args.warmup}-warmup")
+
+
+def has_checkpoint(region_id: str) -> bool:
+    if args.checkpoint_store:
+        try:
+            store.find_region(region_id)
+        except KeyError:
+            return False
+        return True
+    return (args.checkpoint_dir / f"region-{region_id}-checkpoint").is_dir()
+
+
+jobs = []
+for region_id in region_ids:
+    if not has_checkpoint(region_id):
+        print(f"No checkpoint for region {region_id}, skipping it.")
+        continue
+    jobs.append(
+        Gem5Job(
+            name=region_id,
+            script=Path(__file__).with_name(
+                "restore-looppoint-checkpoint.py"
+            ),
+            outdir=args.outdir / f"region-{region_id}",
+            arguments=[
+                "--region",
+                region_id,
+                "--looppoint-file",
+                args.looppoint_file.resolve(),
+            ]
+            + checkpoint_arguments,
+        )
+    )
+
+if not jobs:
+    sys.exit("There are no region checkpoints to restore.")
+
+print(f"Restoring {len(jobs)} regions using up to {args.jobs} gem5 processes.")
+
+try:
+    durations = run_gem5_jobs(
+        jobs,
+        gem5=args.gem5,
+        max_workers=args.jobs,
+        cwd=Path(__file__).resolve().parents[2],
+    )
+except Gem5JobError as e:
+    sys.exit(str(e))
+
+results = {}
+for job in jobs:
+    if not job.get_stats_path().is_file():
+        sys.exit(f"Region {job.name} did not produce a `stats.txt` file.")
+    results[job.name] = {
+        "stats": job.get_stats_path().as_posix(),
+        "multiplier": regions[job.name]["multiplier"],
+        "host_seconds": durations[job.name],
+    }
+    print(f"Region {job.name} done in {durations[job.name]:.1f}s.")
+
+with open(args.outdir / "regions.json", "w") as f:
+    json.dump(results, f, indent=4)
+
+print(f"Region stats are listed in '{args.outdir / 'regions.json'}'.")
@@ -1,4 +1,6 @@
 import argparse
+import json
+import sys
 
 from gem5.simulate.exit_event import ExitEvent
 from gem5.simulate.simulator import Simulator
@@ -9,13 +11,28 @@ from gem5.components.cachehierarchies.classic.private_l1_private_l2_cache_hierar
 from gem5.components.boards.simple_board import SimpleBoard
 from gem5.components.memory import DualChannelDDR4_2400
 from gem5.components.processors.simple_processor import SimpleProcessor
+from gem5.components.processors.simple_switchable_processor import (
+    SimpleSwitchableProcessor,
+)
 from gem5.components.processors.cpu_types import CPUTypes
 from gem5.resources.looppoint import LooppointJsonLoader
 from gem5.isas import ISA
-from gem5.resources.resource import obtain_resource
+import m5
 from m5.stats import reset, dump
 from pathlib import Path
 
+sys.path.append(
+    Path(__file__).resolve().parents[1].joinpath("tools").as_posix()
+)
+
+from checkpoint_format import get_checkpoint_tick, prepare_checkpoint
+from checkpoint_store import CheckpointStore
+from pc_tracking import SwitchableLooppointJsonLoader
+from resource_cache import ResourceCache
+from sim_profiler import ProfiledSimulator
+from stat_sampler import ColumnarStatsDumper
+from warmup_monitor import WarmupMonitor
+
 requires(isa_required=ISA.X86)
 
 parser = argparse.ArgumentParser(description="An restore checkpoint script.")
@@ -24,12 +41,124 @@ parser.add_argument(
     "--region",
     type=str,
     required=False,
-    choices=("1", "2", "3"),
     default="1",
     help="The checkpoint region to restore from.",
 )
+parser.add_argument(
+    "--looppoint-file",
+    type=Path,
+    required=False,
+    default=Path("materials/looppoints/refs/looppoint.json"),
+    help="The LoopPoint JSON file output when taking the checkpoints.",
+)
+parser.add_argument(
+    "--checkpoint-dir",
+    type=Path,
+    required=False,
+    default=Path("materials/looppoints/refs"),
+    help="The directory containing the `region-<id>-checkpoint` directories.",
+)
+parser.add_argument(
+    "--checkpoint-store",
+    type=Path,
+    required=False,
+    help="Restore the region's checkpoint from this checkpoint store instead "
+    "of the checkpoint directory.",
+)
+parser.add_argument(
+    "--profile",
+    type=str,
+    required=False,
+    help="Log the host time, simulated ticks, instructions and memory use of "
+    "the warmup and of the region to this JSON Lines file in the output "
+    "directory.",
+)
+parser.add_argument(
+    "--heartbeat-ticks",
+    type=int,
+    required=False,
+    help="With --profile, also log them every this many simulated ticks.",
+)
+parser.add_argument(
+    "--adaptive-warmup",
+    action="store_true",
+    help="Simulate the warmup on TIMING cores only until the cache and TLB "
+    "miss rates converge, and the rest of it on ATOMIC cores. The warmup "
+    "used is written to `warmup.json` in the output directory.",
+)
+parser.add_argument(
+    "--warmup-window",
+    type=int,
+    default=10000000,
+    help="With --adaptive-warmup, the simulated ticks over which each miss "
+    "rate is measured.",
+)
+parser.add_argument(
+    "--warmup-tolerance",
+    type=float,
+    default=0.05,
+    help="With --adaptive-warmup, the relative change of the miss rates "
+    "from one window to the next under which they are stable.",
+)
+parser.add_argument(
+    "--max-detailed-warmup",
+    type=int,
+    required=False,
+    help="With --adaptive-warmup, switch to ATOMIC cores after this many "
+    "simulated ticks of warmup, even if the miss rates have not converged.",
+)
+parser.add_argument(
+    "--functional-warmup",
+    action="store_true",
+    help="Simulate the whole warmup on ATOMIC cores, which warm the caches "
+    "functionally, and switch to TIMING cores at the start of the region.",
+)
+parser.add_argument(
+    "--columnar-stats",
+    type=str,
+    required=False,
+    help="Write the stat dumps to this columnar file in the output "
+    "directory, one row group per dump, instead of to `stats.txt`. "
+    "`materials/tools/columnar-to-csv.py` prints it.",
+)
+parser.add_argument(
+    "--stats-filter",
+    type=str,
+    nargs="+",
+    default=["*"],
+    help="With --columnar-stats, glob patterns of the stats to write, e.g., "
+    "'simInsts' 'board.cache_hierarchy.l2caches*'. By default, all of them.",
+)
 args = parser.parse_args()
 
+if args.adaptive_warmup and args.heartbeat_ticks:
+    parser.error("--adaptive-warmup cannot be used with --heartbeat-ticks.")
+if args.stats_filter != ["*"] and not args.columnar_stats:
+    parser.error("--stats-filter requires --columnar-stats.")
+if args.adaptive_warmup and args.functional_warmup:
+    parser.error("--adaptive-warmup cannot be used with --functional-warmup.")
+
+if args.checkpoint_store:
+    # The checkpoint is reassembled from the store into the output directory.
+    store = CheckpointStore(args.checkpoint_store)
+    try:
+        region_checkpoint = store.find_region(args.region)
+    except KeyError as e:
+        parser.error(e.args[0])
+    checkpoint = store.restore(
+        region_checkpoint, Path(m5.options.outdir) / "checkpoint"
+    )
+else:
+    checkpoint = args.checkpoint_dir / f"region-{args.region}-checkpoint"
+    if not checkpoint.is_dir():
+        parser.error(f"There is no checkpoint for region {args.region}.")
+
+    # gem5 restores from the text `m5.cpt` file. If the checkpoint is in the
+    # packed format, it is unpacked into the output directory first.
+    checkpoint = prepare_checkpoint(
+        checkpoint, Path(m5.options.outdir) / "checkpoint"
+    )
+
 # The cache hierarchy can be different from the cache hierarchy used in taking
 # the checkpoints
 cache_hierarchy = PrivateL1PrivateL2CacheHierarchy(
@@ -42,14 +171,53 @@ cache_hierarchy = PrivateL1PrivateL2CacheHierarchy(
 # taking the checkpoints, but the size of the memory must be equal or larger.
 memory = DualChannelDDR4_2400(size="2GB")
 
-processor = SimpleProcessor(
-    cpu_type=CPUTypes.TIMING,
-    isa=ISA.X86,
-    # The number of cores must be equal or greater than that used when taking
-    # the checkpoint.
-    num_cores=9,
+# Load the Looppoint JSON here and specify the region. When the cores are
+# switched during the warmup, the region markers are tracked on every core.
+looppoint = (
+    SwitchableLooppointJsonLoader
+    if args.adaptive_warmup or args.functional_warmup
+    else LooppointJsonLoader
+)(
+    looppoint_file=args.looppoint_file,
+    region_id=args.region,
 )
 
+has_warmup = len(looppoint.get_targets()) > 1
+adaptive_warmup = args.adaptive_warmup and has_warmup
+functional_warmup = args.functional_warmup and has_warmup
+
+if adaptive_warmup:
+    # The warmup starts on the TIMING cores, and switches to the ATOMIC cores
+    # once the miss rates converge. The ATOMIC cores access the same caches,
+    # so they keep warming them up to the start of the region, where the
+    # TIMING cores are switched back in.
+    processor = SimpleSwitchableProcessor(
+        starting_core_type=CPUTypes.TIMING,
+        switch_core_type=CPUTypes.ATOMIC,
+        isa=ISA.X86,
+        num_cores=9,
+    )
+elif functional_warmup:
+    # The cache state is not saved in the checkpoint, so the caches are
+    # warmed by the ATOMIC cores, whose accesses go through the cache
+    # hierarchy above, whatever its geometry. This is much faster than a
+    # detailed warmup, but leaves the timing state, e.g., of the MSHRs and
+    # write buffers, cold.
+    processor = SimpleSwitchableProcessor(
+        starting_core_type=CPUTypes.ATOMIC,
+        switch_core_type=CPUTypes.TIMING,
+        isa=ISA.X86,
+        num_cores=9,
+    )
+else:
+    processor = SimpleProcessor(
+        cpu_type=CPUTypes.TIMING,
+        isa=ISA.X86,
+        # The number of cores must be equal or greater than that used when
+        # taking the checkpoint.
+        num_cores=9,
+    )
+
 board = SimpleBoard(
     clk_freq="3GHz",
     processor=processor,
@@ -57,35 +225,137 @@ board = SimpleBoard(
     cache_hierarchy=cache_hierarchy,
 )
 
-# Load the Looppoint JSON here and specify the region and the corresponding
-# checkpoint
 board.set_se_looppoint_workload(
-    binary=obtain_resource("x86-matrix-multiply-omp"),
-    looppoint=LooppointJsonLoader(
-        looppoint_file=Path("materials/looppoints/refs/looppoint.json"),
-        region_id=args.region,
-    ),
-    checkpoint=Path(
-        f"materials/looppoints/refs/region-{args.region}-checkpoint"
-    ),
+    binary=ResourceCache().obtain("x86-matrix-multiply-omp"),
+    looppoint=looppoint,
+    checkpoint=checkpoint,
 )
 
+# The simulation starts at the tick of the restored checkpoint.
+start_tick = get_checkpoint_tick(checkpoint)
+
+if adaptive_warmup:
+    warmup_monitor = WarmupMonitor(board, tolerance=args.warmup_tolerance)
+    warmup_monitor.start(tick=start_tick)
+    # Whether the simulation still exits every warmup window.
+    windows_running = True
+
+# With --columnar-stats, the stat dumps are written to a columnar file
+# instead of `stats.txt`.
+if args.columnar_stats:
+    columnar_stats = ColumnarStatsDumper(
+        Path(m5.options.outdir) / args.columnar_stats,
+        patterns=args.stats_filter,
+    )
+
+
+# Dump the stats to the columnar file with --columnar-stats, and to
+# `stats.txt` otherwise.
+def dump_stats():
+    if args.columnar_stats:
+        columnar_stats.dump()
+    else:
+        dump()
+
+
+# With --adaptive-warmup, the simulation first runs with a maximum of one
+# warmup window of ticks, so it exits every window. This generator measures
+# the miss rates of each window on the TIMING cores. Once they converge, or
+# the detailed warmup reaches its bound, it switches to the ATOMIC cores and
+# ends this first run.
+def check_warmup():
+    global windows_running
+    while True:
+        converged = warmup_monitor.update()
+        if converged or (
+            args.max_detailed_warmup is not None
+            and warmup_monitor.get_report()["detailed_warmup_ticks"]
+            >= args.max_detailed_warmup
+        ):
+            print(
+                "Warmup miss rates "
+                + ("converged" if converged else "did not converge")
+                + f" at tick {m5.curTick()}. Switching to ATOMIC cores."
+            )
+            warmup_monitor.stop()
+            processor.switch()
+            windows_running = False
+            if args.profile:
+                simulator.set_phase("atomic-warmup")
+            yield True
+        if args.profile:
+            simulator.set_phase("warmup")
+        yield False
+
+
 # This generator will dump the stats and exit the simulation loop when the
 # simulation region reaches its end. In the case there is a warmup interval,
 # the simulation stats are reset after the warmup is complete.
 def reset_and_dump():
-    if len(board.get_looppoint().get_targets()) > 1:
+    global windows_running
+    if has_warmup:
+        # With --adaptive-warmup, the first run ends at the latest here, so
+        # the region is simulated without exiting every window.
+        end_run = False
+        if adaptive_warmup:
+            end_run = windows_running
+            windows_running = False
+            atomic_warmup_ticks = 0
+            if warmup_monitor.stop_tick is None:
+                warmup_monitor.stop()
+            else:
+                # Switch back to the TIMING cores for the region.
+                atomic_warmup_ticks = m5.curTick() - warmup_monitor.stop_tick
+                processor.switch()
+            warmup_monitor.write_report(
+                Path(m5.options.outdir) / "warmup.json",
+                warmup_end_tick=m5.curTick(),
+                atomic_warmup_ticks=atomic_warmup_ticks,
+            )
+        elif functional_warmup:
+            # Switch to the TIMING cores for the region.
+            processor.switch()
+            atomic_warmup_ticks = m5.curTick() - start_tick
+            with open(Path(m5.options.outdir) / "warmup.json", "w") as f:
+                json.dump(
+                    {
+                        "start_tick": start_tick,
+                        "detailed_warmup_ticks": 0,
+                        "warmup_end_tick": m5.curTick(),
+                        "atomic_warmup_ticks": atomic_warmup_ticks,
+                    },
+                    f,
+                    indent=4,
+                )
         print("Warmup region ended. Resetting stats.")
         reset()
-        yield False
+        if args.profile:
+            simulator.set_phase("region")
+        yield end_run
     print("Region ended. Dumping stats.")
-    dump()
+    dump_stats()
     yield True
 
 
-simulator = Simulator(
-    board=board,
-    on_exit_event={ExitEvent.SIMPOINT_BEGIN: reset_and_dump()},
-)
+on_exit_event = {ExitEvent.SIMPOINT_BEGIN: reset_and_dump()}
+if adaptive_warmup:
+    on_exit_event[ExitEvent.MAX_TICK] = check_warmup()
+
+if args.profile:
+    simulator = ProfiledSimulator(
+        profile=args.profile,
+        heartbeat_ticks=args.heartbeat_ticks,
+        board=board,
+        on_exit_event=on_exit_event,
+    )
+    simulator.set_phase("warmup" if has_warmup else "region")
+else:
+    simulator = Simulator(board=board, on_exit_event=on_exit_event)
 
-simulator.run()
+if adaptive_warmup:
+    simulator.run(max_ticks=args.warmup_window)
+# The first run of --adaptive-warmup may also end with the workload.
+if not adaptive_warmup or not windows_running:
+    simulator.run()
+if args.columnar_stats:
+    columnar_stats.close()
@@ -0,0 +1,243 @@
+"""
+Simulate one long LoopPoint region as parallel slices.
+
+A region restored with `restore-looppoint-checkpoint.py` is simulated by a
+single gem5 process, from the start of its warmup to its end. This driver
+splits the region into contiguous slices, at counts of its marker PC, and
+simulates the slices in parallel:
+
+1. `create-region-slice-checkpoints.py` restores the region's checkpoint on
+   ATOMIC cores and takes a checkpoint at the start of each slice's warmup,
+   a fraction of the slice set by `--slice-warmup`. The slices are written
+   to `slices.json`, in the LoopPoint JSON format.
+2. Each slice is restored with `restore-looppoint-checkpoint.py` in a gem5
+   process of its own, keeping at most one process per host core busy.
+3. The slices' counters, e.g., the instructions, cycles and misses, are
+   summed into the region's, and the ratios, e.g., the IPC and miss rates,
+   are computed from the sums. The other stats, e.g., averages, are left
+   out.
+
+Like restore-all-looppoint-checkpoints.py, this script is run with the host
+python from the root of this repository:
+
+```
+python3 materials/looppoints/restore-region-slices.py --region 1 --slices 8
+```
+
+The slices start with caches only warmed by their own short warmup, instead
+of by the whole region before them, so their stats differ slightly from the
+region simulated in one piece. Given the stats of the whole region with
+`--reference-stats`, the relative error of the stitched ratios and
+simulated time is reported. The stitched stats are written to
+`stitched.json`, and the slices are listed in `regions.json`, with the
+region's multiplier, for `weighted-stats.py`. Requires NumPy.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(
+    Path(__file__).resolve().parents[1].joinpath("tools").as_posix()
+)
+
+from gem5_jobs import (
+    Gem5Job,
+    Gem5JobError,
+    default_num_workers,
+    run_gem5_jobs,
+)
+from m5stats import get_stat_dump, get_stat_units
+from region_stats import WeightedStatsAggregator, is_additive
+
+parser = argparse.ArgumentParser(
+    description="Simulate a LoopPoint region as slices in parallel."
+)
+parser.add_argument(
+    "--gem5",
+    type=str,
+    default="gem5",
+    help="The gem5 binary used to take and restore the checkpoints.",
+)
+parser.add_argument("--region", type=str, default="1")
+parser.add_argument(
+    "--slices",
+    type=int,
+    default=default_num_workers(),
+    help="The number of slices. Defaults to the number of host cores.",
+)
+parser.add_argument(
+    "--slice-warmup",
+    type=float,
+    default=0.1,
+    help="The warmup of each slice, as a fraction of the slice.",
+)
+parser.add_argument(
+    "--looppoint-file",
+    type=Path,
+    default=Path("materials/looppoints/refs/looppoint.json"),
+    help="The LoopPoint JSON file output when taking the checkpoints.",
+)
+parser.add_argument(
+    "--checkpoint-dir",
+    type=Path,
+    default=Path("materials/looppoints/refs"),
+    help="The directory containing the `region-<id>-checkpoint` directories.",
+)
+parser.add_argument(
+    "--warmup",
+    choices=["detailed", "adaptive", "functional"],
+    default="detailed",
+    help="How the warmup of each slice is simulated, as in "
+    "restore-all-looppoint-checkpoints.py.",
+)
+parser.add_argument(
+    "--jobs",
+    type=int,
+    default=default_num_workers(),
+    help="The maximum number of slices simulated at the same time.",
+)
+parser.add_argument(
+    "--reference-stats",
+    type=Path,
+    help="The `stats.txt` file of the whole region, restored with "
+    "`restore-looppoint-checkpoint.py`, to report the error of the slices.",
+)
+parser.add_argument(
+    "--outdir",
+    type=Path,
+    help="The output directory. Defaults to `m5out/region-<id>-slices`.",
+)
+args = parser.parse_args()
+
+outdir = args.outdir or Path(f"m5out/region-{args.region}-slices")
+checkpoint_dir = outdir / "checkpoints"
+root = Path(__file__).resolve().parents[2]
+start = time.monotonic()
+
+try:
+    durations = run_gem5_jobs(
+        [
+            Gem5Job(
+                name="checkpoints",
+                script=Path(__file__).with_name(
+                    "create-region-slice-checkpoints.py"
+                ),
+                outdir=checkpoint_dir,
+                arguments=[
+                    "--region",
+                    args.region,
+                    "--slices",
+                    args.slices,
+                    "--slice-warmup",
+                    args.slice_warmup,
+                    "--looppoint-file",
+                    args.looppoint_file.resolve(),
+                    "--checkpoint-dir",
+                    args.checkpoint_dir.resolve(),
+                ],
+            )
+        ],
+        gem5=args.gem5,
+        cwd=root,
+    )
+except Gem5JobError as e:
+    sys.exit(str(e))
+print(f"Slice checkpoints taken in {durations['checkpoints']:.1f}s.")
+
+slices_file = checkpoint_dir / "slices.json"
+with open(slices_file) as f:
+    slices = json.load(f)
+
+warmup_arguments = (
+    [] if args.warmup == "detailed" else [f"--{args.warmup}-warmup"]
+)
+jobs = [
+    Gem5Job(
+        name=slice_id,
+        script=Path(__file__).with_name("restore-looppoint-checkpoint.py"),
+        outdir=outdir / f"slice-{slices[slice_id]['slice']['index']}",
+        arguments=[
+            "--region",
+            slice_id,
+            "--looppoint-file",
+            slices_file.resolve(),
+            "--checkpoint-dir",
+            checkpoint_dir.resolve(),
+        ]
+        + warmup_arguments,
+    )
+    for slice_id in slices
+]
+print(f"Simulating {len(jobs)} slices using up to {args.jobs} processes.")
+try:
+    durations.update(
+        run_gem5_jobs(jobs, gem5=args.gem5, max_workers=args.jobs, cwd=root)
+    )
+except Gem5JobError as e:
+    sys.exit(str(e))
+
+# The counters of the region are the sums of the slices' counters.
+units = get_stat_units(jobs[0].get_stats_path())
+aggregator = WeightedStatsAggregator()
+regions = {}
+for job in jobs:
+    aggregator.add_region(
+        {
+            name: value
+            for name, value in get_stat_dump(job.get_stats_path()).items()
+            if is_additive(name, units.get(name))
+        },
+        1.0,
+    )
+    regions[job.name] = {
+        "stats": job.get_stats_path().as_posix(),
+        "multiplier": slices[job.name]["multiplier"],
+        "host_seconds": durations[job.name],
+    }
+with open(outdir / "regions.json", "w") as f:
+    json.dump(regions, f, indent=4)
+
+stats = {
+    name: total for name, (total, _, _) in aggregator.get_stats().items()
+}
+ratios = {
+    name: value for name, (value, _) in aggregator.get_ratios().items()
+}
+report = {
+    "region": args.region,
+    "slices": len(jobs),
+    "slice_warmup": args.slice_warmup,
+    "wall_seconds": time.monotonic() - start,
+    # The host time of the longest slice bounds the wall-clock time of the
+    # region with enough host cores.
+    "longest_slice_seconds": max(durations[job.name] for job in jobs),
+    "ratios": ratios,
+    "stats": stats,
+}
+print(
+    f"Region {args.region} simulated as {len(jobs)} slices in "
+    f"{report['wall_seconds']:.1f}s."
+)
+
+if args.reference_stats:
+    reference = WeightedStatsAggregator()
+    reference.add_stats_file(args.reference_stats, 1.0)
+    reference_ratios = {
+        name: value for name, (value, _) in reference.get_ratios().items()
+    }
+    reference_ratios["simTicks"] = reference.get_stats()["simTicks"][0]
+    ratios_and_ticks = {**ratios, "simTicks": stats["simTicks"]}
+    errors = {
+        name: (ratios_and_ticks[name] - value) / value
+        for name, value in reference_ratios.items()
+        if name in ratios_and_ticks and value
+    }
+    report["reference_errors"] = errors
+    for name, error in errors.items():
+        print(f"{name:<16} {error:+.2%} against the whole region")
+
+with open(outdir / "stitched.json", "w") as f:
+    json.dump(report, f, indent=4)
@@ -1,5 +1,12 @@
-from gem5.resources.resource import obtain_resource
+import sys
+from pathlib import Path
 
-resource = obtain_resource("riscv-disk-img")
+sys.path.append(Path(__file__).resolve().parent.joinpath("tools").as_posix())
+
+from resource_cache import ResourceCache
+
+# `ResourceCache` resolves the resource from its local index once it has been
+# downloaded, instead of looking it up in the gem5 resources database.
+resource = ResourceCache().obtain("riscv-disk-img")
 
 print(f"The resource is available at {resource.get_local_path()}")
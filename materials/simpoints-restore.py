@@ -9,12 +9,16 @@ from gem5.components.memory import DualChannelDDR4_2400
 from gem5.components.processors.simple_processor import SimpleProcessor
 from gem5.components.processors.cpu_types import CPUTypes
 from gem5.isas import ISA
-from gem5.resources.resource import SimpointResource, obtain_resource
 from gem5.resources.resource import SimpointResource
 from pathlib import Path
+import sys
 
 from m5.stats import reset, dump
 
+sys.path.append(Path(__file__).resolve().parent.joinpath("tools").as_posix())
+
+from resource_cache import ResourceCache
+
 requires(isa_required=ISA.X86)
 
 cache_hierarchy = PrivateL1PrivateL2CacheHierarchy(
@@ -39,7 +43,7 @@ board = SimpleBoard(
 )
 
 board.set_se_simpoint_workload(
-    binary=obtain_resource("x86-print-this"),
+    binary=ResourceCache().obtain("x86-print-this"),
     arguments=["print this", 15000],
     simpoint=SimpointResource(
         simpoint_interval=1000000,
@@ -0,0 +1,136 @@
+"""
+A cache of post-boot checkpoints for full-system runs.
+
+Booting the OS is the same simulated work for every run of a given kernel,
+disk image and board, whatever the run does afterwards. `BootCheckpointCache`
+takes a checkpoint at the first `m5 exit` after boot, stores it under a key
+derived from the board and workload configuration, and lets later runs with
+the same configuration restore from it instead of booting.
+
+The command to run after boot is passed through the readfile, which the
+guest reads once boot is complete. A checkpoint taken while the guest runs a
+given command would resume that command, so a run which boots instead reads
+a small stub: `m5 exit`, at which the checkpoint is taken, then a second
+`m5 readfile` to fetch the actual command. Once the checkpoint is taken, the
+host rewrites the readfile with the actual command. A run which restores
+resumes the stub right after its `m5 exit` and reads its own command.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Generator, Optional, Union
+
+from gem5.components.boards.abstract_board import AbstractBoard
+from gem5.resources.workload import AbstractWorkload
+
+import m5
+
+# Runs the command the host puts in the readfile once the boot checkpoint is
+# taken.
+_BOOT_STUB = "m5 exit;m5 readfile > /tmp/after-boot.sh;sh /tmp/after-boot.sh;"
+
+
+def _describe_resource(resource) -> Dict:
+    path = Path(resource.get_local_path()).resolve()
+    stat = path.stat()
+    return {
+        "path": path.as_posix(),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+class BootCheckpointCache:
+    def __init__(
+        self,
+        root: Union[str, Path],
+        board: AbstractBoard,
+        workload: AbstractWorkload,
+        extra_key: Optional[Dict] = None,
+    ):
+        """
+        :param root: The cache directory. It can be shared by concurrent
+        runs.
+        :param board: The board, before its workload is set.
+        :param workload: The kernel and disk image workload. Its
+        "readfile_contents" parameter is set by `set_command()`.
+        :param extra_key: Anything else the boot depends on, e.g., the
+        kernel arguments.
+        """
+        self._root = Path(root)
+        self._board = board
+        self._workload = workload
+        self._key = self._get_key(extra_key or {})
+        self._checkpoint = self._root / self._key
+        # Whether this run restores is decided once, as the guest's readfile
+        # depends on it.
+        self._restore = self._checkpoint.is_dir()
+
+    def _get_key(self, extra_key: Dict) -> str:
+        processor = self._board.get_processor()
+        memory = self._board.get_memory()
+        cache_hierarchy = self._board.get_cache_hierarchy()
+        parameters = self._workload.get_parameters()
+        config = {
+            "board": type(self._board).__name__,
+            "clock": str(self._board.clk_domain.clock),
+            "isa": processor.get_isa().value,
+            "processor": type(processor).__name__,
+            # The cores which boot, e.g., X86TimingSimpleCPU.
+            "cores": [
+                type(core.core).__name__ for core in processor.get_cores()
+            ],
+            "memory": type(memory).__name__,
+            "memory_size": memory.get_size(),
+            "cache_hierarchy": type(cache_hierarchy).__name__,
+            "kernel": _describe_resource(parameters["kernel"]),
+            "disk_image": _describe_resource(parameters["disk_image"]),
+            "stub": _BOOT_STUB,
+            "extra": extra_key,
+        }
+        return hashlib.sha256(
+            json.dumps(config, sort_keys=True).encode()
+        ).hexdigest()[:16]
+
+    def get_checkpoint(self) -> Optional[Path]:
+        """The cached boot checkpoint to restore, or None if there is none."""
+        return self._checkpoint if self._restore else None
+
+    def set_command(self, command: str) -> None:
+        """
+        Set the command the guest runs after boot. If the run boots, the
+        guest first runs the stub which lets the boot checkpoint be taken.
+        This must be called before the workload is set on the board.
+        """
+        self._command = command
+        self._workload.set_parameter(
+            "readfile_contents",
+            command if self.get_checkpoint() else _BOOT_STUB,
+        )
+
+    def _save_checkpoint(self) -> None:
+        self._root.mkdir(parents=True, exist_ok=True)
+        tmp = self._root / f".tmp-{self._key}-{os.getpid()}"
+        m5.checkpoint(tmp.as_posix())
+        try:
+            tmp.rename(self._checkpoint)
+        except OSError:
+            # Another run stored the same checkpoint first.
+            shutil.rmtree(tmp)
+
+    def wrap(self, generator: Generator) -> Generator:
+        """
+        Wrap the `ExitEvent.EXIT` generator of the run. If the run boots, the
+        first exit takes the boot checkpoint and hands the readfile over to
+        the actual command. All the other exits, and every exit of a run
+        which restores, go to the wrapped generator.
+        """
+        if not self._restore:
+            print("Taking the boot checkpoint.")
+            self._save_checkpoint()
+            Path(self._board.readfile).write_text(self._command)
+            yield False
+        yield from generator
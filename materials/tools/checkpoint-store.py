@@ -0,0 +1,61 @@
+"""
+Manage a deduplicating gem5 checkpoint store.
+
+```
+python3 materials/tools/checkpoint-store.py <store> add checkpoint_outputs/*/
+python3 materials/tools/checkpoint-store.py <store> restore <name> <directory>
+python3 materials/tools/checkpoint-store.py <store> list
+python3 materials/tools/checkpoint-store.py <store> remove <name>
+python3 materials/tools/checkpoint-store.py <store> gc
+```
+"""
+
+import argparse
+from pathlib import Path
+
+from checkpoint_store import CheckpointStore
+
+parser = argparse.ArgumentParser(
+    description="Add, restore and list checkpoints in a checkpoint store."
+)
+parser.add_argument("store", type=Path, help="The store directory.")
+commands = parser.add_subparsers(dest="command", required=True)
+
+add = commands.add_parser("add", help="Add checkpoint directories.")
+add.add_argument("checkpoints", type=Path, nargs="+")
+
+restore = commands.add_parser(
+    "restore", help="Reassemble a checkpoint into a directory."
+)
+restore.add_argument("name", type=str)
+restore.add_argument("directory", type=Path)
+
+commands.add_parser("list", help="List the checkpoints and the store usage.")
+
+remove = commands.add_parser("remove", help="Remove checkpoints.")
+remove.add_argument("names", type=str, nargs="+")
+
+commands.add_parser("gc", help="Delete the chunks no checkpoint uses.")
+
+args = parser.parse_args()
+store = CheckpointStore(args.store)
+
+if args.command == "add":
+    for checkpoint in args.checkpoints:
+        print(f"Added '{store.add(checkpoint)}'.")
+elif args.command == "restore":
+    print(store.restore(args.name, args.directory))
+elif args.command == "list":
+    for name in store.get_names():
+        print(name)
+    usage = store.get_usage()
+    print(
+        f"{usage['checkpoints']} checkpoints, "
+        f"{usage['logical_bytes']} bytes stored in "
+        f"{usage['stored_bytes']} bytes."
+    )
+elif args.command == "remove":
+    for name in args.names:
+        store.remove(name)
+else:
+    print(f"Freed {store.collect_garbage()} bytes.")
@@ -0,0 +1,399 @@
+"""
+A compact binary format for gem5's `m5.cpt` checkpoint files.
+
+An SE checkpoint's `m5.cpt` is an INI file made mostly of long runs of
+"<prefix>.Entry<N>" sections with the same keys: page table entries
+(`.ptable.Entry<N>`), file descriptors (`.fdarray.Entry<N>`) and TLB entries
+(`...mmu.dtb.Entry<N>`). The packed format, `m5.cpt.packed`, stores each such
+run as a table whose integer columns are packed 64-bit arrays and whose other
+columns are string lists. All other sections are kept as text. Every table
+and text block is compressed separately and listed in an index at the end of
+the file, so a single section can be read by seeking to its block, without
+decompressing the rest of the file.
+
+gem5 itself can only restore from `m5.cpt`, so `prepare_checkpoint()`
+writes the text file back, byte for byte, before a restore.
+
+File layout:
+
+```
+b"GEM5PCPT" | u32 version | block 0 | ... | block N | index | u64 offset
+```
+
+Each block and the JSON index are zlib-compressed. The final 8 bytes hold
+the offset of the index.
+"""
+
+import array
+import json
+import mmap
+import re
+import shutil
+import struct
+import sys
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+MAGIC = b"GEM5PCPT"
+VERSION = 1
+PACKED_NAME = "m5.cpt.packed"
+TEXT_NAME = "m5.cpt"
+
+_ENTRY_SECTION = re.compile(r"^(?P<prefix>.*)\.Entry(?P<entry>\d+)$")
+_INT64_MIN = -(2**63)
+_UINT64_MAX = 2**64 - 1
+
+# A parsed section: its name, its (key, value) pairs and its raw text.
+_Section = Tuple[str, List[Tuple[str, str]], str]
+
+
+def _split_sections(text: str) -> Tuple[str, List[_Section]]:
+    """Split an `m5.cpt` file into its preamble and its sections."""
+    first = re.search(r"(?m)^\[", text)
+    if first is None:
+        return text, []
+    preamble, body = text[: first.start()], text[first.start() :]
+
+    sections = []
+    for raw in re.split(r"(?m)^(?=\[)", body):
+        if not raw:
+            continue
+        header, _, rest = raw.partition("\n")
+        items = []
+        for line in rest.splitlines():
+            if line:
+                key, _, value = line.partition("=")
+                items.append((key, value))
+        sections.append((header[1:-1], items, raw))
+    return preamble, sections
+
+
+def _render_section(name: str, items: List[Tuple[str, str]]) -> str:
+    return f"[{name}]\n" + "".join(f"{k}={v}\n" for k, v in items) + "\n"
+
+
+def _pack_column(values: List[str]) -> Tuple[str, bytes]:
+    """Pack a column as signed or unsigned 64-bit integers, if possible."""
+    try:
+        ints = [int(value) for value in values]
+    except ValueError:
+        ints = None
+    if ints is not None and all(
+        str(i) == value for i, value in zip(ints, values)
+    ):
+        if min(ints) >= 0 and max(ints) <= _UINT64_MAX:
+            typecode = "Q"
+        elif min(ints) >= _INT64_MIN and max(ints) < 2**63:
+            typecode = "q"
+        else:
+            typecode = None
+        if typecode:
+            packed = array.array(typecode, ints)
+            if sys.byteorder != "little":
+                packed.byteswap()
+            return typecode, packed.tobytes()
+    return "s", "\0".join(values).encode()
+
+
+def _unpack_column(typecode: str, data: bytes, count: int) -> List[str]:
+    if typecode == "s":
+        return data.decode().split("\0") if count else []
+    values = array.array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return [str(value) for value in values]
+
+
+def _iter_blocks(sections: List[_Section]) -> Iterator[Dict]:
+    """
+    Group consecutive sections into blocks. A run of entry sections with the
+    same prefix and keys becomes a table block. Everything else goes in text
+    blocks.
+    """
+    text = []
+
+    def text_block():
+        block = {
+            "kind": "text",
+            "sections": [name for name, _, _ in text],
+            "data": "".join(raw for _, _, raw in text).encode(),
+        }
+        text.clear()
+        return block
+
+    i = 0
+    while i < len(sections):
+        name, items, raw = sections[i]
+        match = _ENTRY_SECTION.match(name)
+        keys = [key for key, _ in items]
+        run_end = i
+        if match and raw == _render_section(name, items):
+            prefix = match.group("prefix")
+            while run_end + 1 < len(sections):
+                n_name, n_items, n_raw = sections[run_end + 1]
+                n_match = _ENTRY_SECTION.match(n_name)
+                if (
+                    not n_match
+                    or n_match.group("prefix") != prefix
+                    or [key for key, _ in n_items] != keys
+                    or n_raw != _render_section(n_name, n_items)
+                ):
+                    break
+                run_end += 1
+
+        # Short runs are not worth a table.
+        if run_end - i < 3:
+            text.append(sections[i])
+            i += 1
+            continue
+
+        if text:
+            yield text_block()
+        run = sections[i : run_end + 1]
+        entries = [
+            int(_ENTRY_SECTION.match(section[0]).group("entry"))
+            for section in run
+        ]
+        columns = [
+            _pack_column([s[1][column][1] for s in run])
+            for column in range(len(keys))
+        ]
+        entry_type, entry_data = _pack_column([str(e) for e in entries])
+        yield {
+            "kind": "table",
+            "prefix": prefix,
+            "keys": keys,
+            "count": len(run),
+            "first_entry": entries[0],
+            "last_entry": entries[-1],
+            "types": [entry_type] + [column[0] for column in columns],
+            "lengths": [len(entry_data)] + [len(c[1]) for c in columns],
+            "data": entry_data + b"".join(data for _, data in columns),
+        }
+        i = run_end + 1
+
+    if text:
+        yield text_block()
+
+
+def pack_checkpoint(
+    checkpoint_dir: Union[str, Path], remove_text: bool = True
+) -> Path:
+    """
+    Pack a checkpoint directory's `m5.cpt` into `m5.cpt.packed`.
+
+    The packed file is verified to unpack to the original `m5.cpt` before
+    the text file is removed. Other files in the directory, such as memory
+    images, are left untouched.
+
+    :param checkpoint_dir: The checkpoint directory.
+    :param remove_text: Remove `m5.cpt` once it has been packed.
+
+    :returns: The path to the packed file.
+    """
+    checkpoint_dir = Path(checkpoint_dir)
+    text = (checkpoint_dir / TEXT_NAME).read_text()
+    preamble, sections = _split_sections(text)
+
+    packed_path = checkpoint_dir / PACKED_NAME
+    index = {"preamble": preamble, "blocks": []}
+    with open(packed_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", VERSION))
+        for block in _iter_blocks(sections):
+            data = zlib.compress(block.pop("data"))
+            block["offset"] = f.tell()
+            block["size"] = len(data)
+            index["blocks"].append(block)
+            f.write(data)
+        index_offset = f.tell()
+        f.write(zlib.compress(json.dumps(index).encode()))
+        f.write(struct.pack("<Q", index_offset))
+
+    with PackedCheckpoint(packed_path) as packed:
+        if packed.to_text() != text:
+            packed_path.unlink()
+            raise ValueError(
+                f"'{checkpoint_dir / TEXT_NAME}' could not be packed "
+                "losslessly."
+            )
+    if remove_text:
+        (checkpoint_dir / TEXT_NAME).unlink()
+    return packed_path
+
+
+class PackedCheckpoint:
+    """
+    A read-only view of an `m5.cpt.packed` file.
+
+    The file is memory-mapped and only the blocks holding the requested
+    sections are decompressed.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"'{path}' is not a packed gem5 checkpoint.")
+        (version,) = struct.unpack_from("<I", self._map, len(MAGIC))
+        if version != VERSION:
+            raise ValueError(
+                f"'{path}' has packed checkpoint version {version}, "
+                f"expected {VERSION}."
+            )
+        (index_offset,) = struct.unpack_from(
+            "<Q", self._map, len(self._map) - 8
+        )
+        self._index = json.loads(
+            zlib.decompress(self._map[index_offset : len(self._map) - 8])
+        )
+
+    def __enter__(self) -> "PackedCheckpoint":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def _read_block(self, block: Dict) -> bytes:
+        start = block["offset"]
+        return zlib.decompress(self._map[start : start + block["size"]])
+
+    def _iter_block_sections(
+        self, block: Dict
+    ) -> Iterator[Tuple[str, List[Tuple[str, str]]]]:
+        data = self._read_block(block)
+        if block["kind"] == "text":
+            for name, items, _ in _split_sections(data.decode())[1]:
+                yield name, items
+            return
+
+        columns = []
+        offset = 0
+        for typecode, length in zip(block["types"], block["lengths"]):
+            columns.append(
+                _unpack_column(
+                    typecode, data[offset : offset + length], block["count"]
+                )
+            )
+            offset += length
+        entries, values = columns[0], columns[1:]
+        for row, entry in enumerate(entries):
+            yield f"{block['prefix']}.Entry{entry}", [
+                (key, column[row])
+                for key, column in zip(block["keys"], values)
+            ]
+
+    def get_section_names(self) -> Iterator[str]:
+        """Iterate over the section names, in file order."""
+        for block in self._index["blocks"]:
+            if block["kind"] == "text":
+                yield from block["sections"]
+            else:
+                yield from (
+                    name for name, _ in self._iter_block_sections(block)
+                )
+
+    def get_section(self, name: str) -> Optional[Dict[str, str]]:
+        """
+        Return the keys and values of the first section called `name`, or
+        None if there is no such section. Only the block holding the section
+        is decompressed.
+        """
+        match = _ENTRY_SECTION.match(name)
+        for block in self._index["blocks"]:
+            if block["kind"] == "text":
+                if name not in block["sections"]:
+                    continue
+            elif not (
+                match
+                and match.group("prefix") == block["prefix"]
+                and block["first_entry"]
+                <= int(match.group("entry"))
+                <= block["last_entry"]
+            ):
+                continue
+            for section, items in self._iter_block_sections(block):
+                if section == name:
+                    return dict(items)
+        return None
+
+    def to_text(self) -> str:
+        """Return the original `m5.cpt` text."""
+        parts = [self._index["preamble"]]
+        for block in self._index["blocks"]:
+            if block["kind"] == "text":
+                parts.append(self._read_block(block).decode())
+            else:
+                parts.extend(
+                    _render_section(name, items)
+                    for name, items in self._iter_block_sections(block)
+                )
+        return "".join(parts)
+
+
+def is_packed_checkpoint(checkpoint_dir: Union[str, Path]) -> bool:
+    checkpoint_dir = Path(checkpoint_dir)
+    return (checkpoint_dir / PACKED_NAME).is_file() and not (
+        checkpoint_dir / TEXT_NAME
+    ).is_file()
+
+
+def prepare_checkpoint(
+    checkpoint_dir: Union[str, Path], unpack_dir: Union[str, Path]
+) -> Path:
+    """
+    Return a checkpoint directory gem5 can restore from.
+
+    A checkpoint which has an `m5.cpt` file is returned as is. A packed
+    checkpoint is unpacked into `unpack_dir`: `m5.cpt` is written there and
+    the checkpoint's other files, such as memory images, are symlinked.
+
+    :param checkpoint_dir: The checkpoint directory, packed or not.
+    :param unpack_dir: Where to unpack a packed checkpoint.
+    """
+    checkpoint_dir = Path(checkpoint_dir)
+    if not is_packed_checkpoint(checkpoint_dir):
+        return checkpoint_dir
+
+    unpack_dir = Path(unpack_dir)
+    if unpack_dir.exists():
+        shutil.rmtree(unpack_dir)
+    unpack_dir.mkdir(parents=True)
+    with PackedCheckpoint(checkpoint_dir / PACKED_NAME) as packed:
+        (unpack_dir / TEXT_NAME).write_text(packed.to_text())
+    for path in checkpoint_dir.iterdir():
+        if path.name != PACKED_NAME:
+            (unpack_dir / path.name).symlink_to(path.resolve())
+    return unpack_dir
+
+
+def get_checkpoint_tick(checkpoint_dir: Union[str, Path]) -> int:
+    """
+    Return the tick a checkpoint was taken at, from its `Globals` section.
+    A simulation restored from the checkpoint starts at this tick.
+
+    :param checkpoint_dir: The checkpoint directory, packed or not.
+    """
+    checkpoint_dir = Path(checkpoint_dir)
+    if is_packed_checkpoint(checkpoint_dir):
+        with PackedCheckpoint(checkpoint_dir / PACKED_NAME) as packed:
+            section = packed.get_section("Globals") or {}
+        if "curTick" in section:
+            return int(section["curTick"])
+    else:
+        with open(checkpoint_dir / TEXT_NAME) as f:
+            in_globals = False
+            for line in f:
+                line = line.strip()
+                if line.startswith("["):
+                    if in_globals:
+                        break
+                    in_globals = line == "[Globals]"
+                elif in_globals and line.startswith("curTick="):
+                    return int(line[len("curTick=") :])
+    raise Exception(f"The checkpoint '{checkpoint_dir}' has no curTick.")
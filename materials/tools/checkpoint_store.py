@@ -0,0 +1,254 @@
+"""
+A content-addressed, deduplicating store for gem5 checkpoints.
+
+Checkpoints of the same workload share most of their content: the VMA list,
+the page and file descriptor tables and most of physical memory. The store
+splits every checkpoint file into chunks, names each chunk by the SHA-256 of
+its content and keeps a single compressed copy of each chunk, whichever
+checkpoint it came from. A checkpoint is then just a manifest listing the
+chunks of each of its files.
+
+- `m5.cpt` is split on section boundaries. A chunk ends after a section whose
+  hash has its low bits clear, so chunk boundaries depend on content rather
+  than on offsets and identical runs of sections dedup even when the
+  sections before them differ. Packed checkpoints are stored as text.
+- Memory images are decompressed and split into fixed-size chunks, aligned
+  with guest physical memory. All-zero chunks are not stored at all and are
+  restored as holes in a sparse file. gem5 reads uncompressed memory images
+  as well as gzipped ones, so restored images are left uncompressed.
+
+Layout of a store directory:
+
+```
+objects/<first two hex digits>/<sha256>   zlib-compressed chunks
+checkpoints/<name>.json                   one manifest per checkpoint
+```
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+from checkpoint_format import (
+    PACKED_NAME,
+    TEXT_NAME,
+    PackedCheckpoint,
+    is_packed_checkpoint,
+)
+
+# Memory images are split into chunks of this size.
+MEMORY_CHUNK_SIZE = 64 * 1024
+# A section ends an `m5.cpt` chunk if the low bits of its hash are clear. With
+# 5 bits, chunks hold 32 sections on average.
+_SECTION_BOUNDARY_MASK = (1 << 5) - 1
+# The largest `m5.cpt` chunk, in bytes.
+_MAX_TEXT_CHUNK_SIZE = 256 * 1024
+_ZERO_CHUNK = "zero"
+_GZIP_MAGIC = b"\x1f\x8b"
+_REGION = re.compile(
+    r"region[-_.]?(?P<region>\w+?)(?:[-_.]checkpoint)?$", re.IGNORECASE
+)
+
+
+def _iter_text_chunks(text: str) -> Iterator[bytes]:
+    chunk = []
+    size = 0
+    for section in re.split(r"(?m)^(?=\[)", text):
+        data = section.encode()
+        chunk.append(data)
+        size += len(data)
+        digest = hashlib.sha256(data).digest()
+        if (
+            digest[-1] & _SECTION_BOUNDARY_MASK == 0
+            or size >= _MAX_TEXT_CHUNK_SIZE
+        ):
+            yield b"".join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b"".join(chunk)
+
+
+def _iter_binary_chunks(path: Path) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        compressed = f.read(2) == _GZIP_MAGIC
+    with (gzip.open if compressed else open)(path, "rb") as f:
+        while True:
+            chunk = f.read(MEMORY_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+class CheckpointStore:
+    """
+    A checkpoint store rooted at a directory. Several processes may add and
+    restore checkpoints concurrently: chunks and manifests are written to
+    temporary files and renamed into place.
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self._root = Path(root)
+        self._objects = self._root / "objects"
+        self._manifests = self._root / "checkpoints"
+        self._objects.mkdir(parents=True, exist_ok=True)
+        self._manifests.mkdir(parents=True, exist_ok=True)
+
+    def _object_path(self, digest: str) -> Path:
+        return self._objects / digest[:2] / digest
+
+    def _write_atomically(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _put_chunk(self, chunk: bytes) -> str:
+        if not chunk.strip(b"\0") and len(chunk) == MEMORY_CHUNK_SIZE:
+            return _ZERO_CHUNK
+        digest = hashlib.sha256(chunk).hexdigest()
+        path = self._object_path(digest)
+        if not path.exists():
+            self._write_atomically(path, zlib.compress(chunk))
+        return digest
+
+    def _get_chunk(self, digest: str) -> bytes:
+        return zlib.decompress(self._object_path(digest).read_bytes())
+
+    def add(
+        self,
+        checkpoint_dir: Union[str, Path],
+        name: Optional[str] = None,
+        remove: bool = False,
+    ) -> str:
+        """
+        Add a checkpoint directory to the store.
+
+        :param checkpoint_dir: The checkpoint directory. It may be packed.
+        :param name: The name of the checkpoint in the store. Defaults to the
+        name of the directory.
+        :param remove: Delete the checkpoint directory once it is stored.
+
+        :returns: The name of the checkpoint in the store.
+        """
+        checkpoint_dir = Path(checkpoint_dir)
+        name = name or checkpoint_dir.name
+        files = {}
+        sizes = {}
+        for path in sorted(checkpoint_dir.iterdir()):
+            if path.name == TEXT_NAME:
+                chunks = _iter_text_chunks(path.read_text())
+            elif path.name == PACKED_NAME:
+                if not is_packed_checkpoint(checkpoint_dir):
+                    continue
+                with PackedCheckpoint(path) as packed:
+                    text = packed.to_text()
+                chunks = _iter_text_chunks(text)
+                path = path.with_name(TEXT_NAME)
+            elif path.is_file():
+                chunks = _iter_binary_chunks(path)
+            else:
+                continue
+            files[path.name] = []
+            sizes[path.name] = 0
+            for chunk in chunks:
+                files[path.name].append(self._put_chunk(chunk))
+                sizes[path.name] += len(chunk)
+
+        self._write_atomically(
+            self._manifests / f"{name}.json",
+            json.dumps({"files": files, "sizes": sizes}).encode(),
+        )
+        if remove:
+            shutil.rmtree(checkpoint_dir)
+        return name
+
+    def get_names(self) -> List[str]:
+        return sorted(path.stem for path in self._manifests.glob("*.json"))
+
+    def find_region(self, region_id: Union[int, str]) -> str:
+        """
+        Return the name of the checkpoint of a LoopPoint region, such as
+        "region-1-checkpoint" or "cpt.Region1".
+        """
+        for name in self.get_names():
+            match = _REGION.search(name)
+            if match and match.group("region") == str(region_id):
+                return name
+        raise KeyError(f"There is no checkpoint for region {region_id}.")
+
+    def _get_manifest(self, name: str) -> Dict:
+        path = self._manifests / f"{name}.json"
+        if not path.is_file():
+            raise KeyError(f"There is no checkpoint named '{name}'.")
+        return json.loads(path.read_text())
+
+    def restore(self, name: str, dest: Union[str, Path]) -> Path:
+        """
+        Reassemble a checkpoint into a directory gem5 can restore from.
+
+        :param name: The name of the checkpoint in the store.
+        :param dest: The directory to write. It is replaced if it exists.
+        """
+        files = self._get_manifest(name)["files"]
+        dest = Path(dest)
+        if dest.exists():
+            shutil.rmtree(dest)
+        dest.mkdir(parents=True)
+        for filename, chunks in files.items():
+            with open(dest / filename, "wb") as f:
+                for digest in chunks:
+                    if digest == _ZERO_CHUNK:
+                        f.seek(MEMORY_CHUNK_SIZE, os.SEEK_CUR)
+                    else:
+                        f.write(self._get_chunk(digest))
+                f.truncate()
+        return dest
+
+    def remove(self, name: str) -> None:
+        """Remove a checkpoint. Its chunks are freed by `collect_garbage()`."""
+        self._get_manifest(name)
+        (self._manifests / f"{name}.json").unlink()
+
+    def collect_garbage(self) -> int:
+        """
+        Delete the chunks no checkpoint refers to. This must not run while
+        checkpoints are being added.
+
+        :returns: The number of bytes freed.
+        """
+        live = set()
+        for name in self.get_names():
+            for chunks in self._get_manifest(name)["files"].values():
+                live.update(chunks)
+        freed = 0
+        for path in self._objects.glob("*/*"):
+            if path.name not in live:
+                freed += path.stat().st_size
+                path.unlink()
+        return freed
+
+    def get_usage(self) -> Dict[str, int]:
+        """
+        Return the number of checkpoints, the total size of their files and
+        the size of the stored chunks, in bytes.
+        """
+        logical = sum(
+            sum(self._get_manifest(name)["sizes"].values())
+            for name in self.get_names()
+        )
+        stored = sum(path.stat().st_size for path in self._objects.glob("*/*"))
+        return {
+            "checkpoints": len(self.get_names()),
+            "logical_bytes": logical,
+            "stored_bytes": stored,
+        }
+
@@ -0,0 +1,112 @@
+"""
+Asynchronous checkpoint writing for gem5's checkpointing exit event
+generators.
+
+`save_checkpoint_generator` and `looppoint_save_checkpoint_generator` call
+`m5.checkpoint()`, which stops the simulation until the whole checkpoint has
+been serialized to disk. A `CheckpointWriter` wraps such a generator and
+intercepts its `m5.checkpoint()` calls. With `max_pending` set, each
+checkpoint is written by a child process forked with `m5.fork()`: the child
+holds a copy-on-write snapshot of the simulator, writes the checkpoint and
+exits, while the parent goes straight back to simulating.
+
+A writer thread in the same process is not an option: gem5 must stay drained
+while a checkpoint is serialized, so the simulation could not continue
+alongside it.
+
+The writer can also run functions on each checkpoint once it is on disk,
+such as packing it or moving it into a checkpoint store. With forked
+writers, these run in the child too.
+"""
+
+import os
+import traceback
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import m5
+
+
+class CheckpointWriter:
+    def __init__(
+        self,
+        post_checkpoint: Optional[List[Callable[[Path], None]]] = None,
+        max_pending: int = 0,
+    ):
+        """
+        :param post_checkpoint: Functions called with the checkpoint
+        directory once each checkpoint is written.
+        :param max_pending: The maximum number of checkpoints being written
+        in the background at any time. If 0, checkpoints are written
+        synchronously. When the limit is reached, the simulation waits for
+        the oldest checkpoint to be written.
+        """
+        self._post_checkpoint = post_checkpoint or []
+        self._max_pending = max_pending
+        self._pending = []
+        self._checkpoint = m5.checkpoint
+        if max_pending:
+            # `m5.fork()` refuses to fork a simulator with open listeners.
+            m5.disableAllListeners()
+
+    def _write(self, checkpoint_dir: str) -> None:
+        self._checkpoint(checkpoint_dir)
+        for function in self._post_checkpoint:
+            function(Path(checkpoint_dir))
+
+    def _fork_write(self, checkpoint_dir: str) -> None:
+        while len(self._pending) >= self._max_pending:
+            self._reap(self._pending[0])
+
+        # The child's output files go to a subdirectory of the parent's.
+        pid = m5.fork(simout="%(parent)s/checkpoint-writer.%(fork_seq)i")
+        if pid == 0:
+            status = 0
+            try:
+                self._write(checkpoint_dir)
+            except BaseException:
+                traceback.print_exc()
+                status = 1
+            # Skip the exit handlers, such as the final stats dump.
+            os._exit(status)
+        self._pending.append(pid)
+
+    def _reap(self, pid: int, block: bool = True) -> bool:
+        reaped, status = os.waitpid(pid, 0 if block else os.WNOHANG)
+        if reaped == 0:
+            return False
+        self._pending.remove(pid)
+        if not os.WIFEXITED(status) or os.WEXITSTATUS(status) != 0:
+            raise Exception(
+                f"The checkpoint writer process {pid} failed. Its output is "
+                f"in '{m5.options.outdir}/checkpoint-writer.*'."
+            )
+        return True
+
+    def wait(self) -> None:
+        """Wait until all the checkpoints have been written."""
+        while self._pending:
+            self._reap(self._pending[0])
+
+    def wrap(self, generator):
+        """
+        Wrap a checkpointing exit event generator.
+
+        The checkpoints are all written by the time the wrapped generator
+        exits the simulation loop. If the loop is exited by another exit
+        event, call `wait()` before using the checkpoints.
+        """
+        checkpoint = self._fork_write if self._max_pending else self._write
+        while True:
+            for pid in list(self._pending):
+                self._reap(pid, block=False)
+            m5.checkpoint = checkpoint
+            try:
+                exit_on_completion = next(generator)
+            except StopIteration:
+                return
+            finally:
+                m5.checkpoint = self._checkpoint
+            if exit_on_completion:
+                self.wait()
+            yield exit_on_completion
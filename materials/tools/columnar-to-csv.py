@@ -0,0 +1,61 @@
+"""
+Print a columnar stats file as CSV, one row per sample. Columns wider than 1,
+such as vectors and histograms, are split into one CSV column per entry,
+named "<stat>[<index>]".
+
+```
+python3 materials/tools/columnar-to-csv.py m5out/timeline.cols
+```
+"""
+
+import argparse
+import csv
+import sys
+from fnmatch import fnmatch
+from pathlib import Path
+
+from columnar import ColumnarFile
+
+parser = argparse.ArgumentParser(description="Convert a columnar file to CSV.")
+parser.add_argument("file", type=Path)
+parser.add_argument(
+    "--columns",
+    type=str,
+    nargs="+",
+    default=["*"],
+    help="Glob patterns of the columns to print. By default, all of them.",
+)
+parser.add_argument(
+    "--list", action="store_true", help="List the columns and their widths."
+)
+args = parser.parse_args()
+
+try:
+    table = ColumnarFile(args.file)
+except (OSError, ValueError) as e:
+    sys.exit(str(e))
+
+names = [
+    name
+    for name in table.get_names()
+    if any(fnmatch(name, pattern) for pattern in args.columns)
+]
+if args.list:
+    for name in names:
+        print(f"{name} {table.get_width(name)}")
+    sys.exit()
+
+header = []
+for name in names:
+    width = table.get_width(name)
+    header += [name] if width == 1 else [f"{name}[{i}]" for i in range(width)]
+
+writer = csv.writer(sys.stdout)
+writer.writerow(header)
+for row in range(table.num_rows):
+    values = table.get_row(row)
+    line = []
+    for name in names:
+        value = values[name]
+        line += value if isinstance(value, list) else [value]
+    writer.writerow(line)
@@ -0,0 +1,213 @@
+"""
+A compact, append-only columnar file format for time series of gem5 stats.
+
+A columnar file holds a table with a fixed set of columns, each of a fixed
+width: 1 for a scalar stat, the number of entries or buckets for a vector or
+a histogram. The column names are written once, in a dictionary record at
+the start of the file. Rows are then buffered and written in row groups, in
+which each column is a contiguous array of little-endian 64-bit values.
+Every record is compressed separately, so a file can be read while it is
+still being written, and a truncated final record is ignored.
+
+File layout:
+
+```
+b"GEM5COLS" | u32 version | record | record | ...
+```
+
+Each record is a one-byte kind, the u32 length of its zlib-compressed
+payload, then the payload. The dictionary record, kind "D", is a JSON list
+of `{"name", "width", "type"}` columns. A row group record, kind "R", is the
+u32 number of rows followed by the array of each column, in dictionary order.
+"""
+
+import array
+import json
+import struct
+import sys
+import zlib
+from pathlib import Path
+from typing import Dict, List, Sequence, Union
+
+MAGIC = b"GEM5COLS"
+VERSION = 1
+
+_DICTIONARY = b"D"
+_ROW_GROUP = b"R"
+# Columns are either 64-bit floats or 64-bit signed integers.
+_TYPES = ("d", "q")
+
+
+class ColumnarWriter:
+    """
+    Write rows to a columnar file.
+
+    The rows are buffered and written as a row group every `rows_per_group`
+    rows, and when the writer is closed.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        columns: Sequence[Dict],
+        rows_per_group: int = 64,
+    ):
+        """
+        :param path: The file to write. It is replaced if it exists.
+        :param columns: The columns, as dictionaries with a "name", and
+        optionally a "width", defaulting to 1, and a "type", "d" for floats,
+        the default, or "q" for integers.
+        :param rows_per_group: The number of rows in each row group.
+        """
+        self._columns = [
+            {
+                "name": column["name"],
+                "width": column.get("width", 1),
+                "type": column.get("type", "d"),
+            }
+            for column in columns
+        ]
+        for column in self._columns:
+            if column["type"] not in _TYPES:
+                raise ValueError(
+                    f"Column '{column['name']}' has unknown type "
+                    f"'{column['type']}'."
+                )
+        self._rows_per_group = rows_per_group
+        self._buffers = [array.array(c["type"]) for c in self._columns]
+        self._num_buffered = 0
+        self._file = open(path, "wb")
+        self._file.write(MAGIC + struct.pack("<I", VERSION))
+        self._write_record(_DICTIONARY, json.dumps(self._columns).encode())
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _write_record(self, kind: bytes, payload: bytes) -> None:
+        data = zlib.compress(payload)
+        self._file.write(kind + struct.pack("<I", len(data)) + data)
+
+    def write_row(self, row: Sequence[Union[float, Sequence[float]]]) -> None:
+        """
+        Add a row, with a value for each column, in column order. Values of
+        columns wider than 1 are sequences of that length.
+        """
+        if len(row) != len(self._columns):
+            raise ValueError(
+                f"Expected {len(self._columns)} values, got {len(row)}."
+            )
+        for column, buffer, value in zip(self._columns, self._buffers, row):
+            if column["width"] == 1:
+                buffer.append(value)
+            elif len(value) == column["width"]:
+                buffer.extend(value)
+            else:
+                raise ValueError(
+                    f"Column '{column['name']}' has width {column['width']}, "
+                    f"got {len(value)} values."
+                )
+        self._num_buffered += 1
+        if self._num_buffered >= self._rows_per_group:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered rows as a row group."""
+        if not self._num_buffered:
+            return
+        payload = [struct.pack("<I", self._num_buffered)]
+        for buffer in self._buffers:
+            if sys.byteorder != "little":
+                buffer.byteswap()
+            payload.append(buffer.tobytes())
+        self._write_record(_ROW_GROUP, b"".join(payload))
+        self._file.flush()
+        self._buffers = [array.array(c["type"]) for c in self._columns]
+        self._num_buffered = 0
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class ColumnarFile:
+    """Read a whole columnar file, possibly still being written."""
+
+    def __init__(self, path: Union[str, Path]):
+        data = Path(path).read_bytes()
+        if data[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"'{path}' is not a gem5 columnar file.")
+        (version,) = struct.unpack_from("<I", data, len(MAGIC))
+        if version != VERSION:
+            raise ValueError(
+                f"'{path}' has columnar version {version}, expected "
+                f"{VERSION}."
+            )
+
+        self._columns = None
+        self._data = None
+        self.num_rows = 0
+        offset = len(MAGIC) + 4
+        while offset + 5 <= len(data):
+            kind = data[offset : offset + 1]
+            (length,) = struct.unpack_from("<I", data, offset + 1)
+            if offset + 5 + length > len(data):
+                break
+            payload = zlib.decompress(data[offset + 5 : offset + 5 + length])
+            offset += 5 + length
+            if kind == _DICTIONARY:
+                self._columns = json.loads(payload)
+                self._data = [array.array(c["type"]) for c in self._columns]
+            elif kind == _ROW_GROUP:
+                self._read_row_group(payload)
+        if self._columns is None:
+            raise ValueError(f"'{path}' has no column dictionary.")
+
+    def _read_row_group(self, payload: bytes) -> None:
+        (num_rows,) = struct.unpack_from("<I", payload)
+        offset = 4
+        for column, values in zip(self._columns, self._data):
+            column_values = array.array(column["type"])
+            size = num_rows * column["width"] * column_values.itemsize
+            column_values.frombytes(payload[offset : offset + size])
+            if sys.byteorder != "little":
+                column_values.byteswap()
+            values.extend(column_values)
+            offset += size
+        self.num_rows += num_rows
+
+    def get_names(self) -> List[str]:
+        return [column["name"] for column in self._columns]
+
+    def get_width(self, name: str) -> int:
+        return self._columns[self.get_names().index(name)]["width"]
+
+    def get_column(self, name: str) -> Union[List[float], List[List[float]]]:
+        """
+        Return a column's values, one per row. The values of columns wider
+        than 1 are lists.
+        """
+        index = self.get_names().index(name)
+        width = self._columns[index]["width"]
+        values = self._data[index]
+        if width == 1:
+            return values.tolist()
+        return [
+            values[row * width : (row + 1) * width].tolist()
+            for row in range(self.num_rows)
+        ]
+
+    def get_row(self, row: int) -> Dict[str, Union[float, List[float]]]:
+        result = {}
+        for column, values in zip(self._columns, self._data):
+            width = column["width"]
+            if width == 1:
+                result[column["name"]] = values[row]
+            else:
+                result[column["name"]] = values[
+                    row * width : (row + 1) * width
+                ].tolist()
+        return result
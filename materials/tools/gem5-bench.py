@@ -0,0 +1,152 @@
+"""
+Run the benchmark suite of `gem5_bench.py` with a gem5 build and compare the
+builds' host throughput.
+
+Run the default benchmarks five times with a gem5 build, labelled with the
+gem5 revision it was built from, then compare it against a baseline build:
+
+```
+python3 materials/tools/gem5-bench.py run --gem5 /gem5/build/ALL/gem5.fast \
+    --label cd35c9a6 --repeat 5
+python3 materials/tools/gem5-bench.py compare --label <new revision> \
+    --baseline cd35c9a6
+```
+
+`compare` exits with status 1 if any benchmark is significantly slower than
+with the baseline build.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from gem5_bench import (
+    BENCHMARKS,
+    METRICS,
+    BenchmarkHistory,
+    compare_builds,
+    get_benchmarks,
+    get_build_label,
+    run_benchmark,
+)
+from gem5_jobs import Gem5JobError
+
+parser = argparse.ArgumentParser(
+    description="Benchmark gem5 builds on the tutorial configs."
+)
+parser.add_argument(
+    "--database",
+    type=Path,
+    default=Path("m5out/benchmarks/history.sqlite"),
+    help="The SQLite database the results of every build are kept in.",
+)
+subparsers = parser.add_subparsers(dest="command", required=True)
+
+run_parser = subparsers.add_parser("run", help="Run the benchmarks.")
+run_parser.add_argument("--gem5", type=str, default="gem5")
+run_parser.add_argument(
+    "--label",
+    type=str,
+    help="The label of the gem5 build, e.g., its gem5 revision. Defaults to "
+    "the binary's name and a hash of its contents.",
+)
+run_parser.add_argument(
+    "--benchmarks",
+    type=str,
+    nargs="+",
+    choices=[b.name for b in BENCHMARKS],
+    help="The benchmarks to run. By default, those which run quickly with "
+    "downloadable resources.",
+)
+run_parser.add_argument(
+    "--all", action="store_true", help="Run all the benchmarks."
+)
+run_parser.add_argument(
+    "--repeat",
+    type=int,
+    default=3,
+    help="The number of times each benchmark is run. At least two runs of "
+    "each build are needed to compare builds.",
+)
+run_parser.add_argument(
+    "--outdir",
+    type=Path,
+    default=Path("m5out/benchmarks"),
+    help="The directory under which each benchmark run's output is written.",
+)
+
+compare_parser = subparsers.add_parser(
+    "compare", help="Compare a build against a baseline build."
+)
+compare_parser.add_argument(
+    "--label",
+    type=str,
+    help="The build to compare. Defaults to the last build run.",
+)
+compare_parser.add_argument("--baseline", type=str, required=True)
+compare_parser.add_argument(
+    "--metric", type=str, choices=METRICS, default="host_seconds"
+)
+compare_parser.add_argument(
+    "--alpha",
+    type=float,
+    default=0.05,
+    help="The significance level of the t-test.",
+)
+compare_parser.add_argument(
+    "--min-change",
+    type=float,
+    default=0.02,
+    help="The smallest relative change reported as a regression.",
+)
+args = parser.parse_args()
+
+args.database.parent.mkdir(parents=True, exist_ok=True)
+history = BenchmarkHistory(args.database)
+
+if args.command == "run":
+    benchmarks = get_benchmarks(args.benchmarks, include_all=args.all)
+    label = args.label or get_build_label(args.gem5)
+    for benchmark in benchmarks:
+        for repetition in range(args.repeat):
+            outdir = args.outdir / label / benchmark.name / str(repetition)
+            try:
+                result = run_benchmark(benchmark, args.gem5, outdir)
+            except Gem5JobError as e:
+                sys.exit(str(e))
+            history.add_result(label, args.gem5, benchmark.name, result)
+            mips = result["mips"]
+            print(
+                f"{benchmark.name} #{repetition}: "
+                f"{result['host_seconds']:.2f}s, "
+                f"{result['peak_rss_mib']:.0f} MiB"
+                + (f", {mips:.2f} MIPS" if mips else "")
+            )
+    print(f"Results of '{label}' added to '{args.database}'.")
+    sys.exit()
+
+labels = history.get_labels()
+label = args.label or (labels[-1] if labels else None)
+for name in (label, args.baseline):
+    if name not in labels:
+        sys.exit(f"There are no results for '{name}' in '{args.database}'.")
+
+comparisons = compare_builds(
+    history,
+    label,
+    args.baseline,
+    metric=args.metric,
+    alpha=args.alpha,
+    min_change=args.min_change,
+)
+print(f"{args.metric} of '{label}' against '{args.baseline}':")
+print(f"{'benchmark':<22}{'baseline':>12}{'mean':>12}{'change':>9}{'p':>8}")
+for c in comparisons:
+    p_value = f"{c.p_value:.3f}" if c.p_value is not None else "-"
+    print(
+        f"{c.benchmark:<22}{c.baseline_mean:>12.3f}{c.mean:>12.3f}"
+        f"{c.change:>+9.1%}{p_value:>8}"
+        + ("  REGRESSION" if c.regression else "")
+    )
+if any(c.regression for c in comparisons):
+    sys.exit(1)
@@ -0,0 +1,387 @@
+"""
+A benchmark suite over the tutorial configs, for tracking the host
+throughput of gem5 builds.
+
+Each benchmark is one of the repository's configs run with fixed, short
+inputs. gem5 seeds its random number generators with a fixed seed, so each
+benchmark simulates exactly the same work on every run and only the host
+cost changes between gem5 builds. The benchmarks are run one at a time, so
+they do not compete for the host, and each run's host time, peak memory and
+simulated instructions are stored in a SQLite history database, labelled
+with the gem5 build they were run with.
+
+Builds are compared with Welch's t-test on the repetitions of each
+benchmark, so that a slowdown is only flagged when it stands out of the
+host's run-to-run noise.
+"""
+
+import hashlib
+import math
+import os
+import shutil
+import sqlite3
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+
+from gem5_jobs import Gem5Job, Gem5JobError
+from m5stats import iter_stat_dumps
+
+_REPOSITORY = Path(__file__).resolve().parents[2]
+_MATERIALS = _REPOSITORY / "materials"
+_REFS = _MATERIALS / "looppoints" / "refs"
+
+
+class Benchmark(NamedTuple):
+    name: str
+    script: Path
+    arguments: List[str] = []
+    # Whether the benchmark is run by default. The others take too long, or
+    # need resources which cannot be downloaded, to be run on every build.
+    default: bool = True
+
+
+BENCHMARKS = [
+    Benchmark("se-hello-world", _MATERIALS / "complete" / "hello-world.py"),
+    Benchmark(
+        "simpoints-checkpoint",
+        _MATERIALS / "complete" / "simpoints-checkpoint.py",
+    ),
+    Benchmark(
+        "looppoint-restore",
+        _MATERIALS / "looppoints" / "restore-looppoint-checkpoint.py",
+        [
+            "--region",
+            "1",
+            "--looppoint-file",
+            (_REFS / "looppoint.json").as_posix(),
+            "--checkpoint-dir",
+            _REFS.as_posix(),
+        ],
+    ),
+    Benchmark(
+        "ddr3-traffic", _MATERIALS / "complete" / "traffic-generator.py"
+    ),
+    Benchmark(
+        "hbm2-traffic",
+        _MATERIALS / "complete" / "traffic-generator-hbm2stack.py",
+    ),
+    Benchmark(
+        "looppoint-create",
+        _MATERIALS / "looppoints" / "create-looppoint-checkpoints.py",
+        [
+            "--pinpoints-file",
+            (_REFS / "looppoint-pinpoints.csv").as_posix(),
+        ],
+        default=False,
+    ),
+    # The ELFie binary is not a gem5 resource and must be in the root of
+    # the repository.
+    Benchmark(
+        "elfie",
+        _REPOSITORY / "elfie-refs" / "elfie.py",
+        [
+            "--elfie",
+            (
+                _REPOSITORY
+                / "cactuBSSN-s.1_1_globalr2"
+                / "cactuBSSN-s.1_1_globalr2.sim.elfie"
+            ).as_posix(),
+        ],
+        default=False,
+    ),
+    Benchmark(
+        "x86-full-system",
+        _MATERIALS / "complete" / "x86-full-system.py",
+        default=False,
+    ),
+]
+
+
+def get_benchmarks(
+    names: Optional[Iterable[str]] = None, include_all: bool = False
+) -> List[Benchmark]:
+    """
+    Return the benchmarks with the given names, or the default benchmarks
+    (all the benchmarks if `include_all` is True).
+    """
+    if names is None:
+        return [b for b in BENCHMARKS if include_all or b.default]
+    benchmarks = {b.name: b for b in BENCHMARKS}
+    for name in names:
+        if name not in benchmarks:
+            raise KeyError(f"There is no benchmark '{name}'.")
+    return [benchmarks[name] for name in names]
+
+
+def get_build_label(gem5: str) -> str:
+    """A label identifying a gem5 binary by the hash of its contents."""
+    path = Path(shutil.which(gem5) or gem5)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(2**20), b""):
+            digest.update(chunk)
+    return f"{path.name}-{digest.hexdigest()[:12]}"
+
+
+def run_benchmark(
+    benchmark: Benchmark, gem5: str, outdir: Union[str, Path]
+) -> Dict[str, Optional[float]]:
+    """
+    Run a benchmark once, with gem5's output in `outdir`, which is emptied
+    first. The benchmark runs from `outdir` too, so the files the configs
+    write to their working directory, e.g., the checkpoints of
+    simpoints-checkpoint.py, stay out of the repository.
+
+    :returns: The host wall-clock, user and system time of the gem5 process,
+    in seconds, its peak resident memory, in MiB, the simulated instructions
+    and ticks from its last stat dump and its simulated MIPS (none if it
+    simulates no instructions).
+    """
+    job = Gem5Job(
+        benchmark.name,
+        benchmark.script,
+        Path(outdir).resolve(),
+        benchmark.arguments,
+    )
+    # The outputs of an earlier run in the same directory are removed, so
+    # that the configs do not pick them up, e.g., as existing checkpoints.
+    shutil.rmtree(job.outdir, ignore_errors=True)
+    job.outdir.mkdir(parents=True)
+    # The inputs of the benchmarks are given as absolute paths, and so is a
+    # gem5 binary given by its path.
+    if os.sep in gem5:
+        gem5 = Path(gem5).resolve().as_posix()
+    with open(job.get_log_path(), "w") as log:
+        start = time.monotonic()
+        process = subprocess.Popen(
+            job.get_command(gem5),
+            cwd=job.outdir,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        # The resource usage of this process alone, unlike RUSAGE_CHILDREN.
+        _, status, usage = os.wait4(process.pid, 0)
+        host_seconds = time.monotonic() - start
+    # Popen would otherwise try to reap the process again.
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        raise Gem5JobError(job, process.returncode)
+
+    last_dump = {}
+    if job.get_stats_path().is_file():
+        for dump in iter_stat_dumps(job.get_stats_path()):
+            last_dump = dump
+    sim_insts = last_dump.get("simInsts", 0)
+    return {
+        "host_seconds": host_seconds,
+        "user_seconds": usage.ru_utime,
+        "sys_seconds": usage.ru_stime,
+        # `ru_maxrss` is in KiB on Linux.
+        "peak_rss_mib": usage.ru_maxrss / 2**10,
+        "sim_insts": sim_insts,
+        "final_tick": last_dump.get("finalTick"),
+        "mips": sim_insts / host_seconds / 1e6 if sim_insts else None,
+    }
+
+
+METRICS = [
+    "host_seconds",
+    "user_seconds",
+    "sys_seconds",
+    "peak_rss_mib",
+    "sim_insts",
+    "final_tick",
+    "mips",
+]
+
+
+class BenchmarkHistory:
+    """The benchmark results of every build, in a SQLite database."""
+
+    def __init__(self, path: Union[str, Path]):
+        self._db = sqlite3.connect(Path(path).as_posix())
+        columns = ", ".join(f"{metric} REAL" for metric in METRICS)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results (time REAL, label TEXT, "
+            f"gem5 TEXT, benchmark TEXT, {columns})"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS results_label ON results "
+            "(label, benchmark)"
+        )
+        self._db.commit()
+
+    def add_result(
+        self,
+        label: str,
+        gem5: str,
+        benchmark: str,
+        result: Dict[str, Optional[float]],
+    ) -> None:
+        placeholders = ", ".join("?" for _ in METRICS)
+        self._db.execute(
+            f"INSERT INTO results VALUES (?, ?, ?, ?, {placeholders})",
+            [time.time(), label, gem5, benchmark]
+            + [result.get(metric) for metric in METRICS],
+        )
+        self._db.commit()
+
+    def get_labels(self) -> List[str]:
+        """The build labels, from the least to the most recently run."""
+        return [
+            label
+            for label, in self._db.execute(
+                "SELECT label FROM results GROUP BY label ORDER BY MAX(time)"
+            )
+        ]
+
+    def get_benchmarks(self, label: str) -> List[str]:
+        return [
+            name
+            for name, in self._db.execute(
+                "SELECT DISTINCT benchmark FROM results WHERE label = ? "
+                "ORDER BY benchmark",
+                (label,),
+            )
+        ]
+
+    def get_samples(
+        self, label: str, benchmark: str, metric: str = "host_seconds"
+    ) -> List[float]:
+        if metric not in METRICS:
+            raise KeyError(f"There is no metric '{metric}'.")
+        return [
+            value
+            for value, in self._db.execute(
+                f"SELECT {metric} FROM results WHERE label = ? AND "
+                f"benchmark = ? AND {metric} IS NOT NULL",
+                (label, benchmark),
+            )
+        ]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def _betacf(a: float, b: float, x: float) -> float:
+    # The continued fraction of the incomplete beta function, evaluated with
+    # the modified Lentz method.
+    tiny = 1e-300
+    c = 1.0
+    d = 1.0 - (a + b) * x / (a + 1.0)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        for numerator in (
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1.0) < 1e-12:
+            break
+    return h
+
+
+def _betainc(a: float, b: float, x: float) -> float:
+    """The regularized incomplete beta function I_x(a, b)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    front = math.exp(
+        math.lgamma(a + b)
+        - math.lgamma(a)
+        - math.lgamma(b)
+        + a * math.log(x)
+        + b * math.log(1.0 - x)
+    )
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * _betacf(a, b, x) / a
+    return 1.0 - front * _betacf(b, a, 1.0 - x) / b
+
+
+def welch_t_test(
+    samples: List[float], baseline: List[float]
+) -> Optional[float]:
+    """
+    The two-sided p-value of Welch's t-test of the difference between the
+    means of two samples, or None if either has fewer than two values.
+    """
+    if len(samples) < 2 or len(baseline) < 2:
+        return None
+    mean_a = sum(samples) / len(samples)
+    mean_b = sum(baseline) / len(baseline)
+    var_a = sum((x - mean_a) ** 2 for x in samples) / (len(samples) - 1)
+    var_b = sum((x - mean_b) ** 2 for x in baseline) / (len(baseline) - 1)
+    se_a = var_a / len(samples)
+    se_b = var_b / len(baseline)
+    if se_a + se_b == 0:
+        return 1.0 if mean_a == mean_b else 0.0
+    t = (mean_a - mean_b) / math.sqrt(se_a + se_b)
+    df = (se_a + se_b) ** 2 / (
+        se_a**2 / (len(samples) - 1) + se_b**2 / (len(baseline) - 1)
+    )
+    return _betainc(df / 2, 0.5, df / (df + t * t))
+
+
+class Comparison(NamedTuple):
+    benchmark: str
+    baseline_mean: float
+    mean: float
+    # The relative change of the mean, e.g., 0.1 for 10% slower.
+    change: float
+    p_value: Optional[float]
+    regression: bool
+
+
+def compare_builds(
+    history: BenchmarkHistory,
+    label: str,
+    baseline: str,
+    metric: str = "host_seconds",
+    alpha: float = 0.05,
+    min_change: float = 0.02,
+) -> List[Comparison]:
+    """
+    Compare a build's results against a baseline build's, for every
+    benchmark both were run on.
+
+    :param metric: The metric to compare. Higher is worse, except for
+    "mips".
+    :param alpha: The significance level of the t-test.
+    :param min_change: The smallest relative change flagged as a
+    regression, however significant.
+    """
+    comparisons = []
+    baseline_benchmarks = set(history.get_benchmarks(baseline))
+    for benchmark in history.get_benchmarks(label):
+        if benchmark not in baseline_benchmarks:
+            continue
+        samples = history.get_samples(label, benchmark, metric)
+        baseline_samples = history.get_samples(baseline, benchmark, metric)
+        if not samples or not baseline_samples:
+            continue
+        mean = sum(samples) / len(samples)
+        baseline_mean = sum(baseline_samples) / len(baseline_samples)
+        change = (mean - baseline_mean) / baseline_mean
+        worse = -change if metric == "mips" else change
+        p_value = welch_t_test(samples, baseline_samples)
+        comparisons.append(
+            Comparison(
+                benchmark,
+                baseline_mean,
+                mean,
+                change,
+                p_value,
+                p_value is not None
+                and p_value < alpha
+                and worse >= min_change,
+            )
+        )
+    return comparisons
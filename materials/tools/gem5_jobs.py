@@ -0,0 +1,163 @@
+"""
+Helpers for running many independent gem5 simulations from one host-side
+driver script.
+
+gem5 can only instantiate one simulation per process, so sweeps over regions
+or configurations are run as separate gem5 processes. The helpers here keep a
+bounded number of them alive at once (by default one per host core), give
+each its own output directory and stop the whole batch as soon as one of them
+fails.
+"""
+
+import os
+import subprocess
+import time
+from concurrent.futures import (
+    ALL_COMPLETED,
+    FIRST_EXCEPTION,
+    ThreadPoolExecutor,
+    wait,
+)
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Union
+
+
+class Gem5Job:
+    """
+    A single gem5 invocation: a config script, its arguments and the output
+    directory gem5 should write `stats.txt`, `config.ini`, etc. to.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        script: Union[str, Path],
+        outdir: Union[str, Path],
+        arguments: Optional[List[str]] = None,
+    ):
+        self.name = name
+        self.script = Path(script).resolve()
+        self.outdir = Path(outdir).resolve()
+        self.arguments = [str(arg) for arg in (arguments or [])]
+
+    def get_command(self, gem5: str) -> List[str]:
+        return [
+            gem5,
+            f"--outdir={self.outdir.as_posix()}",
+            self.script.as_posix(),
+        ] + self.arguments
+
+    def get_log_path(self) -> Path:
+        return self.outdir / "gem5.log"
+
+    def get_stats_path(self) -> Path:
+        return self.outdir / "stats.txt"
+
+
+class Gem5JobError(Exception):
+    """Raised when a gem5 job exits with a non-zero status."""
+
+    def __init__(self, job: Gem5Job, returncode: int):
+        self.job = job
+        self.returncode = returncode
+        super().__init__(
+            f"gem5 job '{job.name}' failed with exit status {returncode}. "
+            f"See '{job.get_log_path()}' for its output."
+        )
+
+
+def default_num_workers() -> int:
+    """The number of host cores this process is allowed to run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def run_gem5_jobs(
+    jobs: Iterable[Gem5Job],
+    gem5: str = "gem5",
+    max_workers: Optional[int] = None,
+    cwd: Optional[Union[str, Path]] = None,
+    fail_fast: bool = True,
+) -> Dict[str, float]:
+    """
+    Run gem5 jobs in parallel, at most `max_workers` at a time.
+
+    Each job's stdout and stderr are written to `gem5.log` in its output
+    directory.
+
+    :param jobs: The jobs to run.
+    :param gem5: The gem5 binary to run the jobs with.
+    :param max_workers: The maximum number of concurrent gem5 processes. By
+    default, one per available host core.
+    :param cwd: The working directory of the gem5 processes. The tutorial
+    configs resolve their input files relative to the repository root.
+    :param fail_fast: If True, the first failing job terminates every other
+    running job and raises a `Gem5JobError`. If False, all the jobs are run
+    to completion and the error of the first job to fail is raised at the
+    end.
+
+    :returns: The host wall-clock time, in seconds, taken by each job, keyed
+    by job name.
+    """
+    jobs = list(jobs)
+    if max_workers is None:
+        max_workers = default_num_workers()
+
+    running = {}
+    running_lock = Lock()
+    stopping = False
+    # The errors of the failed jobs, in the order the jobs failed.
+    failures = []
+
+    def run_job(job: Gem5Job) -> float:
+        job.outdir.mkdir(parents=True, exist_ok=True)
+        with open(job.get_log_path(), "w") as log:
+            with running_lock:
+                if stopping:
+                    return 0.0
+                start = time.monotonic()
+                process = subprocess.Popen(
+                    job.get_command(gem5),
+                    cwd=cwd,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                )
+                running[job.name] = process
+            returncode = process.wait()
+            with running_lock:
+                del running[job.name]
+        if returncode != 0:
+            raise Gem5JobError(job, returncode)
+        return time.monotonic() - start
+
+    def run(job: Gem5Job) -> float:
+        try:
+            return run_job(job)
+        except Exception as e:
+            with running_lock:
+                failures.append(e)
+            raise
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run, job): job for job in jobs}
+        _, not_done = wait(
+            futures,
+            return_when=FIRST_EXCEPTION if fail_fast else ALL_COMPLETED,
+        )
+        if failures and not_done:
+            with running_lock:
+                stopping = True
+                for process in running.values():
+                    process.terminate()
+            for future in not_done:
+                future.cancel()
+            wait(not_done)
+
+    # The jobs terminated because of the first failure fail after it.
+    if failures:
+        raise failures[0]
+
+    return {futures[future].name: future.result() for future in futures}
+
@@ -0,0 +1,222 @@
+"""
+A faster loader for LoopPoint PinPoints region files.
+
+`LooppointCsvLoader` parses the whole PinPoints CSV file on every run, and
+`Looppoint` rebuilds its map of region start PC-count pairs on every exit
+event, each time `looppoint_save_checkpoint_generator` asks for the current
+region or updates the relative counts. Both costs grow with the number of
+regions.
+
+`IndexedLooppointCsvLoader` parses the CSV file once into a table of regions,
+in the order of the CSV file, and caches the table in a binary sidecar file
+named after the CSV file's SHA-256, in `looppoint-index` under gem5's
+resource directory, so nothing is written next to the CSV file. Later runs
+read the table from the sidecar instead of parsing the CSV. The region start
+map, sorted by start PC and count, is built once, so each exit event is a
+single dictionary lookup.
+"""
+
+import hashlib
+import struct
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from gem5.resources.looppoint import (
+    Looppoint,
+    LooppointRegion,
+    LooppointRegionPC,
+    LooppointRegionWarmup,
+    LooppointSimulation,
+)
+
+from m5.objects import PcCountTrackerManager
+from m5.params import PcCountPair
+
+from resource_cache import get_default_resource_dir
+
+_MAGIC = b"GEM5LPIX"
+_VERSION = 2
+# A region: its ID, its multiplier, whether it has a warmup, then the PC and
+# count of the simulation start and end, the count of the simulation end
+# relative to the region's checkpoint, and the PC and count of the warmup
+# start and end.
+_RECORD = struct.Struct("<qd?QQQQQQQQQ")
+
+
+class PinpointsRegion(NamedTuple):
+    region_id: int
+    multiplier: float
+    start: Tuple[int, int]
+    end: Tuple[int, int]
+    end_relative: int
+    warmup: Optional[Tuple[Tuple[int, int], Tuple[int, int]]]
+
+
+def _parse_pinpoints(text: str) -> List[PinpointsRegion]:
+    simulations = {}
+    warmups = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        fields = line.split(",")
+        if len(fields) < 15:
+            continue
+        start = (int(fields[3], 16), int(fields[6]))
+        end = (int(fields[7], 16), int(fields[10]))
+        if fields[0].startswith("cluster"):
+            simulations[int(fields[2])] = (
+                float(fields[14]),
+                start,
+                end,
+                int(fields[11]),
+            )
+        elif fields[0].startswith("Warmup"):
+            # "Warmup for regionid <region ID>"
+            warmups[int(fields[0].split()[-1])] = (start, end)
+    return [
+        PinpointsRegion(
+            rid, multiplier, start, end, end_relative, warmups.get(rid)
+        )
+        for rid, (multiplier, start, end, end_relative) in simulations.items()
+    ]
+
+
+def _pack_regions(regions: List[PinpointsRegion]) -> bytes:
+    records = [_MAGIC, struct.pack("<II", _VERSION, len(regions))]
+    for region in regions:
+        warmup = region.warmup or ((0, 0), (0, 0))
+        records.append(
+            _RECORD.pack(
+                region.region_id,
+                region.multiplier,
+                region.warmup is not None,
+                *region.start,
+                *region.end,
+                region.end_relative,
+                *warmup[0],
+                *warmup[1],
+            )
+        )
+    return b"".join(records)
+
+
+def _unpack_regions(data: bytes) -> Optional[List[PinpointsRegion]]:
+    if data[: len(_MAGIC)] != _MAGIC:
+        return None
+    version, count = struct.unpack_from("<II", data, len(_MAGIC))
+    offset = len(_MAGIC) + 8
+    if version != _VERSION or len(data) != offset + count * _RECORD.size:
+        return None
+    regions = []
+    for values in _RECORD.iter_unpack(data[offset:]):
+        rid, multiplier, has_warmup = values[:3]
+        pcs = values[3:]
+        regions.append(
+            PinpointsRegion(
+                rid,
+                multiplier,
+                pcs[0:2],
+                pcs[2:4],
+                pcs[4],
+                (pcs[5:7], pcs[7:9]) if has_warmup else None,
+            )
+        )
+    return regions
+
+
+def load_pinpoints(
+    pinpoints_file: Union[str, Path],
+    use_sidecar: bool = True,
+    cache_dir: Optional[Union[str, Path]] = None,
+) -> List[PinpointsRegion]:
+    """
+    Read the regions of a PinPoints CSV file, in the order of the file.
+
+    :param pinpoints_file: The PinPoints CSV file.
+    :param use_sidecar: Read the regions from the sidecar file if it exists
+    and write it otherwise. The sidecar is not written if the cache
+    directory cannot be written to.
+    :param cache_dir: The directory of the sidecar files. Defaults to
+    `looppoint-index` in gem5's resource directory.
+    """
+    pinpoints_file = Path(pinpoints_file)
+    data = pinpoints_file.read_bytes()
+    if cache_dir is None:
+        cache_dir = get_default_resource_dir() / "looppoint-index"
+    sidecar = Path(cache_dir).joinpath(
+        f"{pinpoints_file.name}.{hashlib.sha256(data).hexdigest()[:16]}.idx"
+    )
+    if use_sidecar and sidecar.is_file():
+        regions = _unpack_regions(sidecar.read_bytes())
+        if regions is not None:
+            return regions
+
+    regions = _parse_pinpoints(data.decode())
+    if use_sidecar:
+        try:
+            sidecar.parent.mkdir(parents=True, exist_ok=True)
+            tmp = sidecar.with_suffix(".tmp")
+            tmp.write_bytes(_pack_regions(regions))
+            tmp.replace(sidecar)
+        except OSError:
+            pass
+    return regions
+
+
+class IndexedLooppointCsvLoader(Looppoint):
+    """
+    A drop-in replacement for `LooppointCsvLoader` which reads the regions
+    through `load_pinpoints()` and builds its region start map once.
+    """
+
+    def __init__(
+        self,
+        pinpoints_file: Union[str, Path],
+        region_id: Optional[Union[str, int]] = None,
+        use_sidecar: bool = True,
+        cache_dir: Optional[Union[str, Path]] = None,
+    ):
+        regions = {}
+        for region in load_pinpoints(pinpoints_file, use_sidecar, cache_dir):
+            regions[region.region_id] = LooppointRegion(
+                simulation=LooppointSimulation(
+                    start=LooppointRegionPC(*region.start),
+                    end=LooppointRegionPC(
+                        *region.end, relative=region.end_relative
+                    ),
+                ),
+                multiplier=region.multiplier,
+                warmup=LooppointRegionWarmup(
+                    start=PcCountPair(*region.warmup[0]),
+                    end=PcCountPair(*region.warmup[1]),
+                )
+                if region.warmup
+                else None,
+            )
+        self._start_map = None
+        super().__init__(regions=regions)
+        if region_id:
+            self.set_target_region_id(region_id=region_id)
+
+    def set_target_region_id(self, region_id: Union[str, int]) -> None:
+        super().set_target_region_id(region_id=region_id)
+        self._start_map = None
+
+    def get_manager(self) -> PcCountTrackerManager:
+        """The PC-count tracker manager of the markers."""
+        return self._manager
+
+    def get_region_start_id_map(self) -> Dict[PcCountPair, Union[int, str]]:
+        if self._start_map is None:
+            # Sorted by the PC-count pair each region's checkpoint is taken
+            # at, while the regions keep the order of the CSV file.
+            self._start_map = dict(
+                sorted(
+                    super().get_region_start_id_map().items(),
+                    key=lambda item: (
+                        item[0].get_pc(),
+                        item[0].get_count(),
+                    ),
+                )
+            )
+        return self._start_map
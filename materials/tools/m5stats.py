@@ -0,0 +1,172 @@
+"""
+A streaming parser for gem5's text statistics, `m5out/stats.txt`.
+
+Every `m5.stats.dump()` appends a block to `stats.txt`, delimited by "Begin
+Simulation Statistics" and "End Simulation Statistics" lines. The functions
+here read these blocks one line at a time, in a single pass, without keeping
+previous blocks in memory.
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+_BEGIN = "---------- Begin Simulation Statistics ----------"
+_END = "---------- End Simulation Statistics   ----------"
+# A histogram bucket, "<low>-<high>", or "<value>" for buckets of size 1.
+_BUCKET = re.compile(r"^(?P<low>-?\d+)(?:-(?P<high>-?\d+))?$")
+# The unit at the end of a stat's description, e.g., "(Count)", or
+# "((Count/Cycle))" for a formula.
+_UNIT = re.compile(r"\((?P<unit>[^()]*|\([^()]*\))\)\s*$")
+
+
+def _parse_line(line: str) -> Optional[Tuple[str, float]]:
+    """
+    Parse a "<name> <value> [<pdf> <cdf>] # <description>" stat line.
+
+    Only the first value is kept. For vector and distribution entries this
+    is the entry's value, not its percentage. Lines without a numeric value
+    return None.
+    """
+    fields = line.split("#", 1)[0].split()
+    if len(fields) < 2:
+        return None
+    try:
+        return fields[0], float(fields[1])
+    except ValueError:
+        return None
+
+
+def iter_stat_dumps(
+    stats_file: Union[str, Path]
+) -> Iterator[Dict[str, float]]:
+    """
+    Iterate over the stat dumps in a `stats.txt` file, in the order they were
+    dumped.
+
+    :param stats_file: The path to the `stats.txt` file.
+
+    :returns: An iterator of dictionaries mapping each stat name (e.g.,
+    "board.processor.cores0.core.numCycles" or
+    "board.cache_hierarchy.l1dcaches0.overallMisses::total") to its value.
+    """
+    dump = None
+    with open(stats_file) as f:
+        for line in f:
+            if line.startswith(_BEGIN):
+                dump = {}
+            elif line.startswith(_END):
+                if dump is not None:
+                    yield dump
+                dump = None
+            elif dump is not None:
+                parsed = _parse_line(line)
+                if parsed:
+                    dump[parsed[0]] = parsed[1]
+
+
+def get_stat_units(stats_file: Union[str, Path]) -> Dict[str, str]:
+    """
+    Return the unit of every stat of the first dump of a `stats.txt` file,
+    e.g., "Count", "Tick" or "(Count/Cycle)". The units are the same in every
+    dump. Stats printed without a unit are left out.
+    """
+    units = {}
+    in_dump = False
+    with open(stats_file) as f:
+        for line in f:
+            if line.startswith(_BEGIN):
+                in_dump = True
+            elif line.startswith(_END):
+                break
+            elif in_dump and _parse_line(line):
+                match = _UNIT.search(line.split("#", 1)[-1])
+                if match:
+                    units[line.split(None, 1)[0]] = match.group("unit")
+    return units
+
+
+def get_stat_dump(
+    stats_file: Union[str, Path], index: int = 0
+) -> Dict[str, float]:
+    """
+    Return a single stat dump from a `stats.txt` file.
+
+    The file is only read up to the requested dump, unless `index` is
+    negative, in which case it is counted from the last dump.
+
+    :param stats_file: The path to the `stats.txt` file.
+    :param index: The index of the dump, in the order they were dumped.
+    """
+    if index < 0:
+        dumps = []
+        for dump in iter_stat_dumps(stats_file):
+            dumps.append(dump)
+            del dumps[:index]
+        if len(dumps) < -index:
+            raise IndexError(f"'{stats_file}' has fewer than {-index} dumps.")
+        return dumps[0]
+
+    for i, dump in enumerate(iter_stat_dumps(stats_file)):
+        if i == index:
+            return dump
+    raise IndexError(f"'{stats_file}' has no dump {index}.")
+
+
+def get_histogram_percentile(
+    dump: Dict[str, float], name: Union[str, List[str]], fraction: float
+) -> float:
+    """
+    Estimate a percentile of a histogram stat, such as a `CommMonitor`'s
+    "readLatencyHist", from its buckets. The samples are assumed to be spread
+    evenly within each bucket.
+
+    :param dump: A stat dump, as returned by `get_stat_dump()`.
+    :param name: The full name of the histogram stat, or a list of names of
+    histograms whose samples are combined, e.g., one per memory port.
+    :param fraction: The percentile, as a fraction, e.g., 0.99.
+
+    :returns: The estimated percentile, or NaN if the histogram is empty.
+    """
+    prefixes = [f"{n}::" for n in ([name] if isinstance(name, str) else name)]
+    # Each bucket as its start, its end (exclusive) and its count.
+    buckets = []
+    underflows = overflows = 0
+    for prefix in prefixes:
+        for stat, count in dump.items():
+            if stat.startswith(prefix):
+                match = _BUCKET.match(stat[len(prefix) :])
+                if match:
+                    low = int(match.group("low"))
+                    high = int(match.group("high") or low)
+                    buckets.append((low, high + 1, count))
+        underflows += dump.get(f"{prefix}underflows", 0)
+        overflows += dump.get(f"{prefix}overflows", 0)
+
+    total = underflows + sum(count for _, _, count in buckets) + overflows
+    if total == 0 or not buckets:
+        return float("nan")
+
+    # The buckets of several histograms overlap if their bucket sizes differ,
+    # e.g., when gem5 doubled the bucket size of one of them. Their samples
+    # are combined in buckets of the largest size, spread evenly within each
+    # original bucket.
+    size = max(end - low for low, end, _ in buckets)
+    origin = min(low for low, _, _ in buckets)
+    counts = [0.0] * -(-(max(end for _, end, _ in buckets) - origin) // size)
+    for low, end, count in buckets:
+        for i in range((low - origin) // size, (end - 1 - origin) // size + 1):
+            start = origin + i * size
+            overlap = min(end, start + size) - max(low, start)
+            counts[i] += count * overlap / (end - low)
+
+    target = fraction * total
+    cumulative = underflows
+    if target <= cumulative:
+        return float(origin)
+    for i, count in enumerate(counts):
+        if count and cumulative + count >= target:
+            return origin + size * (i + (target - cumulative) / count)
+        cumulative += count
+    # The percentile is in the overflows, beyond the last bucket.
+    return float(origin + size * len(counts))
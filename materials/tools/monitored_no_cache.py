@@ -0,0 +1,60 @@
+"""
+A cache-less hierarchy which monitors the traffic to each memory port.
+
+The memory controllers only report average latencies. To get latency
+distributions, `MonitoredNoCache` puts a `CommMonitor` between the memory
+bus and each memory port of the board. Its `readLatencyHist` and
+`writeLatencyHist` stats hold the request-to-response latency, in ticks, of
+every read and write to that port.
+"""
+
+from gem5.components.boards.abstract_board import AbstractBoard
+from gem5.components.cachehierarchies.classic.no_cache import NoCache
+from gem5.isas import ISA
+
+from m5.objects import CommMonitor
+
+
+class MonitoredNoCache(NoCache):
+    """
+    A `NoCache` hierarchy with a `CommMonitor` in front of each memory port.
+    The rest of the board is connected as by `NoCache`.
+    """
+
+    def __init__(self, latency_bins: int = 100):
+        """
+        :param latency_bins: The number of buckets in the latency histograms.
+        The buckets grow as needed to cover the largest latency, so more
+        buckets give finer percentiles.
+        """
+        super().__init__()
+        self._latency_bins = latency_bins
+
+    def incorporate_cache(self, board: AbstractBoard) -> None:
+        if board.has_coherent_io():
+            self._setup_coherent_io_bridge(board)
+
+        for core in board.get_processor().get_cores():
+            core.connect_icache(self.membus.cpu_side_ports)
+            core.connect_dcache(self.membus.cpu_side_ports)
+            core.connect_walker_ports(
+                self.membus.cpu_side_ports, self.membus.cpu_side_ports
+            )
+
+            if board.get_processor().get_isa() == ISA.X86:
+                int_req_port = self.membus.mem_side_ports
+                int_resp_port = self.membus.cpu_side_ports
+                core.connect_interrupt(int_req_port, int_resp_port)
+            else:
+                core.connect_interrupt()
+
+        # Set up the system port for functional access from the simulator.
+        board.connect_system_port(self.membus.cpu_side_ports)
+
+        mem_ports = board.get_mem_ports()
+        self.monitors = [
+            CommMonitor(latency_bins=self._latency_bins) for _ in mem_ports
+        ]
+        for (_, port), monitor in zip(mem_ports, self.monitors):
+            monitor.cpu_side_port = self.membus.mem_side_ports
+            monitor.mem_side_port = port
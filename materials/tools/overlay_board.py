@@ -0,0 +1,48 @@
+"""
+An `X86Board` whose disk writes can be kept in a copy-on-write overlay file.
+
+The `X86Board` already attaches its disk image as a `CowDiskImage` over a
+read-only `RawDiskImage`. The base image is never written, so any number of
+simulations can share a single copy of it, and the host's page cache holds
+its blocks once for all of them. The guest's writes are kept in memory, in
+the copy-on-write table, and are lost when the simulation ends.
+
+`OverlayX86Board` can give the copy-on-write table an overlay file. The
+overlay only holds the sectors the guest wrote, so it stays small however
+large the base image is. If the file exists, the disk starts from the base
+image with the overlay applied. When the simulation exits, the overlay is
+written back to the file, so a run can be continued or inspected later.
+Each simulation needs its own overlay file.
+"""
+
+from pathlib import Path
+from typing import Optional, Union
+
+from gem5.components.boards.x86_board import X86Board
+from gem5.resources.resource import AbstractResource
+
+
+class OverlayX86Board(X86Board):
+    def __init__(
+        self,
+        *args,
+        disk_overlay: Optional[Union[str, Path]] = None,
+        **kwargs,
+    ):
+        """
+        Takes the same parameters as `X86Board`, and:
+
+        :param disk_overlay: The copy-on-write overlay file of the disk. If
+        None, the guest's disk writes are discarded at the end of the
+        simulation.
+        """
+        super().__init__(*args, **kwargs)
+        self._disk_overlay = disk_overlay
+
+    def _add_disk_to_board(self, disk_image: AbstractResource) -> None:
+        super()._add_disk_to_board(disk_image)
+        if self._disk_overlay:
+            overlay = Path(self._disk_overlay).resolve()
+            overlay.parent.mkdir(parents=True, exist_ok=True)
+            for disk in self.pc.south_bridge.ide.disks:
+                disk.image.image_file = overlay.as_posix()
@@ -0,0 +1,69 @@
+"""
+Pack, unpack or inspect gem5 checkpoints in the `m5.cpt.packed` format.
+
+```
+python3 materials/tools/pack-checkpoint.py pack checkpoint_outputs/*/
+python3 materials/tools/pack-checkpoint.py unpack <checkpoint> <directory>
+python3 materials/tools/pack-checkpoint.py show <checkpoint> [<section>]
+```
+"""
+
+import argparse
+from pathlib import Path
+
+from checkpoint_format import (
+    PACKED_NAME,
+    TEXT_NAME,
+    PackedCheckpoint,
+    pack_checkpoint,
+    prepare_checkpoint,
+)
+
+parser = argparse.ArgumentParser(
+    description="Convert gem5 checkpoints to and from the packed format."
+)
+commands = parser.add_subparsers(dest="command", required=True)
+
+pack = commands.add_parser("pack", help="Pack checkpoint directories.")
+pack.add_argument("checkpoints", type=Path, nargs="+")
+pack.add_argument(
+    "--keep-text",
+    action="store_true",
+    help=f"Keep the `{TEXT_NAME}` file next to `{PACKED_NAME}`.",
+)
+
+unpack = commands.add_parser(
+    "unpack", help="Unpack a checkpoint into a directory gem5 can restore."
+)
+unpack.add_argument("checkpoint", type=Path)
+unpack.add_argument("directory", type=Path)
+
+show = commands.add_parser(
+    "show", help="List the sections of a packed checkpoint, or print one."
+)
+show.add_argument("checkpoint", type=Path)
+show.add_argument("section", type=str, nargs="?")
+
+args = parser.parse_args()
+
+if args.command == "pack":
+    for checkpoint in args.checkpoints:
+        text_size = (checkpoint / TEXT_NAME).stat().st_size
+        packed = pack_checkpoint(checkpoint, remove_text=not args.keep_text)
+        print(
+            f"{checkpoint}: {text_size} -> {packed.stat().st_size} bytes "
+            f"({text_size / packed.stat().st_size:.1f}x)"
+        )
+elif args.command == "unpack":
+    print(prepare_checkpoint(args.checkpoint, args.directory))
+else:
+    with PackedCheckpoint(args.checkpoint / PACKED_NAME) as checkpoint:
+        if args.section is None:
+            for name in checkpoint.get_section_names():
+                print(name)
+        else:
+            section = checkpoint.get_section(args.section)
+            if section is None:
+                parser.exit(1, f"No section '{args.section}'.\n")
+            for key, value in section.items():
+                print(f"{key}={value}")
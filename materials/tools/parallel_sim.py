@@ -0,0 +1,134 @@
+"""
+Experimental parallel simulation of the KVM cores of a board on host threads.
+
+gem5 simulates each event queue on its own host thread. By default, every
+SimObject is on the main event queue, so an 8-core simulation runs on one
+host thread. `enable_parallel_simulation()` moves each core to an event
+queue of its own. The rest of the board, i.e., the cores' children, the
+cache hierarchy, the memory and the devices, stays on the main event queue.
+`x86-full-system.py` uses it with `--parallel-quantum`, which runs the whole
+simulation on KVM cores.
+
+This is only safe for the configurations gem5 supports on several event
+queues: full-system boards whose cores are all KVM cores. A KVM core runs
+the guest natively and migrates to the event queue of the device or memory
+it accesses for the duration of the access, so the shared objects are only
+ever used from one thread. Simulated cores, e.g., ATOMIC, TIMING or O3
+cores, call into their caches and the memory bus directly from their own
+thread, and the cores of an SE workload share one `Process` for their
+system calls, so both are refused. So are the PC-count trackers of
+LoopPoint and ELFie, which KVM cores do not support.
+
+The event queues only synchronize once every quantum of simulated time. A
+short quantum costs host time in synchronizations, a long one lets the cores
+drift apart in simulated time. The report written by
+`write_parallel_report()` gives the quantum and, with the stats of the same
+run simulated serially, the simulated time gained or lost.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from gem5.components.boards.abstract_board import AbstractBoard
+
+from m5.objects import Root
+
+from m5stats import get_stat_dump
+from pc_tracking import get_all_cores
+
+
+def enable_parallel_simulation(
+    board: AbstractBoard, quantum: int, num_queues: Optional[int] = None
+) -> int:
+    """
+    Spread the cores of a board over event queues simulated on separate host
+    threads. Call before the simulation is instantiated.
+
+    :param board: A full-system board whose workload is set. Its cores,
+    including the cores of a switchable processor which are switched in
+    later, must all be KVM cores.
+    :param quantum: The simulated ticks between two synchronizations of the
+    event queues.
+    :param num_queues: The number of event queues the cores are spread over,
+    round robin. By default, each core gets its own.
+
+    :returns: The number of event queues, including the main event queue.
+    """
+    if quantum <= 0:
+        raise Exception("The quantum must be a positive number of ticks.")
+    if not board.is_fullsystem():
+        raise Exception(
+            "Parallel simulation is not supported with SE workloads, whose "
+            "cores share one process."
+        )
+    processor = board.get_processor()
+    cores = get_all_cores(processor)
+    if not all(core.is_kvm_core() for core in cores):
+        raise Exception(
+            "Parallel simulation is only supported with KVM cores. Other "
+            "cores access the memory system from their own host thread."
+        )
+    num_cores = processor.get_num_cores()
+    if num_queues is None:
+        num_queues = num_cores
+
+    # The main event queue is queue 0. The cores of a switchable processor
+    # are listed type by type. As in gem5's `fs_bigLITTLE.py`, only the cores
+    # themselves move: their children, e.g., the interrupt controllers which
+    # the devices send to, stay on the main event queue with the devices.
+    for i, core in enumerate(cores):
+        cpu = core.get_simobject()
+        for simobject in cpu.descendants():
+            simobject.eventq_index = 0
+        cpu.eventq_index = 1 + (i % num_cores) % num_queues
+
+    # The root of the simulation is only created when it is instantiated.
+    Root.sim_quantum = quantum
+    return 1 + min(num_queues, num_cores)
+
+
+def write_parallel_report(
+    path: Union[str, Path],
+    quantum: int,
+    num_queues: int,
+    simulated_ticks: int,
+    region_ticks: int,
+    host_seconds: float,
+    serial_stats_file: Optional[Union[str, Path]] = None,
+) -> Dict:
+    """
+    Write how the parallel simulation went.
+
+    :param quantum: The quantum, in ticks.
+    :param num_queues: The number of event queues.
+    :param simulated_ticks: The simulated ticks of the whole run.
+    :param region_ticks: The simulated ticks of the measured region.
+    :param host_seconds: The host time the simulation took.
+    :param serial_stats_file: The `stats.txt` file of the same region
+    simulated serially, whose first dump covers the region.
+
+    :returns: The report.
+    """
+    report = {
+        "quantum": quantum,
+        "event_queues": num_queues,
+        "simulated_ticks": simulated_ticks,
+        "synchronizations": -(-simulated_ticks // quantum),
+        "host_seconds": host_seconds,
+        "region_ticks": region_ticks,
+    }
+    if serial_stats_file:
+        serial_ticks = get_stat_dump(serial_stats_file)["simTicks"]
+        report["serial_region_ticks"] = serial_ticks
+        # The simulated time the quantum added to the region, or removed
+        # from it if negative.
+        report["region_ticks_lost"] = region_ticks - serial_ticks
+        report["region_ticks_error"] = (
+            (region_ticks - serial_ticks) / serial_ticks
+            if serial_ticks
+            else None
+        )
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4)
+    return report
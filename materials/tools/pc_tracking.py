@@ -0,0 +1,212 @@
+"""
+PC-count tracking on processors that switch cores.
+
+`ELFieInfo` and `Looppoint` attach their PC-count tracker probes to
+`processor.get_cores()`. On a `SwitchableProcessor`, those are only the cores
+running when the workload is set: the cores switched in later have no probe,
+so the markers past the first switch are never found. The helpers here attach
+the probes to every core of the processor instead. The tracker manager counts
+the PCs of all its probes, so the counts carry over from one set of cores to
+the next.
+
+Only cores which notify retired instructions can track PCs. KVM cores do not,
+so the fast-forward to a marker must run on ATOMIC cores.
+
+The targets are matched by the C++ tracker manager. `PcCountExitTracker`
+only reports on the matching: it records the PC, count and tick of each exit
+event, and afterwards replays them against each PC's sorted target counts to
+count the exits and the targets reached, per PC.
+"""
+
+import json
+import time
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, Generator, Iterable, List, Optional, Tuple, Union
+
+from gem5.components.processors.abstract_core import AbstractCore
+from gem5.components.processors.abstract_processor import AbstractProcessor
+from gem5.components.processors.switchable_processor import (
+    SwitchableProcessor,
+)
+from gem5.resources.elfie import ELFieInfo
+from gem5.resources.looppoint import LooppointJsonLoader
+
+import m5
+from m5.objects import PcCountTrackerManager
+from m5.params import PcCountPair
+
+
+def get_all_cores(processor: AbstractProcessor) -> List[AbstractCore]:
+    """
+    Return every core of a processor, including the cores of a switchable
+    processor which are not currently running.
+    """
+    if isinstance(processor, SwitchableProcessor):
+        return list(processor._all_cores())
+    return processor.get_cores()
+
+
+def add_pc_trackers(
+    processor: AbstractProcessor,
+    targets: Iterable[PcCountPair],
+    manager: PcCountTrackerManager,
+) -> None:
+    """Attach a PC-count tracker probe to every core of a processor."""
+    targets = list(targets)
+    for core in get_all_cores(processor):
+        core.add_pc_tracker_probe(targets, manager)
+
+
+class SwitchableELFieInfo(ELFieInfo):
+    """
+    An `ELFieInfo` which tracks the start and end markers on every core of a
+    switchable processor, so the run can fast-forward to the start marker on
+    ATOMIC cores and switch to detailed cores there.
+    """
+
+    def setup_processor(self, processor: AbstractProcessor) -> None:
+        add_pc_trackers(processor, self.get_targets(), self._manager)
+
+    def get_manager(self) -> PcCountTrackerManager:
+        """The PC-count tracker manager of the markers."""
+        return self._manager
+
+
+class SwitchableLooppointJsonLoader(LooppointJsonLoader):
+    """
+    A `LooppointJsonLoader` which tracks the region markers on every core of
+    a switchable processor, so a restored region can switch cores during its
+    warmup.
+    """
+
+    def setup_processor(self, processor: AbstractProcessor) -> None:
+        add_pc_trackers(processor, self.get_targets(), self._manager)
+
+    def get_manager(self) -> PcCountTrackerManager:
+        """The PC-count tracker manager of the markers."""
+        return self._manager
+
+
+def _get_pc_count(pair) -> Tuple[int, int]:
+    # Python `PcCountPair` params and the pairs returned by the tracker
+    # manager name their accessors differently.
+    if hasattr(pair, "get_pc"):
+        return pair.get_pc(), pair.get_count()
+    return pair.getPC(), pair.getCount()
+
+
+class PcCountExitTracker:
+    """
+    Record the PC-count exit events of a `PcCountTrackerManager`, to report
+    them against its targets.
+    """
+
+    def __init__(
+        self,
+        targets: Iterable[PcCountPair],
+        manager: PcCountTrackerManager,
+    ):
+        """
+        :param targets: The targets given to the manager.
+        :param manager: The manager, e.g., from the `get_manager()` of a
+        `SwitchableELFieInfo` or an `IndexedLooppointCsvLoader`.
+        """
+        self._manager = manager
+        counts = {}
+        for target in targets:
+            pc, count = _get_pc_count(target)
+            counts.setdefault(pc, set()).add(count)
+        self._targets = {pc: sorted(c) for pc, c in counts.items()}
+        # The PC, count and tick of every exit, in order.
+        self._exits = []
+        self._handler_seconds = 0.0
+
+    def on_exit(self) -> Optional[Tuple[int, int]]:
+        """
+        Record a PC-count exit event.
+
+        :returns: The PC and count the simulation stopped at, or None if it
+        was not at the PC of a target.
+        """
+        pc, count = _get_pc_count(self._manager.getCurrentPcCountPair())
+        self._exits.append((pc, count, m5.curTick()))
+        return (pc, count) if pc in self._targets else None
+
+    def _get_reached(self) -> Tuple[Dict[int, int], Dict[int, int], int]:
+        # Replay the exits against the sorted counts of each PC: the number
+        # of targets reached and of exits reaching a target, per PC, and the
+        # exits reaching no target. Counts at or below the count of an exit
+        # have all been reached, even if several targets fired in the same
+        # exit event.
+        reached = {pc: 0 for pc in self._targets}
+        exits = {pc: 0 for pc in self._targets}
+        unexpected = 0
+        for pc, count, _ in self._exits:
+            counts = self._targets.get(pc)
+            if counts is None or reached[pc] == len(counts):
+                unexpected += 1
+                continue
+            num_reached = bisect_right(counts, count)
+            if num_reached == reached[pc]:
+                unexpected += 1
+                continue
+            reached[pc] = num_reached
+            exits[pc] += 1
+        return reached, exits, unexpected
+
+    def get_num_pending(self) -> int:
+        """The number of targets not reached yet."""
+        reached, _, _ = self._get_reached()
+        return sum(
+            len(counts) - reached[pc] for pc, counts in self._targets.items()
+        )
+
+    def wrap(self, generator: Generator) -> Generator:
+        """
+        Wrap an `ExitEvent.SIMPOINT_BEGIN` generator, recording each exit
+        event before handing it to the generator.
+        """
+        while True:
+            self.on_exit()
+            start = time.monotonic()
+            try:
+                exit_on_completion = next(generator)
+            except StopIteration:
+                return
+            finally:
+                self._handler_seconds += time.monotonic() - start
+            yield exit_on_completion
+
+    def get_stats(self) -> Dict:
+        """
+        Return the exit statistics: the exits and targets reached per PC,
+        the exits at no target, the tick of every exit and the host time
+        spent in the wrapped generator.
+        """
+        reached, exits, unexpected = self._get_reached()
+        return {
+            "exits": sum(exits.values()),
+            "unexpected_exits": unexpected,
+            "targets": sum(map(len, self._targets.values())),
+            "pending_targets": self.get_num_pending(),
+            "handler_seconds": self._handler_seconds,
+            "exit_ticks": [tick for _, _, tick in self._exits],
+            "pcs": {
+                hex(pc): {
+                    "targets": len(counts),
+                    "reached": reached[pc],
+                    "exits": exits[pc],
+                    "next_count": (
+                        counts[reached[pc]]
+                        if reached[pc] < len(counts)
+                        else None
+                    ),
+                }
+                for pc, counts in sorted(self._targets.items())
+            },
+        }
+
+    def write_stats(self, path: Union[str, Path]) -> None:
+        with open(path, "w") as f:
+            json.dump(self.get_stats(), f, indent=4)
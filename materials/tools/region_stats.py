@@ -0,0 +1,238 @@
+"""
+Reconstruct whole-program statistics from per-region stat dumps.
+
+SimPoint and LoopPoint simulate a few representative regions of a program.
+The stats of each region must then be weighted, by the SimPoint weight or by
+the LoopPoint multiplier of the region, to estimate the stats of the whole
+program. The `WeightedStatsAggregator` does this incrementally: each region's
+dump is folded into running weighted sums as soon as it is read, so only one
+dump is in memory at any time, and the sums are NumPy arrays indexed by stat
+name.
+
+Ratios, such as IPC or miss rates, are not averaged directly. They are
+computed from the weighted sums of their numerator and denominator.
+"""
+
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from m5stats import get_stat_dump
+
+
+class Ratio(NamedTuple):
+    """
+    A derived statistic. The numerator and denominator are the sums of all
+    the stats matching the respective glob patterns.
+    """
+
+    name: str
+    numerator: str
+    denominator: str
+
+
+DEFAULT_RATIOS = [
+    # The cycles of every core are summed, so this is the IPC of an average
+    # core. The IPC of a multi-core board is this times its number of cores.
+    Ratio("ipc_per_core", "simInsts", "board.processor.*.numCycles"),
+    Ratio(
+        "l1i_miss_rate",
+        "*.l1icaches*.overallMisses::total",
+        "*.l1icaches*.overallAccesses::total",
+    ),
+    Ratio(
+        "l1d_miss_rate",
+        "*.l1dcaches*.overallMisses::total",
+        "*.l1dcaches*.overallAccesses::total",
+    ),
+    Ratio(
+        "l2_miss_rate",
+        "*.l2caches*.overallMisses::total",
+        "*.l2caches*.overallAccesses::total",
+    ),
+]
+
+
+# The units of the stats which add up over the consecutive parts of a run,
+# e.g., instruction and miss counts. Ratios, rates and averages, e.g., IPC,
+# miss rates and average latencies, have other units.
+_ADDITIVE_UNITS = {"Count", "Cycle", "Tick", "Byte", "Second", "Joule"}
+# The stats in these units which do not add up: the tick and host memory at
+# the end of the run, clock periods and the summaries of distributions.
+_NON_ADDITIVE_STATS = [
+    "finalTick",
+    "hostMemory",
+    "*.clock",
+    "*::mean",
+    "*::stdev",
+    "*::gmean",
+    "*::min_value",
+    "*::max_value",
+]
+
+
+def is_additive(name: str, unit: Optional[str]) -> bool:
+    """
+    Whether a stat of a run is the sum of its values over consecutive parts
+    of the run, so the stats of the parts can be summed.
+
+    :param name: The stat's full name.
+    :param unit: The stat's unit, as returned by `get_stat_units()`.
+    """
+    return unit in _ADDITIVE_UNITS and not any(
+        fnmatch(name, pattern) for pattern in _NON_ADDITIVE_STATS
+    )
+
+
+class WeightedStatsAggregator:
+    """
+    Accumulates weighted region stats.
+
+    Stats missing from a region's dump are counted as zero for that region,
+    as gem5 does not print most zero-valued stats.
+    """
+
+    def __init__(self, ratios: Optional[List[Ratio]] = None):
+        self._ratios = DEFAULT_RATIOS if ratios is None else ratios
+        self._index = {}
+        self._names = []
+        # Running sums of w, w^2, w*x and w*x^2 over the regions.
+        self._weight_sum = 0.0
+        self._weight_sq_sum = 0.0
+        self._sum = np.zeros(0)
+        self._sq_sum = np.zeros(0)
+        self._masks = {}
+        # The per-region ratio values, as an (n regions x n ratios) list.
+        self._ratio_values = []
+        self._ratio_weights = []
+
+    def _get_mask(self, pattern: str) -> np.ndarray:
+        mask = self._masks.get(pattern)
+        if mask is None or len(mask) != len(self._names):
+            mask = np.fromiter(
+                (fnmatch(name, pattern) for name in self._names),
+                dtype=bool,
+                count=len(self._names),
+            )
+            self._masks[pattern] = mask
+        return mask
+
+    def _to_array(self, stats: Dict[str, float]) -> np.ndarray:
+        for name in stats:
+            if name not in self._index:
+                self._index[name] = len(self._names)
+                self._names.append(name)
+        grow = len(self._names) - len(self._sum)
+        if grow:
+            self._sum = np.pad(self._sum, (0, grow))
+            self._sq_sum = np.pad(self._sq_sum, (0, grow))
+
+        values = np.zeros(len(self._names))
+        values[np.fromiter(map(self._index.get, stats), dtype=np.intp)] = (
+            np.fromiter(stats.values(), dtype=float, count=len(stats))
+        )
+        return np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def add_region(self, stats: Dict[str, float], weight: float) -> None:
+        """
+        Fold a region's stats into the aggregate.
+
+        :param stats: The region's stats, keyed by stat name.
+        :param weight: The SimPoint weight or the LoopPoint multiplier of the
+        region.
+        """
+        values = self._to_array(stats)
+        self._weight_sum += weight
+        self._weight_sq_sum += weight * weight
+        self._sum += weight * values
+        self._sq_sum += weight * values * values
+
+        region_ratios = []
+        for ratio in self._ratios:
+            denominator = values[self._get_mask(ratio.denominator)].sum()
+            numerator = values[self._get_mask(ratio.numerator)].sum()
+            region_ratios.append(
+                numerator / denominator if denominator else np.nan
+            )
+        self._ratio_values.append(region_ratios)
+        self._ratio_weights.append(weight)
+
+    def add_stats_file(
+        self, stats_file: Union[str, Path], weight: float, dump_index: int = 0
+    ) -> None:
+        """
+        Fold the stats of a region's `stats.txt` file into the aggregate.
+
+        :param stats_file: The region's `stats.txt`.
+        :param weight: The SimPoint weight or the LoopPoint multiplier of the
+        region.
+        :param dump_index: Which dump of the file holds the region's stats.
+        """
+        self.add_region(get_stat_dump(stats_file, dump_index), weight)
+
+    def get_num_regions(self) -> int:
+        return len(self._ratio_weights)
+
+    def _get_error_scale(self) -> float:
+        # The standard error of a weighted mean is sigma * sqrt(sum(w^2)) /
+        # sum(w). With fewer than two regions there is no spread to measure.
+        if self.get_num_regions() < 2:
+            return np.nan
+        return np.sqrt(self._weight_sq_sum) / self._weight_sum
+
+    def get_stats(
+        self, z: float = 1.96
+    ) -> Dict[str, Tuple[float, float, float]]:
+        """
+        Return the aggregated value of every stat.
+
+        :param z: The z-score of the reported confidence interval. 1.96 for
+        95% confidence.
+
+        :returns: A dictionary, keyed by stat name, of (extrapolated value,
+        weighted mean per region, confidence interval half-width of the
+        weighted mean) tuples. The extrapolated value is the weighted sum of
+        the region values. With LoopPoint multipliers, this is the estimate
+        for the whole program. With SimPoint weights, which sum to one, it is
+        the estimate for one SimPoint interval.
+        """
+        mean = self._sum / self._weight_sum
+        variance = np.maximum(self._sq_sum / self._weight_sum - mean**2, 0)
+        error = z * np.sqrt(variance) * self._get_error_scale()
+        return {
+            name: (self._sum[i], mean[i], error[i])
+            for i, name in enumerate(self._names)
+        }
+
+    def get_ratios(
+        self, z: float = 1.96
+    ) -> Dict[str, Tuple[float, float]]:
+        """
+        Return the whole-program value of each ratio.
+
+        :param z: The z-score of the reported confidence interval.
+
+        :returns: A dictionary, keyed by ratio name, of (value, confidence
+        interval half-width) tuples. The value is the ratio of the weighted
+        sums. The error is estimated from the spread of the per-region ratios.
+        """
+        values = np.array(self._ratio_values, dtype=float)
+        weights = np.array(self._ratio_weights, dtype=float)
+        result = {}
+        for i, ratio in enumerate(self._ratios):
+            numerator = self._sum[self._get_mask(ratio.numerator)].sum()
+            denominator = self._sum[self._get_mask(ratio.denominator)].sum()
+            valid = ~np.isnan(values[:, i])
+            if not denominator or not valid.any():
+                continue
+            region_mean = np.average(values[valid, i], weights=weights[valid])
+            variance = np.average(
+                (values[valid, i] - region_mean) ** 2, weights=weights[valid]
+            )
+            result[ratio.name] = (
+                numerator / denominator,
+                z * np.sqrt(variance) * self._get_error_scale(),
+            )
+        return result
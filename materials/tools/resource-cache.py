@@ -0,0 +1,61 @@
+"""
+Manage the local resource index of `resource_cache.py`.
+
+Run this script with gem5, e.g., to download and index the resources of a
+batch of jobs before launching them:
+
+```
+gem5 materials/tools/resource-cache.py obtain x86-print-this \
+    x86-matrix-multiply-omp
+gem5 materials/tools/resource-cache.py list
+gem5 materials/tools/resource-cache.py verify
+```
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(Path(__file__).resolve().parent.as_posix())
+
+from resource_cache import ResourceCache
+
+parser = argparse.ArgumentParser(description="Manage the resource index.")
+parser.add_argument(
+    "--resource-dir",
+    type=Path,
+    help="The resource directory. Defaults to $GEM5_RESOURCE_DIR or "
+    "~/.cache/gem5.",
+)
+commands = parser.add_subparsers(dest="command", required=True)
+
+obtain = commands.add_parser(
+    "obtain", help="Obtain resources and add them to the index."
+)
+obtain.add_argument("resources", type=str, nargs="+")
+obtain.add_argument("--version", type=str)
+
+commands.add_parser("list", help="List the indexed resources.")
+commands.add_parser(
+    "verify",
+    help="Check the MD5 sum of every indexed resource and drop the corrupt "
+    "ones.",
+)
+
+args = parser.parse_args()
+cache = ResourceCache(args.resource_dir)
+
+if args.command == "obtain":
+    for name in args.resources:
+        resource = cache.obtain(name, args.version)
+        print(f"{name}: {resource.get_local_path()}")
+elif args.command == "list":
+    for name, versions in sorted(cache.get_entries().items()):
+        for version, entry in versions.items():
+            print(f"{name} {version} {entry['md5']} {entry['path']}")
+else:
+    dropped = cache.verify()
+    for name in dropped:
+        print(f"{name} is corrupt or missing and was dropped from the index.")
+    if dropped:
+        sys.exit(1)
@@ -0,0 +1,198 @@
+"""
+An offline-first index of the gem5 resources downloaded to a local resource
+directory.
+
+`obtain_resource()` looks every resource up in the gem5 resources database,
+then checks the MD5 sum of its local copy, on every launch. `ResourceCache`
+records each resource it obtains in an index next to the resources: its
+class, parameters, local path and MD5 sum. The MD5 sum is the database's,
+which the local copy is checked against when it is first indexed, so a
+corrupt download is never indexed. Later lookups are resolved from the index
+alone, without the database. Checksums are verified lazily: the file's size
+and modification time are checked on every lookup, and the MD5 sum is only
+recomputed if they changed.
+
+Many gem5 processes can share a resource directory. The index is only
+modified, and resources are only downloaded, while holding an exclusive lock
+on the directory, so concurrent jobs wait for the first one to download a
+resource instead of racing it.
+"""
+
+import fcntl
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+import gem5.resources.resource
+from gem5.resources.client import get_resource_json_obj
+from gem5.resources.md5_utils import md5
+from gem5.resources.resource import AbstractResource, obtain_resource
+
+INDEX_NAME = "resource-index.json"
+LOCK_NAME = ".resource-index.lock"
+# The resources which are fully described by their class, local path and
+# parameters. Others, such as workloads, are always obtained from the
+# database.
+_CACHEABLE = {
+    "BinaryResource",
+    "BootloaderResource",
+    "CheckpointResource",
+    "DirectoryResource",
+    "DiskImageResource",
+    "FileResource",
+    "KernelResource",
+}
+_DEFAULT_VERSION = "default"
+
+
+def get_default_resource_dir() -> Path:
+    """gem5's default resource directory."""
+    return Path(
+        os.environ.get("GEM5_RESOURCE_DIR", Path.home() / ".cache" / "gem5")
+    )
+
+
+class ResourceCache:
+    def __init__(self, root: Optional[Union[str, Path]] = None):
+        """
+        :param root: The resource directory. Resources missing from the index
+        are downloaded there. Defaults to gem5's resource directory.
+        """
+        self._root = Path(root) if root else get_default_resource_dir()
+        self._root.mkdir(parents=True, exist_ok=True)
+        self._index_path = self._root / INDEX_NAME
+
+    @contextmanager
+    def _lock(self) -> Iterator[None]:
+        with open(self._root / LOCK_NAME, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_index(self) -> Dict:
+        try:
+            return json.loads(self._index_path.read_text())
+        except FileNotFoundError:
+            return {}
+
+    def _write_index(self, index: Dict) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self._root, prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f, indent=4)
+        os.replace(tmp, self._index_path)
+
+    def _get_stat(self, path: Path) -> Dict[str, int]:
+        stat = path.stat()
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _is_unchanged(self, entry: Dict) -> bool:
+        path = Path(entry["path"])
+        return path.exists() and self._get_stat(path) == entry["stat"]
+
+    def _is_intact(self, entry: Dict) -> bool:
+        """
+        Check a resource's MD5 sum. If it matches, the entry's size and
+        modification time are updated.
+        """
+        path = Path(entry["path"])
+        if not path.exists() or md5(path) != entry["md5"]:
+            return False
+        entry["stat"] = self._get_stat(path)
+        return True
+
+    def _make_resource(self, entry: Dict) -> AbstractResource:
+        cls = getattr(gem5.resources.resource, entry["class"])
+        return cls(local_path=entry["path"], **entry["parameters"])
+
+    def _make_entry(
+        self, name: str, version: Optional[str], resource: AbstractResource
+    ) -> Optional[Dict]:
+        cls = type(resource).__name__
+        if cls not in _CACHEABLE:
+            return None
+        path = Path(resource.get_local_path()).resolve()
+        resource_json = get_resource_json_obj(name, resource_version=version)
+        expected = resource_json["md5sum"]
+        actual = md5(path)
+        if actual != expected:
+            raise Exception(
+                f"The MD5 sum of resource '{name}' at '{path}' is {actual}, "
+                f"but the resources database gives {expected}. Delete it to "
+                "download it again."
+            )
+        parameters = {}
+        if cls == "DiskImageResource":
+            parameters["root_partition"] = resource.get_root_partition()
+        return {
+            "class": cls,
+            "path": path.as_posix(),
+            "parameters": parameters,
+            "md5": expected,
+            "stat": self._get_stat(path),
+        }
+
+    def obtain(
+        self, name: str, version: Optional[str] = None
+    ) -> AbstractResource:
+        """
+        A drop-in replacement for `obtain_resource()` which resolves resources
+        from the index when it can.
+
+        :param name: The resource ID, e.g., "x86-hello64-static".
+        :param version: The resource version. If None, the version which
+        `obtain_resource()` picked the first time is used.
+        """
+        key = version or _DEFAULT_VERSION
+        entry = self._read_index().get(name, {}).get(key)
+        if entry and self._is_unchanged(entry):
+            return self._make_resource(entry)
+
+        with self._lock():
+            # Another process may have obtained the resource meanwhile.
+            index = self._read_index()
+            entry = index.get(name, {}).get(key)
+            if entry and (self._is_unchanged(entry) or self._is_intact(entry)):
+                self._write_index(index)
+                return self._make_resource(entry)
+
+            resource = obtain_resource(
+                name,
+                resource_directory=self._root.as_posix(),
+                resource_version=version,
+            )
+            entry = self._make_entry(name, version, resource)
+            if entry:
+                index.setdefault(name, {})[key] = entry
+                self._write_index(index)
+            return resource
+
+    def verify(self) -> List[str]:
+        """
+        Recompute the MD5 sum of every indexed resource and drop the corrupt
+        or missing ones from the index. They are obtained again on their next
+        lookup.
+
+        :returns: The names of the dropped resources.
+        """
+        dropped = []
+        with self._lock():
+            index = self._read_index()
+            for name, versions in index.items():
+                for key, entry in list(versions.items()):
+                    if not self._is_intact(entry):
+                        del versions[key]
+                        dropped.append(name)
+            for name in set(dropped):
+                if not index[name]:
+                    del index[name]
+            self._write_index(index)
+        return dropped
+
+    def get_entries(self) -> Dict[str, Dict[str, Dict]]:
+        """Return the index, keyed by resource name, then version."""
+        return self._read_index()
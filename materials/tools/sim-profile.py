@@ -0,0 +1,77 @@
+"""
+Summarize the profiles written by `ProfiledSimulator`, per phase name: the
+host time spent simulating and in the exit event handlers, the committed
+instructions and the simulation speed in MIPS. With `--baseline`, also print
+each phase's speedup over the same phase of a baseline profile, e.g., from a
+run of the previous gem5 build.
+
+```
+python3 materials/tools/sim-profile.py m5out/profile.jsonl \
+    --baseline old-m5out/profile.jsonl
+```
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict
+
+_FIELDS = ["host_seconds", "handler_seconds", "ticks", "insts"]
+
+
+def read_phases(path: Path) -> Dict[str, Dict[str, float]]:
+    """Total the phase records of a profile by phase name, in run order."""
+    phases = {}
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("kind") != "phase":
+                continue
+            totals = phases.setdefault(
+                record["phase"], {field: 0 for field in _FIELDS}
+            )
+            for field in _FIELDS:
+                totals[field] += record[field]
+    for totals in phases.values():
+        seconds = totals["host_seconds"]
+        totals["mips"] = totals["insts"] / seconds / 1e6 if seconds else None
+    return phases
+
+
+parser = argparse.ArgumentParser(
+    description="Summarize ProfiledSimulator profiles per phase."
+)
+parser.add_argument("profile", type=Path)
+parser.add_argument(
+    "--baseline",
+    type=Path,
+    help="A profile of the same simulation to compare the speed against.",
+)
+args = parser.parse_args()
+
+try:
+    phases = read_phases(args.profile)
+    baseline = read_phases(args.baseline) if args.baseline else {}
+except (OSError, ValueError, KeyError) as e:
+    sys.exit(f"Cannot read the profile: {e}")
+
+header = f"{'phase':<16}{'host s':>10}{'handler s':>11}{'insts':>14}"
+header += f"{'MIPS':>9}"
+if args.baseline:
+    header += f"{'speedup':>9}"
+print(header)
+for name, totals in phases.items():
+    mips = totals["mips"]
+    line = (
+        f"{name:<16}{totals['host_seconds']:>10.2f}"
+        f"{totals['handler_seconds']:>11.2f}{totals['insts']:>14}"
+        f"{mips if mips is not None else float('nan'):>9.2f}"
+    )
+    if args.baseline:
+        base = baseline.get(name, {}).get("mips")
+        if mips is not None and base:
+            line += f"{mips / base:>9.2f}"
+        else:
+            line += f"{'-':>9}"
+    print(line)
@@ -0,0 +1,235 @@
+"""
+Host-side profiling of gem5 simulations.
+
+`ProfiledSimulator` is a `Simulator` which splits a run into phases at the
+exits handled by its exit event generators, e.g., the boot, a fast-forward,
+a warmup and a region, and logs how fast gem5 simulated each of them: the
+host time spent simulating, the host time spent in the exit event handler
+(e.g., writing a checkpoint), the simulated ticks and committed
+instructions, and the host memory use. With a heartbeat, it also logs the
+same figures every given number of simulated ticks within a phase.
+
+The log is a JSON Lines file with one record per phase, heartbeat and run, so
+slow phases can be found and MIPS regressions between gem5 builds tracked
+with [sim-profile.py](sim-profile.py).
+"""
+
+import json
+import resource
+import time
+from pathlib import Path
+from typing import Dict, Generator, Optional, Union
+
+from gem5.simulate.exit_event import ExitEvent
+from gem5.simulate.simulator import Simulator
+
+import m5
+
+from pc_tracking import get_all_cores
+
+
+def _get_rss_mib() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * resource.getpagesize() / 2**20
+
+
+def _get_peak_rss_mib() -> float:
+    # `ru_maxrss` is in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+class _Sample:
+    """The host time, tick and instruction count at a point of the run."""
+
+    def __init__(self, insts: int):
+        self.time = time.monotonic()
+        self.tick = m5.curTick()
+        self.insts = insts
+
+
+class ProfiledSimulator(Simulator):
+    def __init__(
+        self,
+        profile: Union[str, Path],
+        heartbeat_ticks: Optional[int] = None,
+        on_exit_event: Optional[Dict[ExitEvent, Generator]] = None,
+        **kwargs,
+    ):
+        """
+        :param profile: The JSON Lines file to write the profile to. A
+        relative path is relative to the output directory.
+        :param heartbeat_ticks: If set, also log the simulation speed every
+        this many simulated ticks. This uses the `ExitEvent.MAX_TICK` exit
+        event, so `run()` cannot then be given a maximum number of ticks.
+        :param on_exit_event: The exit event generators, as for `Simulator`.
+        Each exit handled by one of them ends a phase.
+        :param kwargs: The other `Simulator` parameters.
+        """
+        on_exit_event = dict(on_exit_event or {})
+        if heartbeat_ticks and ExitEvent.MAX_TICK in on_exit_event:
+            raise Exception(
+                "A heartbeat cannot be used with an ExitEvent.MAX_TICK exit "
+                "event generator."
+            )
+        for event, generator in on_exit_event.items():
+            on_exit_event[event] = self._wrap(event, generator)
+        if heartbeat_ticks:
+            on_exit_event[ExitEvent.MAX_TICK] = self._heartbeat()
+        super().__init__(on_exit_event=on_exit_event, **kwargs)
+        self._profiled_board = kwargs["board"]
+        self._profile_path = Path(m5.options.outdir) / profile
+        self._profile = None
+        self._heartbeat_ticks = heartbeat_ticks
+        self._phase = None
+        self._next_phase = None
+        self._num_phases = 0
+        self._phase_start = None
+        self._interval_start = None
+        self._pending = None
+
+    def set_phase(self, name: str) -> None:
+        """
+        Name the phase which starts at the end of the current exit event
+        handler, or at the start of the run if called before `run()`. Call it
+        from the exit event generators, e.g., with "region" when a warmup
+        ends. Unnamed phases are named after their index.
+        """
+        self._next_phase = name
+
+    def _get_insts(self) -> int:
+        # Summed over the switched out cores as well, so the count carries
+        # over a switch.
+        return sum(
+            core.get_simobject().totalInsts()
+            for core in get_all_cores(self._profiled_board.get_processor())
+        )
+
+    def _write(self, record: Dict) -> None:
+        if self._profile is None:
+            self._profile = open(self._profile_path, "w")
+        record["rss_mib"] = _get_rss_mib()
+        record["peak_rss_mib"] = _get_peak_rss_mib()
+        self._profile.write(json.dumps(record) + "\n")
+        self._profile.flush()
+
+    def _measure(self, start: _Sample) -> Dict:
+        end = _Sample(self._get_insts())
+        host_seconds = end.time - start.time
+        insts = end.insts - start.insts
+        ticks = end.tick - start.tick
+        return {
+            "start_tick": start.tick,
+            "end_tick": end.tick,
+            "ticks": ticks,
+            "insts": insts,
+            "host_seconds": host_seconds,
+            "mips": insts / host_seconds / 1e6 if host_seconds else None,
+            "ticks_per_host_second": (
+                ticks / host_seconds if host_seconds else None
+            ),
+        }
+
+    def _instantiate(self) -> None:
+        if self._phase_start is not None:
+            super()._instantiate()
+            return
+        start = time.monotonic()
+        super()._instantiate()
+        self._write(
+            {
+                "kind": "instantiate",
+                "host_seconds": time.monotonic() - start,
+            }
+        )
+        self._start_phase()
+
+    def _end_phase(self, exit_event: Optional[str]) -> None:
+        self._pending = {
+            "kind": "phase",
+            "phase": self._phase,
+            "index": self._num_phases,
+            "exit_event": exit_event,
+            "exit_cause": self.get_last_exit_event_cause(),
+            **self._measure(self._phase_start),
+            "handler_seconds": 0.0,
+        }
+
+    def _write_phase(self) -> None:
+        self._write(self._pending)
+        self._pending = None
+        self._num_phases += 1
+
+    def _start_phase(self) -> None:
+        self._phase = self._next_phase or f"phase-{self._num_phases}"
+        self._next_phase = None
+        self._phase_start = _Sample(self._get_insts())
+        self._interval_start = self._phase_start
+
+    def _wrap(self, event: ExitEvent, generator: Generator) -> Generator:
+        # The simulator hands each exit to a single generator, so each step
+        # of a wrapped generator ends one phase.
+        while True:
+            self._end_phase(event.name)
+            start = time.monotonic()
+            try:
+                exit_on_completion = next(generator)
+            except StopIteration:
+                exit_on_completion = None
+            finally:
+                self._pending["handler_seconds"] += time.monotonic() - start
+            self._write_phase()
+            self._start_phase()
+            if exit_on_completion is None:
+                # The simulator hands this exit, and the later ones of this
+                # event, to its default generator, which is not profiled.
+                return
+            yield exit_on_completion
+
+    def _heartbeat(self) -> Generator:
+        while True:
+            self._write(
+                {
+                    "kind": "heartbeat",
+                    "phase": self._phase,
+                    "index": self._num_phases,
+                    **self._measure(self._interval_start),
+                }
+            )
+            self._interval_start = _Sample(self._get_insts())
+            yield False
+
+    def run(self, max_ticks: int = m5.MaxTick) -> None:
+        if self._heartbeat_ticks:
+            if max_ticks != m5.MaxTick:
+                raise Exception(
+                    "The maximum number of ticks cannot be set with a "
+                    "heartbeat."
+                )
+            # `m5.simulate()` counts the ticks from the current tick, so this
+            # exits with ExitEvent.MAX_TICK every heartbeat.
+            max_ticks = self._heartbeat_ticks
+        start = time.monotonic()
+        try:
+            super().run(max_ticks=max_ticks)
+        finally:
+            # The run ends in a wrapped generator, in one of the simulator's
+            # default generators, or on an error. The phase still open is
+            # written unless no time was simulated in it.
+            if self._pending is None and self._phase_start is not None:
+                self._end_phase(None)
+                if not self._pending["ticks"]:
+                    self._pending = None
+            if self._pending is not None:
+                self._write_phase()
+            self._write(
+                {
+                    "kind": "run",
+                    "phases": self._num_phases,
+                    "tick": m5.curTick(),
+                    "host_seconds": time.monotonic() - start,
+                }
+            )
@@ -0,0 +1,101 @@
+"""
+Find the SimPoints of a workload from the BBV files of its threads, written
+by [simpoints-profile.py](../complete/simpoints-profile.py), and write them
+as a SimPoint JSON file for `--simpoint-json` in the SimPoint checkpoint and
+restore scripts.
+
+```
+python3 materials/tools/simpoint-cluster.py m5out/simpoint.core*.bb.gz \
+    --interval 1000000 --output simpoint.json
+```
+
+The BBV files are given in core order. A compressed `.npz` file written by
+`--save-bbvs` can be given instead of them. Requires NumPy.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from simpoint_bbv import (
+    combine_threads,
+    find_simpoints,
+    load_bbvs,
+    project,
+    read_bb_file,
+    save_bbvs,
+    write_simpoint_json,
+)
+
+parser = argparse.ArgumentParser(
+    description="Cluster per-thread BBVs into SimPoints."
+)
+parser.add_argument("bbvs", type=Path, nargs="+")
+parser.add_argument(
+    "--interval",
+    type=int,
+    required=True,
+    help="The number of instructions per interval the BBVs were recorded "
+    "with.",
+)
+parser.add_argument("--warmup-interval", type=int, default=0)
+parser.add_argument("--max-k", type=int, default=30)
+parser.add_argument("--dimensions", type=int, default=15)
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument(
+    "--save-bbvs",
+    type=Path,
+    help="Also store the BBVs in this compressed `.npz` file.",
+)
+parser.add_argument(
+    "--binary",
+    type=str,
+    help="The gem5 resource of the profiled binary, recorded in the JSON "
+    "file for the checkpoint and restore scripts.",
+)
+parser.add_argument(
+    "--arguments",
+    type=str,
+    nargs="*",
+    help="The arguments of the profiled binary.",
+)
+parser.add_argument("--output", type=Path, default=Path("simpoint.json"))
+args = parser.parse_args()
+
+try:
+    if len(args.bbvs) == 1 and args.bbvs[0].suffix == ".npz":
+        threads = load_bbvs(args.bbvs[0])
+    else:
+        threads = [read_bb_file(path) for path in args.bbvs]
+except (OSError, ValueError) as e:
+    sys.exit(f"Cannot read the BBVs: {e}")
+if args.save_bbvs:
+    save_bbvs(args.save_bbvs, threads)
+
+bbvs = combine_threads(threads)
+if bbvs.get_num_intervals() == 0:
+    sys.exit("The BBV files have no intervals.")
+simpoints = find_simpoints(
+    project(bbvs, args.dimensions, args.seed),
+    max_k=args.max_k,
+    seed=args.seed,
+)
+write_simpoint_json(
+    args.output,
+    simpoints,
+    args.interval,
+    args.warmup_interval,
+    num_threads=len(threads),
+    extra={
+        name: value
+        for name, value in (
+            ("binary", args.binary),
+            ("arguments", args.arguments),
+        )
+        if value is not None
+    },
+)
+print(
+    f"{len(simpoints.intervals)} SimPoints out of "
+    f"{bbvs.get_num_intervals()} intervals written to '{args.output}'."
+)
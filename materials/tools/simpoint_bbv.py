@@ -0,0 +1,336 @@
+"""
+SimPoint analysis of the basic block vectors (BBVs) recorded by gem5's
+`SimPoint` probes, for single and multi-threaded workloads.
+
+gem5's `SimPoint` probe writes one line per interval of a core's committed
+instructions, listing how many instructions each basic block executed in the
+interval, to a gzipped `.bb` file. With one probe per core, a multi-threaded
+SE workload, which runs one thread per core, gets one BBV file per thread.
+The BBVs are read into `ThreadBbvs`, a sparse (CSR) matrix with a row per
+interval, and can be stored in a compressed `.npz` file much smaller and
+faster to read than the text files.
+
+The threads' BBVs are combined interval by interval: the k-th interval of
+the workload is the concatenation of the k-th interval of every thread, with
+the basic block IDs of each thread offset so they do not collide. This
+assumes the threads progress at similar rates, as the threads of a balanced
+parallel region do. The combined BBVs are normalized, randomly projected to
+a few dimensions, and clustered with k-means, choosing the number of
+clusters by the Bayesian information criterion as SimPoint does. The
+interval closest to each cluster's centroid represents the cluster, with
+the cluster's share of the intervals as its weight.
+
+The result is written as a SimPoint JSON file holding the parameters of a
+`SimpointResource`. For multi-threaded workloads, the intervals are counted
+in the instructions of the first core, so the checkpoint scripts only set
+the SimPoint start instructions of that core.
+"""
+
+import gzip
+import json
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+
+class ThreadBbvs(NamedTuple):
+    """The BBVs of one thread, as a CSR matrix of intervals x blocks."""
+
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+    num_blocks: int
+
+    def get_num_intervals(self) -> int:
+        return len(self.indptr) - 1
+
+
+def read_bb_file(path: Union[str, Path]) -> ThreadBbvs:
+    """
+    Read a BBV file written by gem5's `SimPoint` probe, gzipped or not.
+    Each line is an interval: "T:<block ID>:<count> :<block ID>:<count> ...".
+    A gzipped file cut short, e.g., by a crash, is read up to its last
+    complete interval.
+    """
+    path = Path(path)
+    lines = []
+    with (gzip.open if path.suffix == ".gz" else open)(path, "rt") as f:
+        # A truncated gzip file raises EOFError once the lines decompressed
+        # before the cut have been read.
+        try:
+            for line in f:
+                if line[:1] == "T":
+                    lines.append(line)
+        except EOFError:
+            pass
+    if lines and not lines[-1].endswith("\n"):
+        # The last interval is incomplete.
+        lines.pop()
+    # The whole file is parsed at once: every ":" separated field is a
+    # number, and each line has two per basic block.
+    lengths = np.array([line.count(":") // 2 for line in lines], np.int64)
+    values = np.array(
+        " ".join(lines).replace("T", " ").replace(":", " ").split(),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    indices = values[:, 0]
+    return ThreadBbvs(
+        np.concatenate(([0], np.cumsum(lengths))),
+        indices,
+        values[:, 1],
+        int(indices.max()) + 1 if len(indices) else 0,
+    )
+
+
+def save_bbvs(path: Union[str, Path], threads: List[ThreadBbvs]) -> None:
+    """Store the BBVs of every thread in a compressed `.npz` file."""
+    arrays = {}
+    for i, thread in enumerate(threads):
+        arrays[f"indptr{i}"] = thread.indptr
+        arrays[f"indices{i}"] = thread.indices.astype(np.uint32)
+        arrays[f"data{i}"] = thread.data.astype(np.uint32)
+    np.savez_compressed(
+        path,
+        num_blocks=np.array([t.num_blocks for t in threads], dtype=np.int64),
+        **arrays,
+    )
+
+
+def load_bbvs(path: Union[str, Path]) -> List[ThreadBbvs]:
+    with np.load(path) as npz:
+        return [
+            ThreadBbvs(
+                npz[f"indptr{i}"],
+                npz[f"indices{i}"].astype(np.int64),
+                npz[f"data{i}"].astype(np.int64),
+                int(num_blocks),
+            )
+            for i, num_blocks in enumerate(npz["num_blocks"])
+        ]
+
+
+def combine_threads(threads: List[ThreadBbvs]) -> ThreadBbvs:
+    """
+    Concatenate the threads' BBVs interval by interval. The threads which
+    finished early contribute nothing to the later intervals.
+    """
+    num_intervals = max(t.get_num_intervals() for t in threads)
+    offsets = np.cumsum([0] + [t.num_blocks for t in threads])
+    lengths = np.zeros((num_intervals, len(threads)), dtype=np.int64)
+    for i, thread in enumerate(threads):
+        lengths[: thread.get_num_intervals(), i] = np.diff(thread.indptr)
+    indptr = np.concatenate(([0], np.cumsum(lengths.sum(axis=1))))
+
+    indices = np.empty(indptr[-1], dtype=np.int64)
+    data = np.empty(indptr[-1], dtype=np.int64)
+    # Where each thread's part of each interval starts in the combined rows.
+    starts = indptr[:-1, None] + np.cumsum(lengths, axis=1) - lengths
+    for i, thread in enumerate(threads):
+        n = thread.get_num_intervals()
+        positions = np.repeat(
+            starts[:n, i] - thread.indptr[:-1], lengths[:n, i]
+        )
+        positions += np.arange(thread.indptr[-1])
+        indices[positions] = thread.indices + offsets[i]
+        data[positions] = thread.data
+    return ThreadBbvs(indptr, indices, data, int(offsets[-1]))
+
+
+def project(
+    bbvs: ThreadBbvs, dimensions: int = 15, seed: int = 0
+) -> np.ndarray:
+    """
+    Normalize each interval's BBV to sum to one and project it onto
+    `dimensions` random dimensions, as SimPoint does.
+
+    :returns: An (intervals x dimensions) array.
+    """
+    rng = np.random.default_rng(seed)
+    projection = rng.uniform(-1.0, 1.0, (bbvs.num_blocks, dimensions))
+    lengths = np.diff(bbvs.indptr)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    totals = np.bincount(rows, weights=bbvs.data, minlength=len(lengths))
+    weights = bbvs.data / np.maximum(totals, 1)[rows]
+    projected = np.zeros((len(lengths), dimensions))
+    np.add.at(projected, rows, weights[:, None] * projection[bbvs.indices])
+    return projected
+
+
+def _squared_distances(x: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    distances = (
+        (x * x).sum(axis=1)[:, None]
+        - 2 * x @ centers.T
+        + (centers * centers).sum(axis=1)[None, :]
+    )
+    return np.maximum(distances, 0)
+
+
+def kmeans(
+    x: np.ndarray,
+    k: int,
+    rng: np.random.Generator,
+    iterations: int = 100,
+) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Cluster the rows of `x` with Lloyd's algorithm from a k-means++
+    initialization.
+
+    :returns: The centers, the cluster of each row and the sum of the squared
+    distances of the rows to their centers.
+    """
+    centers = [x[rng.integers(len(x))]]
+    for _ in range(1, k):
+        distances = _squared_distances(x, np.array(centers)).min(axis=1)
+        total = distances.sum()
+        if total == 0:
+            centers.append(x[rng.integers(len(x))])
+        else:
+            centers.append(x[rng.choice(len(x), p=distances / total)])
+    centers = np.array(centers)
+
+    labels = None
+    for _ in range(iterations):
+        distances = _squared_distances(x, centers)
+        new_labels = distances.argmin(axis=1)
+        if labels is not None and (new_labels == labels).all():
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, x)
+        empty = counts == 0
+        centers[~empty] = sums[~empty] / counts[~empty, None]
+        # An empty cluster is moved to the row furthest from its center.
+        for cluster in np.flatnonzero(empty):
+            furthest = distances[np.arange(len(x)), labels].argmax()
+            centers[cluster] = x[furthest]
+            labels[furthest] = cluster
+    distances = _squared_distances(x, centers)
+    labels = distances.argmin(axis=1)
+    return centers, labels, float(distances[np.arange(len(x)), labels].sum())
+
+
+def bic(x: np.ndarray, labels: np.ndarray, k: int, sse: float) -> float:
+    """The Bayesian information criterion of a clustering (Pelleg & Moore)."""
+    n, dimensions = x.shape
+    if n <= k:
+        return -np.inf
+    variance = max(sse / (n - k), 1e-12)
+    sizes = np.bincount(labels, minlength=k)
+    sizes = sizes[sizes > 0]
+    likelihood = (
+        sizes * np.log(sizes)
+        - sizes * np.log(n)
+        - sizes * dimensions / 2 * np.log(2 * np.pi * variance)
+        - (sizes - k) / 2
+    ).sum()
+    parameters = (k - 1) + dimensions * k + 1
+    return float(likelihood - parameters / 2 * np.log(n))
+
+
+class Simpoints(NamedTuple):
+    # The representative interval of each cluster and its weight, sorted by
+    # interval.
+    intervals: List[int]
+    weights: List[float]
+    # The cluster of every interval.
+    labels: List[int]
+
+
+def find_simpoints(
+    x: np.ndarray,
+    max_k: int = 30,
+    seeds: int = 5,
+    bic_threshold: float = 0.9,
+    seed: int = 0,
+) -> Simpoints:
+    """
+    Cluster the projected BBVs with k = 1 to `max_k` clusters, each from
+    `seeds` initializations, and pick the smallest k whose BIC reaches
+    `bic_threshold` of the range of the BIC scores.
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+    for k in range(1, min(max_k, len(x)) + 1):
+        best = min(
+            (kmeans(x, k, rng) for _ in range(seeds)), key=lambda r: r[2]
+        )
+        results.append((k, best, bic(x, best[1], k, best[2])))
+
+    scores = np.array([score for _, _, score in results])
+    finite = np.isfinite(scores)
+    if finite.any():
+        low, high = scores[finite].min(), scores[finite].max()
+        threshold = low + bic_threshold * (high - low)
+        chosen = next(r for r, s in zip(results, scores) if s >= threshold)
+    else:
+        chosen = results[0]
+    k, (centers, labels, _), _ = chosen
+
+    distances = _squared_distances(x, centers)
+    simpoints = []
+    for cluster in range(k):
+        members = np.flatnonzero(labels == cluster)
+        if len(members) == 0:
+            continue
+        representative = members[distances[members, cluster].argmin()]
+        simpoints.append((int(representative), len(members) / len(x)))
+    simpoints.sort()
+    return Simpoints(
+        [interval for interval, _ in simpoints],
+        [weight for _, weight in simpoints],
+        labels.tolist(),
+    )
+
+
+def write_simpoint_json(
+    path: Union[str, Path],
+    simpoints: Simpoints,
+    interval: int,
+    warmup_interval: int = 0,
+    num_threads: int = 1,
+    extra: Optional[Dict] = None,
+) -> None:
+    """
+    Write the SimPoints as the parameters of a `SimpointResource`, with the
+    number of threads the BBVs were recorded from.
+    """
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "simpoint_interval": interval,
+                "simpoint_list": simpoints.intervals,
+                "weight_list": simpoints.weights,
+                "warmup_interval": warmup_interval,
+                "num_threads": num_threads,
+                **(extra or {}),
+            },
+            f,
+            indent=4,
+        )
+
+
+_SIMPOINT_RESOURCE_PARAMETERS = (
+    "simpoint_interval",
+    "simpoint_list",
+    "weight_list",
+    "warmup_interval",
+)
+
+
+def read_simpoint_json(path: Union[str, Path]) -> Tuple[Dict, Dict]:
+    """
+    Read a SimPoint JSON file.
+
+    :returns: The keyword arguments of its `SimpointResource`, and the other
+    entries: the number of threads the BBVs were recorded from and,
+    optionally, the binary and its arguments.
+    """
+    with open(path) as f:
+        simpoint = json.load(f)
+    parameters = {
+        name: simpoint.pop(name) for name in _SIMPOINT_RESOURCE_PARAMETERS
+    }
+    simpoint.setdefault("num_threads", 1)
+    return parameters, simpoint
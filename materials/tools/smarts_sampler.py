@@ -0,0 +1,194 @@
+"""
+SMARTS-style periodic sampling of a single-threaded workload.
+
+SimPoint, LoopPoint and ELFie pick their regions from an offline profile of
+the workload. SMARTS needs no profile: it measures short, evenly spaced
+units of the whole run in detail and estimates the CPI of the run as the
+mean CPI of the units, with a confidence interval from their variance.
+
+`SmartsSampler` drives a `SwitchableProcessor` which starts on ATOMIC cores
+and switches to detailed cores, from `ExitEvent.MAX_INSTS` exits. Each
+sampling period of committed instructions is split into:
+
+* a fast-forward on the ATOMIC cores, whose accesses keep the caches warm
+  (functional warming);
+* a detailed warmup, which warms the pipeline state, e.g., the MSHRs, the
+  branch predictor and the store buffers;
+* a detailed measurement unit, whose cycles per instruction are one sample.
+
+The samples' mean and variance are updated online (Welford's algorithm), so
+the sampling can stop as soon as the confidence interval is narrow enough.
+"""
+
+import json
+import math
+from pathlib import Path
+from statistics import NormalDist
+from typing import Dict, Generator, Optional, Tuple, Union
+
+from gem5.components.processors.switchable_processor import (
+    SwitchableProcessor,
+)
+from gem5.simulate.simulator import Simulator
+
+
+class OnlineStats:
+    """The running mean and variance of samples, by Welford's algorithm."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def get_variance(self) -> float:
+        """The sample variance, or 0 with fewer than two samples."""
+        if self.count < 2:
+            return 0.0
+        return self._m2 / (self.count - 1)
+
+    def get_half_width(self, confidence: float) -> float:
+        """
+        The half width of the confidence interval of the mean, by the normal
+        approximation, or infinity with fewer than two samples.
+        """
+        if self.count < 2:
+            return math.inf
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        return z * math.sqrt(self.get_variance() / self.count)
+
+
+class SmartsSampler:
+    def __init__(
+        self,
+        processor: SwitchableProcessor,
+        period: int,
+        warmup: int,
+        measurement: int,
+        confidence: float = 0.997,
+        target_error: Optional[float] = None,
+        min_samples: int = 30,
+    ):
+        """
+        :param processor: A switchable processor which starts on ATOMIC
+        cores and switches to the detailed cores. Only the instructions of
+        its first core are counted.
+        :param period: The instructions from the start of one measurement
+        unit to the start of the next.
+        :param warmup: The instructions of detailed warmup before each unit.
+        :param measurement: The instructions of each measurement unit.
+        :param confidence: The confidence level of the reported interval.
+        :param target_error: Stop the simulation once the half width of the
+        confidence interval is at most this fraction of the mean CPI. By
+        default, the workload runs to its end.
+        :param min_samples: The samples taken before stopping early.
+        """
+        if period <= warmup + measurement:
+            raise Exception(
+                "The sampling period must be longer than the detailed warmup "
+                "and the measurement unit."
+            )
+        self._simulator = None
+        self._processor = processor
+        self._period = period
+        self._warmup = warmup
+        self._measurement = measurement
+        self._confidence = confidence
+        self._target_error = target_error
+        self._min_samples = min_samples
+        self._start = None
+        self.cpi = OnlineStats()
+        self.samples = []
+
+    def _get_fast_forward(self) -> int:
+        return self._period - self._warmup - self._measurement
+
+    def _get_cycles_and_insts(self) -> Tuple[float, int]:
+        core = self._processor.get_cores()[0].get_simobject()
+        cycles = next(
+            info.value
+            for info in core.getCCObject().getStats()
+            if info.name == "numCycles"
+        )
+        return cycles, core.totalInsts()
+
+    def start(self, simulator: Simulator) -> None:
+        """
+        Schedule the first fast-forward. Call before running.
+
+        :param simulator: The simulator, whose `ExitEvent.MAX_INSTS` exits
+        must be handled by `sample()`.
+        """
+        self._simulator = simulator
+        self._simulator.schedule_max_insts(self._get_fast_forward())
+
+    def get_relative_error(self) -> float:
+        half_width = self.cpi.get_half_width(self._confidence)
+        if self.cpi.mean == 0:
+            return math.inf
+        return half_width / self.cpi.mean
+
+    def sample(self) -> Generator[bool, None, None]:
+        """The generator handling the `ExitEvent.MAX_INSTS` exits."""
+        while True:
+            # The end of a fast-forward: switch to the detailed cores and
+            # warm them up.
+            self._processor.switch()
+            if self._warmup > 0:
+                self._simulator.schedule_max_insts(self._warmup)
+                yield False
+
+            # The end of the warmup: measure a unit.
+            self._start = self._get_cycles_and_insts()
+            self._simulator.schedule_max_insts(self._measurement)
+            yield False
+
+            cycles, insts = self._get_cycles_and_insts()
+            start_cycles, start_insts = self._start
+            if insts > start_insts:
+                cpi = (cycles - start_cycles) / (insts - start_insts)
+                self.cpi.add(cpi)
+                self.samples.append(cpi)
+            self._processor.switch()
+            if (
+                self._target_error is not None
+                and self.cpi.count >= self._min_samples
+                and self.get_relative_error() <= self._target_error
+            ):
+                print(
+                    f"CPI estimated within {self._target_error:.1%} after "
+                    f"{self.cpi.count} samples."
+                )
+                yield True
+            self._simulator.schedule_max_insts(self._get_fast_forward())
+            yield False
+
+    def get_report(self) -> Dict:
+        half_width = self.cpi.get_half_width(self._confidence)
+        return {
+            "period": self._period,
+            "warmup": self._warmup,
+            "measurement": self._measurement,
+            "samples": self.cpi.count,
+            "cpi": self.cpi.mean if self.cpi.count else None,
+            "cpi_stdev": math.sqrt(self.cpi.get_variance()),
+            "confidence": self._confidence,
+            "cpi_half_width": (
+                half_width if math.isfinite(half_width) else None
+            ),
+            "relative_error": (
+                self.get_relative_error()
+                if math.isfinite(half_width)
+                else None
+            ),
+            "cpi_samples": self.samples,
+        }
+
+    def write_report(self, path: Union[str, Path]) -> None:
+        with open(path, "w") as f:
+            json.dump(self.get_report(), f, indent=4)
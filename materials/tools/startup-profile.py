@@ -0,0 +1,207 @@
+"""
+Profile the startup of a gem5 config: the time gem5 takes to reach the
+config, the time each module the config imports takes to load, and the
+SimObject classes each of them registers, up to `m5.instantiate()`.
+
+This is like `python -X importtime`, which gem5's embedded interpreter does
+not support, with the SimObject class registrations of each module counted
+and timed. Run the config through it with gem5, followed by the config's
+own arguments:
+
+```
+gem5 materials/tools/startup-profile.py \
+    materials/complete/traffic-generator-hbm2stack.py
+```
+
+The modules with the highest self time are printed, and the whole profile
+is written to `startup-profile.json` in the output directory. By default,
+the config then runs to completion.
+"""
+
+import argparse
+import builtins
+import json
+import os
+import runpy
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+import m5
+from m5.SimObject import MetaSimObject, allClasses
+
+parser = argparse.ArgumentParser(
+    description="Profile the imports and the SimObject class registrations "
+    "of a gem5 config up to m5.instantiate()."
+)
+parser.add_argument("config", type=Path)
+parser.add_argument("arguments", nargs=argparse.REMAINDER)
+parser.add_argument(
+    "--top",
+    type=int,
+    default=25,
+    help="The number of modules printed, by decreasing self time.",
+)
+parser.add_argument(
+    "--stop-after-instantiate",
+    action="store_true",
+    help="Exit once the simulation is instantiated, without running it.",
+)
+args = parser.parse_args()
+
+
+def get_process_seconds() -> Optional[float]:
+    """The host time since gem5 was started, on Linux."""
+    try:
+        with open("/proc/self/stat") as f:
+            # The process start time is the 22nd field, after the command
+            # name, which is in parentheses and may contain spaces.
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+    return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.modules = {}
+        self.registrations = 0
+        self.registration_seconds = 0.0
+        # The time and registrations of the imports nested in each import in
+        # progress.
+        self._stack = []
+        self._import = builtins.__import__
+        self._meta_new = MetaSimObject.__new__
+        self._meta_init = MetaSimObject.__init__
+
+    def install(self) -> None:
+        builtins.__import__ = self._profile_import
+        MetaSimObject.__new__ = staticmethod(self._profile_new)
+        # A bound method would not be passed the class being initialized.
+        MetaSimObject.__init__ = lambda *init_args: self._profile_init(
+            *init_args
+        )
+
+    def uninstall(self) -> None:
+        builtins.__import__ = self._import
+        MetaSimObject.__new__ = staticmethod(self._meta_new)
+        MetaSimObject.__init__ = self._meta_init
+
+    def _profile_new(self, mcls, name, bases, cls_dict):
+        start = time.perf_counter()
+        try:
+            return self._meta_new(mcls, name, bases, cls_dict)
+        finally:
+            self.registration_seconds += time.perf_counter() - start
+
+    def _profile_init(self, cls, name, bases, cls_dict):
+        start = time.perf_counter()
+        try:
+            self._meta_init(cls, name, bases, cls_dict)
+        finally:
+            self.registration_seconds += time.perf_counter() - start
+            self.registrations += 1
+
+    def _profile_import(
+        self, name, globals=None, locals=None, fromlist=(), level=0
+    ):
+        num_modules = len(sys.modules)
+        registrations = self.registrations
+        self._stack.append([0.0, 0])
+        start = time.perf_counter()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested_seconds, nested_registrations = self._stack.pop()
+            registered = self.registrations - registrations
+            if self._stack:
+                self._stack[-1][0] += elapsed
+                self._stack[-1][1] += registered
+            # Only the imports which load modules are recorded. The others
+            # are lookups in `sys.modules`.
+            if len(sys.modules) > num_modules:
+                # The import system moves each module to the end of
+                # `sys.modules` once executed, so the last module is the one
+                # imported, e.g., "a.b" for "from a import b".
+                name = next(reversed(sys.modules))
+                record = self.modules.setdefault(
+                    name,
+                    {"seconds": 0.0, "self_seconds": 0.0, "simobjects": 0},
+                )
+                record["seconds"] += elapsed
+                record["self_seconds"] += elapsed - nested_seconds
+                record["simobjects"] += registered - nested_registrations
+
+
+profile = {
+    "config": args.config.as_posix(),
+    "gem5_startup_seconds": get_process_seconds(),
+    # The SimObject classes gem5 registers before the config is run.
+    "simobjects_at_startup": len(allClasses),
+}
+profiler = StartupProfiler()
+instantiate = m5.instantiate
+config_start = time.perf_counter()
+
+
+def report() -> None:
+    profile["simobjects_registered"] = profiler.registrations
+    profile["registration_seconds"] = profiler.registration_seconds
+    profile["import_seconds"] = sum(
+        record["self_seconds"] for record in profiler.modules.values()
+    )
+    profile["modules"] = dict(
+        sorted(
+            profiler.modules.items(),
+            key=lambda item: item[1]["self_seconds"],
+            reverse=True,
+        )
+    )
+    with open(Path(m5.options.outdir) / "startup-profile.json", "w") as f:
+        json.dump(profile, f, indent=4)
+
+    startup = profile["gem5_startup_seconds"]
+    if startup is not None:
+        print(
+            f"gem5 startup, with {profile['simobjects_at_startup']} SimObject "
+            f"classes: {startup:.3f}s"
+        )
+    print(
+        f"Config up to m5.instantiate(): {profile['config_seconds']:.3f}s, "
+        f"of which imports {profile['import_seconds']:.3f}s and "
+        f"{profiler.registrations} SimObject class registrations "
+        f"{profiler.registration_seconds:.3f}s"
+    )
+    print(f"m5.instantiate(): {profile['instantiate_seconds']:.3f}s")
+    print(f"{'self s':>8}{'total s':>9}{'SimObjects':>12}  module")
+    for name, record in list(profile["modules"].items())[: args.top]:
+        print(
+            f"{record['self_seconds']:>8.3f}{record['seconds']:>9.3f}"
+            f"{record['simobjects']:>12}  {name}"
+        )
+
+
+def profiled_instantiate(*instantiate_args, **instantiate_kwargs) -> None:
+    profile["config_seconds"] = time.perf_counter() - config_start
+    profiler.uninstall()
+    start = time.perf_counter()
+    instantiate(*instantiate_args, **instantiate_kwargs)
+    profile["instantiate_seconds"] = time.perf_counter() - start
+    m5.instantiate = instantiate
+    report()
+    if args.stop_after_instantiate:
+        sys.exit()
+
+
+m5.instantiate = profiled_instantiate
+profiler.install()
+sys.argv = [args.config.as_posix()] + args.arguments
+try:
+    runpy.run_path(args.config.as_posix(), run_name="__main__")
+finally:
+    profiler.uninstall()
+    m5.instantiate = instantiate
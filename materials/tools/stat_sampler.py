@@ -0,0 +1,302 @@
+"""
+Periodic sampling of live gem5 stats into a columnar file.
+
+`m5.stats.dump()` writes every stat of the system as text. To follow a few
+stats over time, `StatSampler` instead reads the selected stats directly from
+the simulator's stat objects after each simulated interval, and appends one
+row per sample to a columnar file (see `columnar.py`). The stats are looked
+up once, on the first sample, so each sample only reads the selected stats.
+
+Each row holds the tick of the sample and, for each stat, its change over the
+interval since the previous sample:
+
+- Scalars and vectors, which are counters, are stored as deltas. A
+  two-dimensional vector is flattened row by row.
+- Histograms are stored as the per-bucket deltas of their counts, along with
+  the bucket size and the deltas of their sample count and sum. gem5 doubles
+  the bucket size of a histogram when a sample falls beyond its last bucket,
+  so the previous counts are first merged into the current buckets.
+- Formulas, such as averages and ratios, are stored as their current value,
+  which covers the whole run.
+
+The stats must not be reset while they are sampled. Stats of other types,
+e.g., sparse histograms, are skipped with a warning.
+
+`ColumnarStatsDumper` replaces the text `stats.txt` output of the
+`m5.stats.dump()` calls of a config instead. Each dump is written as a row
+group of a columnar file, with the values the dump would have printed, i.e.,
+since the last reset: the stat names are written once, in the file's
+dictionary, and the values as arrays of 64-bit floats. A filter restricts
+the dumped stats to the ones matching glob patterns, e.g., a few stat
+groups of a large hierarchy.
+"""
+
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+import m5
+import m5.stats
+import _m5.stats
+from m5.objects import Root
+from m5.SimObject import SimObject
+from m5.util import warn
+
+from columnar import ColumnarWriter
+
+
+def iter_stats(group, path: str) -> Iterator[Tuple[str, object]]:
+    """
+    Iterate over the full names and info objects of the stats of a stat
+    group, e.g., `board.getCCObject()` with the path "board", and of its
+    child groups. The stats of the root, with an empty path, are not
+    prefixed, e.g., "simTicks".
+    """
+    prefix = f"{path}." if path else ""
+    for info in group.getStats():
+        yield f"{prefix}{info.name}", info
+    for name, child in group.getStatGroups().items():
+        yield from iter_stats(child, f"{prefix}{name}")
+
+
+def _rebin(counts: List[float], factor: int) -> List[float]:
+    """Merge the buckets of a histogram whose bucket size grew by `factor`."""
+    merged = [0.0] * len(counts)
+    for i, count in enumerate(counts):
+        merged[i // factor] += count
+    return merged
+
+
+class _SampledStat:
+    def __init__(self, name: str, info):
+        self.name = name
+        self.info = info
+        if isinstance(info, _m5.stats.DistInfo):
+            self.kind = "histogram"
+            info.prepare()
+            self.width = len(info.values)
+            self.previous = ([0.0] * self.width, info.bucket_size, 0.0, 0.0)
+        elif isinstance(info, _m5.stats.FormulaInfo):
+            self.kind = "formula"
+            self.width = info.size
+        elif isinstance(info, _m5.stats.VectorInfo):
+            self.kind = "vector"
+            self.width = info.size
+            self.previous = [0.0] * self.width
+        elif isinstance(info, _m5.stats.Vector2dInfo):
+            # A two-dimensional vector, e.g., the packet counts of a crossbar
+            # by source and destination port, is flattened row by row, as
+            # its `cvalue`.
+            self.kind = "vector2d"
+            self.width = info.x * info.y
+            self.previous = [0.0] * self.width
+        elif isinstance(info, _m5.stats.ScalarInfo):
+            self.kind = "scalar"
+            self.width = 1
+            self.previous = 0.0
+        else:
+            raise TypeError(f"Unsupported stat type: {type(info).__name__}")
+
+    def _value(self) -> List[float]:
+        if self.kind == "vector2d":
+            return list(self.info.cvalue)
+        return list(self.info.value)
+
+    def get_columns(self) -> List[dict]:
+        columns = [{"name": self.name, "width": self.width}]
+        if self.kind == "histogram":
+            columns += [
+                {"name": f"{self.name}::bucket_size"},
+                {"name": f"{self.name}::samples"},
+                {"name": f"{self.name}::sum"},
+            ]
+        return columns
+
+    def read(self) -> List:
+        """The current values, as `stats.txt` would show them."""
+        if self.kind == "scalar":
+            return [self.info.value]
+        if self.kind != "histogram":
+            value = self._value()
+            return [value if self.width > 1 else value[0]]
+        self.info.prepare()
+        counts = list(self.info.values)
+        samples = sum(counts) + self.info.underflow + self.info.overflow
+        return [counts, self.info.bucket_size, samples, self.info.sum]
+
+    def sample(self) -> List:
+        if self.kind == "scalar":
+            value = self.info.value
+            delta = value - self.previous
+            self.previous = value
+            return [delta]
+        if self.kind == "formula":
+            value = list(self.info.value)
+            return [value if self.width > 1 else value[0]]
+        if self.kind in ("vector", "vector2d"):
+            value = self._value()
+            delta = [v - p for v, p in zip(value, self.previous)]
+            self.previous = value
+            return [delta if self.width > 1 else delta[0]]
+
+        self.info.prepare()
+        counts = list(self.info.values)
+        bucket_size = self.info.bucket_size
+        outside = self.info.underflow + self.info.overflow
+        total = self.info.sum
+        previous, previous_size, previous_outside, previous_total = (
+            self.previous
+        )
+        if bucket_size != previous_size:
+            previous = _rebin(previous, int(bucket_size // previous_size))
+        delta = [c - p for c, p in zip(counts, previous)]
+        self.previous = (counts, bucket_size, outside, total)
+        samples = sum(delta) + outside - previous_outside
+        return [delta, bucket_size, samples, total - previous_total]
+
+
+def _select_stats(group, path: str, patterns: List[str]) -> List:
+    """
+    The stats of a stat group matching any of the patterns. The stats of a
+    type which cannot be sampled, e.g., sparse histograms, are skipped with
+    a warning.
+    """
+    stats = []
+    for name, info in iter_stats(group, path):
+        if not any(fnmatch(name, pattern) for pattern in patterns):
+            continue
+        try:
+            stats.append(_SampledStat(name, info))
+        except TypeError as e:
+            warn(f"Skipping the stat {name}. {e}")
+    if not stats:
+        raise Exception(f"No stat matches any of the patterns {patterns}.")
+    return stats
+
+
+class StatSampler:
+    """
+    Sample the stats of a SimObject and its children which match any of a
+    list of glob patterns, e.g., "system.memory.*.perBankRdBursts".
+    """
+
+    def __init__(
+        self,
+        root: SimObject,
+        patterns: Iterable[str],
+        path: Union[str, Path],
+        rows_per_group: int = 64,
+    ):
+        """
+        :param root: The SimObject, usually the board, whose stats are
+        sampled. It must have been instantiated before the first sample.
+        :param patterns: Glob patterns of the full names of the stats to
+        sample, as they appear in `stats.txt`.
+        :param path: The columnar file to write.
+        :param rows_per_group: The number of samples in each row group.
+        """
+        self._root = root
+        self._patterns = list(patterns)
+        self._path = path
+        self._rows_per_group = rows_per_group
+        self._stats = None
+        self._writer = None
+
+    def _setup(self) -> None:
+        self._stats = _select_stats(
+            self._root.getCCObject(), self._root.path(), self._patterns
+        )
+        columns = [{"name": "tick", "type": "q"}]
+        for stat in self._stats:
+            columns += stat.get_columns()
+        self._writer = ColumnarWriter(
+            self._path, columns, rows_per_group=self._rows_per_group
+        )
+
+    def get_stat_names(self) -> List[str]:
+        if self._stats is None:
+            self._setup()
+        return [stat.name for stat in self._stats]
+
+    def sample(self) -> None:
+        """Append a row with the change of each stat since the last sample."""
+        if self._stats is None:
+            self._setup()
+        row = [m5.curTick()]
+        for stat in self._stats:
+            row += stat.sample()
+        self._writer.write_row(row)
+
+    def close(self) -> None:
+        if self._writer:
+            self._writer.close()
+
+
+class ColumnarStatsDumper:
+    """
+    Write stat dumps to a columnar file, one row group per dump, instead of
+    appending them to `stats.txt` as text.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        patterns: Iterable[str] = ("*",),
+        text: bool = False,
+        root: Optional[SimObject] = None,
+    ):
+        """
+        :param path: The columnar file to write.
+        :param patterns: Glob patterns of the full names of the stats to
+        dump, as they appear in `stats.txt`, e.g., "simInsts" or
+        "board.cache_hierarchy.l2caches*". By default, every stat.
+        :param text: Also write the dumps to `stats.txt`. By default, the
+        text output, including the dump gem5 makes when it exits, is turned
+        off.
+        :param root: The SimObject whose stats are dumped. By default, the
+        root of the simulation, which holds the global stats such as
+        "simTicks".
+        """
+        self._path = path
+        self._patterns = list(patterns)
+        self._root = root
+        self._stats = None
+        self._writer = None
+        if not text:
+            m5.stats.outputList.clear()
+
+    def _setup(self) -> None:
+        if self._root is None:
+            group, path = Root.getInstance().getCCObject(), ""
+        else:
+            group, path = self._root.getCCObject(), self._root.path()
+        self._stats = _select_stats(group, path, self._patterns)
+        columns = [{"name": "tick", "type": "q"}]
+        for stat in self._stats:
+            columns += stat.get_columns()
+        # Each dump is a row group of its own, so the file holds every dump
+        # as soon as it is made.
+        self._writer = ColumnarWriter(self._path, columns, rows_per_group=1)
+
+    def get_stat_names(self) -> List[str]:
+        if self._stats is None:
+            self._setup()
+        return [stat.name for stat in self._stats]
+
+    def dump(self) -> None:
+        """
+        Dump the stats, as `m5.stats.dump()` does. gem5 still prepares the
+        stats for the dump, e.g., computes its formulas, and writes to its
+        other outputs, if any.
+        """
+        m5.stats.dump()
+        if self._stats is None:
+            self._setup()
+        row = [m5.curTick()]
+        for stat in self._stats:
+            row += stat.read()
+        self._writer.write_row(row)
+
+    def close(self) -> None:
+        if self._writer:
+            self._writer.close()
@@ -0,0 +1,81 @@
+"""
+Sweep the traffic generator benchmark over memories, generator kinds, rates
+and read percentages, and tabulate the bandwidth and latency of every point.
+
+This script is run with the host python, not with gem5:
+
+```
+python3 materials/tools/traffic-sweep.py \
+    --memories SingleChannelDDR3_1600 HBM2Stack \
+    --rates 10GB/s 20GB/s 40GB/s --read-percentages 100 50 \
+    --output traffic.csv
+```
+"""
+
+import argparse
+import csv
+import sys
+from pathlib import Path
+
+from gem5_jobs import Gem5JobError, default_num_workers
+from traffic_sweep import get_traffic_grid, run_traffic_sweep
+
+parser = argparse.ArgumentParser(
+    description="Run the traffic generator over a grid of parameters."
+)
+parser.add_argument("--gem5", type=str, default="gem5")
+parser.add_argument(
+    "--memories", type=str, nargs="+", default=["SingleChannelDDR3_1600"]
+)
+parser.add_argument(
+    "--generators",
+    type=str,
+    nargs="+",
+    choices=["random", "linear"],
+    default=["random"],
+)
+parser.add_argument("--rates", type=str, nargs="+", default=["40GB/s"])
+parser.add_argument("--read-percentages", type=int, nargs="+", default=[100])
+parser.add_argument("--duration", type=str, default="250us")
+parser.add_argument(
+    "--jobs",
+    type=int,
+    default=default_num_workers(),
+    help="The maximum number of points simulated at the same time. "
+    "Defaults to the number of host cores.",
+)
+parser.add_argument(
+    "--outdir",
+    type=Path,
+    default=Path("m5out/traffic-sweep"),
+    help="The directory under which each point's gem5 output is written.",
+)
+parser.add_argument(
+    "--output",
+    type=Path,
+    help="Write the table to this CSV file instead of the standard output.",
+)
+args = parser.parse_args()
+
+points = get_traffic_grid(
+    args.memories, args.generators, args.rates, args.read_percentages
+)
+print(
+    f"Running {len(points)} points using up to {args.jobs} gem5 processes.",
+    file=sys.stderr,
+)
+try:
+    rows = run_traffic_sweep(
+        points,
+        args.outdir,
+        duration=args.duration,
+        gem5=args.gem5,
+        max_workers=args.jobs,
+    )
+except Gem5JobError as e:
+    sys.exit(str(e))
+
+with open(args.output, "w", newline="") if args.output else sys.stdout as f:
+    writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
@@ -0,0 +1,159 @@
+"""
+Parameter sweeps over the traffic generator memory benchmark.
+
+Each point of a sweep is a memory, a generator kind, a request rate and a
+read percentage. gem5 instantiates a single simulation per process, so every
+point is simulated by its own `traffic-generator-point.py` gem5 process, with
+as many points in flight as there are host cores. The achieved bandwidth and
+the latency distribution of each point are read from the `CommMonitor` stats
+of its `stats.txt`.
+"""
+
+import itertools
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+
+from gem5_jobs import Gem5Job, run_gem5_jobs
+from m5stats import get_histogram_percentile, get_stat_dump
+
+POINT_SCRIPT = (
+    Path(__file__).resolve().parents[1]
+    / "complete"
+    / "traffic-generator-point.py"
+)
+_MONITORS = "*.cache_hierarchy.monitors*"
+
+
+class TrafficPoint(NamedTuple):
+    memory: str
+    generator: str
+    rate: str
+    read_percentage: int
+
+    def get_name(self) -> str:
+        rate = self.rate.replace("/", "p")
+        return (
+            f"{self.memory}-{self.generator}-{rate}-"
+            f"read{self.read_percentage}"
+        )
+
+    def get_job(
+        self, outdir: Union[str, Path], duration: str = "250us"
+    ) -> Gem5Job:
+        return Gem5Job(
+            name=self.get_name(),
+            script=POINT_SCRIPT,
+            outdir=Path(outdir) / self.get_name(),
+            arguments=[
+                "--memory",
+                self.memory,
+                "--generator",
+                self.generator,
+                "--rate",
+                self.rate,
+                "--read-percentage",
+                self.read_percentage,
+                "--duration",
+                duration,
+            ],
+        )
+
+
+def get_traffic_grid(
+    memories: Iterable[str],
+    generators: Iterable[str],
+    rates: Iterable[str],
+    read_percentages: Iterable[int],
+) -> List[TrafficPoint]:
+    """Return every combination of the given parameters."""
+    return [
+        TrafficPoint(*point)
+        for point in itertools.product(
+            memories, generators, rates, read_percentages
+        )
+    ]
+
+
+def get_traffic_results(stats_file: Union[str, Path]) -> Dict[str, float]:
+    """
+    Read a point's results from its `stats.txt`: the achieved bandwidth, in
+    GB/s, and the mean and 99th percentile read and write latencies, in ns.
+    """
+    dump = get_stat_dump(stats_file, -1)
+    ticks_per_ns = dump["simFreq"] / 1e9
+
+    def total(stat: str) -> float:
+        return sum(
+            value
+            for name, value in dump.items()
+            if fnmatch(name, f"{_MONITORS}.{stat}")
+        )
+
+    results = {
+        "bandwidth_gbps": (
+            total("totalReadBytes") + total("totalWrittenBytes")
+        )
+        / dump["simSeconds"]
+        / 1e9
+    }
+    for kind in ("read", "write"):
+        histograms = sorted(
+            name[: -len("::samples")]
+            for name in dump
+            if fnmatch(name, f"{_MONITORS}.{kind}LatencyHist::samples")
+        )
+        # There is a monitor per memory port, e.g., two for a dual channel
+        # memory, so their samples are combined.
+        samples = sum(dump[f"{name}::samples"] for name in histograms)
+        if samples:
+            mean = (
+                sum(
+                    dump[f"{name}::mean"] * dump[f"{name}::samples"]
+                    for name in histograms
+                )
+                / samples
+                / ticks_per_ns
+            )
+            p99 = (
+                get_histogram_percentile(dump, histograms, 0.99)
+                / ticks_per_ns
+            )
+        else:
+            mean = p99 = float("nan")
+        results[f"{kind}_latency_ns"] = mean
+        results[f"{kind}_latency_p99_ns"] = p99
+    return results
+
+
+def run_traffic_sweep(
+    points: Iterable[TrafficPoint],
+    outdir: Union[str, Path],
+    duration: str = "250us",
+    gem5: str = "gem5",
+    max_workers: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Simulate every point of a sweep in parallel.
+
+    :param points: The points to simulate.
+    :param outdir: The directory under which each point's gem5 output is
+    written, in a directory named after the point.
+    :param duration: The simulated duration of each point.
+    :param gem5: The gem5 binary.
+    :param max_workers: The maximum number of concurrent gem5 processes. By
+    default, one per available host core.
+
+    :returns: One row per point, in the order of `points`, with the point's
+    parameters, its results and the host time it took, in seconds.
+    """
+    points = list(points)
+    jobs = [point.get_job(outdir, duration) for point in points]
+    durations = run_gem5_jobs(jobs, gem5=gem5, max_workers=max_workers)
+    rows = []
+    for point, job in zip(points, jobs):
+        row = point._asdict()
+        row.update(get_traffic_results(job.get_stats_path()))
+        row["host_seconds"] = durations[job.name]
+        rows.append(row)
+    return rows
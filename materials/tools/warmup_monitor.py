@@ -0,0 +1,203 @@
+"""
+Adaptive detailed warmup.
+
+A restored checkpoint has cold caches and TLBs, so each region is preceded
+by a warmup. The warmup length is fixed, by the SimPoint warmup interval or
+by the LoopPoint warmup markers, and it is simulated in detail, although the
+caches of most regions are warm long before its end.
+
+`WarmupMonitor` watches the miss rates of the caches and TLBs over windows
+of simulated time during the detailed warmup. The warmup is converged once
+every miss rate has stayed within a tolerance of its previous window's value
+for a number of consecutive windows. The rest of the warmup can then be
+simulated on ATOMIC cores, which still access, and so keep warming, the
+caches, up to the start of the region.
+"""
+
+import json
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Union
+
+import m5
+from m5.SimObject import SimObject
+
+from stat_sampler import iter_stats
+
+
+class MissRate(NamedTuple):
+    """
+    A miss rate: the numerator and denominator are the sums of all the stats
+    matching the respective glob patterns, by their full names, e.g.,
+    "board.cache_hierarchy.l1dcaches0.overallMisses".
+    """
+
+    name: str
+    misses: str
+    accesses: str
+
+
+DEFAULT_MISS_RATES = [
+    MissRate(
+        "l1d", "*.l1dcaches*.overallMisses", "*.l1dcaches*.overallAccesses"
+    ),
+    MissRate(
+        "l1i", "*.l1icaches*.overallMisses", "*.l1icaches*.overallAccesses"
+    ),
+    MissRate(
+        "l2", "*.l2caches*.overallMisses", "*.l2caches*.overallAccesses"
+    ),
+    # The X86 TLBs count their read and write misses and accesses apart.
+    MissRate("dtlb", "*.dtb.*Misses", "*.dtb.*Accesses"),
+]
+
+
+def _get_total(info) -> float:
+    value = info.value
+    if isinstance(value, (int, float)):
+        return float(value)
+    return float(sum(value))
+
+
+class WarmupMonitor:
+    def __init__(
+        self,
+        root: SimObject,
+        miss_rates: Optional[List[MissRate]] = None,
+        tolerance: float = 0.05,
+        stable_windows: int = 3,
+        min_accesses: int = 1000,
+    ):
+        """
+        :param root: The SimObject, usually the board, whose stats are
+        watched. It must have been instantiated before the first update.
+        :param miss_rates: The miss rates to watch.
+        :param tolerance: How much a miss rate may change from one window to
+        the next and still be stable, relative to its value. Changes of less
+        than a tenth of a percentage point are always stable.
+        :param stable_windows: The number of consecutive stable windows after
+        which the warmup is converged.
+        :param min_accesses: The miss rates of a window with fewer accesses
+        are not compared, and the window counts as stable for them.
+        """
+        self._root = root
+        self._miss_rates = (
+            DEFAULT_MISS_RATES if miss_rates is None else miss_rates
+        )
+        self._tolerance = tolerance
+        self._stable_windows = stable_windows
+        self._min_accesses = min_accesses
+        self._infos = None
+        self._previous_counts = None
+        self._previous_rates = None
+        self._stable = 0
+        self._start_tick = None
+        self.converged_tick = None
+        # The tick the detailed warmup ended, once stopped.
+        self.stop_tick = None
+        self.windows = []
+
+    def _setup(self) -> None:
+        stats = list(
+            iter_stats(self._root.getCCObject(), self._root.path())
+        )
+        self._infos = {}
+        for rate in self._miss_rates:
+            misses = [i for n, i in stats if fnmatch(n, rate.misses)]
+            accesses = [i for n, i in stats if fnmatch(n, rate.accesses)]
+            if misses and accesses:
+                self._infos[rate.name] = (misses, accesses)
+        if not self._infos:
+            raise Exception("No stat matches any of the miss rates.")
+
+    def _get_counts(self) -> Dict[str, List[float]]:
+        return {
+            name: [
+                sum(_get_total(info) for info in misses),
+                sum(_get_total(info) for info in accesses),
+            ]
+            for name, (misses, accesses) in self._infos.items()
+        }
+
+    def start(self, tick: Optional[int] = None) -> None:
+        """
+        Start watching, e.g., when the warmup starts.
+
+        :param tick: The tick the warmup starts at, if the simulation is not
+        instantiated yet, e.g., the tick of the checkpoint it restores. Every
+        count is then taken to be zero at that tick.
+        """
+        if tick is not None:
+            self._start_tick = tick
+            return
+        if self._infos is None:
+            self._setup()
+        self._start_tick = m5.curTick()
+        self._previous_counts = self._get_counts()
+
+    def stop(self) -> None:
+        """
+        Stop watching, once the detailed warmup ends, e.g., when switching to
+        ATOMIC cores or at the end of the warmup.
+        """
+        if self.stop_tick is None:
+            self.stop_tick = m5.curTick()
+
+    def update(self) -> bool:
+        """
+        Close the current window.
+
+        :returns: Whether the warmup is converged.
+        """
+        if self._start_tick is None:
+            self.start()
+            return False
+        if self._infos is None:
+            self._setup()
+            self._previous_counts = {name: [0.0, 0.0] for name in self._infos}
+        counts = self._get_counts()
+        rates = {}
+        stable = True
+        for name, (misses, accesses) in counts.items():
+            previous_misses, previous_accesses = self._previous_counts[name]
+            window_accesses = accesses - previous_accesses
+            if window_accesses < self._min_accesses:
+                rates[name] = None
+                continue
+            rate = (misses - previous_misses) / window_accesses
+            rates[name] = rate
+            previous = (self._previous_rates or {}).get(name)
+            if previous is None or abs(rate - previous) > max(
+                self._tolerance * previous, 0.001
+            ):
+                stable = False
+        self._previous_counts = counts
+        self._previous_rates = rates
+        self._stable = self._stable + 1 if stable else 0
+        self.windows.append({"tick": m5.curTick(), "miss_rates": rates})
+        if self.converged_tick is None and (
+            self._stable >= self._stable_windows
+        ):
+            self.converged_tick = m5.curTick()
+        return self.converged_tick is not None
+
+    def get_report(self) -> Dict:
+        """
+        The ticks the detailed warmup took, whether it converged, and the
+        miss rates of every window.
+        """
+        return {
+            "start_tick": self._start_tick,
+            "converged": self.converged_tick is not None,
+            "converged_tick": self.converged_tick,
+            "detailed_warmup_ticks": (
+                (self.stop_tick or m5.curTick()) - self._start_tick
+                if self._start_tick is not None
+                else None
+            ),
+            "windows": self.windows,
+        }
+
+    def write_report(self, path: Union[str, Path], **extra) -> None:
+        with open(path, "w") as f:
+            json.dump({**self.get_report(), **extra}, f, indent=4)
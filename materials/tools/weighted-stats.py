@@ -0,0 +1,122 @@
+"""
+Estimate whole-program stats from SimPoint or LoopPoint region stats.
+
+For LoopPoint regions restored with `restore-all-looppoint-checkpoints.py`,
+pass the `regions.json` it writes:
+
+```
+python3 materials/tools/weighted-stats.py \
+    --regions m5out/looppoint-regions/regions.json
+```
+
+For SimPoint regions, pass each region's `stats.txt` with its weight. The
+SimPoint restore script dumps the warmup stats first, so the region stats are
+in the second dump:
+
+```
+python3 materials/tools/weighted-stats.py --dump-index 1 \
+    --stats m5out-2/stats.txt m5out-3/stats.txt --weights 0.1 0.2
+```
+"""
+
+import argparse
+import json
+import sys
+
+from region_stats import DEFAULT_RATIOS, Ratio, WeightedStatsAggregator
+
+
+def parse_ratio(value: str) -> Ratio:
+    try:
+        name, fraction = value.split("=", 1)
+        numerator, denominator = fraction.split("/", 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"'{value}' is not of the form <name>=<numerator>/<denominator>."
+        )
+    return Ratio(name, numerator, denominator)
+
+
+parser = argparse.ArgumentParser(
+    description="Combine weighted region stats into whole-program stats."
+)
+
+inputs = parser.add_mutually_exclusive_group(required=True)
+inputs.add_argument(
+    "--regions",
+    type=str,
+    help="A `regions.json` file, as written by "
+    "`restore-all-looppoint-checkpoints.py`, giving the `stats.txt` file and "
+    "multiplier of each region.",
+)
+inputs.add_argument(
+    "--stats",
+    type=str,
+    nargs="+",
+    help="The `stats.txt` file of each region.",
+)
+parser.add_argument(
+    "--weights",
+    type=float,
+    nargs="+",
+    help="The weight of each `--stats` file.",
+)
+parser.add_argument(
+    "--dump-index",
+    type=int,
+    default=0,
+    help="The index of the dump holding the region stats in each file.",
+)
+parser.add_argument(
+    "--ratio",
+    type=parse_ratio,
+    action="append",
+    default=[],
+    help="An extra derived stat, as <name>=<numerator glob>/<denominator "
+    "glob>, e.g., 'l2_mpki=*.l2caches*.overallMisses::total/simInsts'.",
+)
+parser.add_argument(
+    "--output",
+    type=str,
+    help="Write every aggregated stat to this JSON file.",
+)
+args = parser.parse_args()
+
+if args.regions:
+    with open(args.regions) as f:
+        regions = json.load(f)
+    inputs = [(r["stats"], r["multiplier"]) for r in regions.values()]
+else:
+    if not args.weights or len(args.weights) != len(args.stats):
+        parser.error("Each `--stats` file needs a matching `--weights` value.")
+    inputs = list(zip(args.stats, args.weights))
+
+aggregator = WeightedStatsAggregator(ratios=DEFAULT_RATIOS + args.ratio)
+for stats_file, weight in inputs:
+    try:
+        aggregator.add_stats_file(stats_file, weight, args.dump_index)
+    except (IndexError, OSError) as e:
+        sys.exit(str(e))
+
+print(f"Combined {aggregator.get_num_regions()} regions.")
+for name, (value, error) in aggregator.get_ratios().items():
+    print(f"{name:<16} {value:.6f} +/- {error:.6f}")
+
+if args.output:
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "ratios": {
+                    name: {"value": value, "ci95": error}
+                    for name, (value, error) in aggregator.get_ratios().items()
+                },
+                "stats": {
+                    name: {"extrapolated": total, "mean": mean, "ci95": error}
+                    for name, (total, mean, error) in (
+                        aggregator.get_stats().items()
+                    )
+                },
+            },
+            f,
+            indent=4,
+        )